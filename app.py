@@ -2,21 +2,65 @@ from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
 import sys
+import threading
 from datetime import datetime
 import logging
-from controller.clean.clean import clean_files
+from controller.clean.clean import clean_files_api, clean_status_api, base_dir as clean_data_dir
 from controller.load import load_to_generate_images, load_to_ps_imgs, load_to_refine_images, get_weekday_images, get_text_content
-from controller.publish.publish import publish_post_api
+from controller.publish.publish import publish_post_api, publish_batch_api, publish_accounts_api, list_accounts_api, enqueue_publish_api, list_outbox_api, get_outbox_entry_api
 from controller.generate.ai import regenerate_image, generate_ai_image
 from controller.ps.ps import watermark_process_logic
-from controller.organize.ai_text import generate_ai_text_api
+from controller.organize.ai_text import generate_ai_text_api, generate_ai_text_stream_api
 from controller.organize.organize import organize_images_api
+from controller.schedule.schedule import get_next_runs_api, plan_today_api
+from controller.publish.trace import list_traces_api, trace_stats_api
+from controller.archive.archive import list_archive_weeks_api, get_archive_week_api, query_archive_api
+from service.scheduler.publish_scheduler import start_scheduler
+from service.ins_robot.publish_outbox import get_outbox
+from service.ins_robot.browser_watchdog import kill_orphan_chrome
+from service.clean.clean_engine import get_clean_engine
 
 app = Flask(__name__)
 CORS(app)
 
 frontend_path = os.path.join((os.path.dirname(os.path.abspath(__file__))), 'frontend')
 
+# 后台服务（遗留浏览器清理、发布记录恢复、回收区删除、定时发布）只启动一次
+background_services_started = False
+background_services_lock = threading.Lock()
+
+
+def should_start_background_services(debug):
+    """
+    判断当前进程是否应该启动后台服务：debug模式的reloader会启动两个进程，只在实际提供服务的子进程中启动；
+    非debug模式、flask run --no-reload或WSGI部署时只有一个进程，直接启动
+    """
+    return not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+
+def start_background_services():
+    """
+    启动后台服务，重复调用时只执行一次
+    """
+    global background_services_started
+    with background_services_lock:
+        if background_services_started:
+            return
+        background_services_started = True
+    # 先结束上次运行遗留的浏览器进程，再处理中断的发布记录，最后启动定时发布
+    kill_orphan_chrome()
+    get_outbox().recover()
+    # 继续删除上次运行中没有删除完的回收区批次
+    get_clean_engine(clean_data_dir).start()
+    start_scheduler()
+
+
+# 不经过__main__启动时（flask run、WSGI服务器）在处理第一个请求前启动后台服务
+@app.before_request
+def ensure_background_services():
+    if not background_services_started and should_start_background_services(app.debug):
+        start_background_services()
+
 # 主页路由
 @app.route('/')
 def index():
@@ -30,9 +74,12 @@ def serve_static(filename):
     return send_from_directory(os.path.join(frontend_path, 'html'), filename)
 
 @app.route('/api/clean-files', methods=['POST'])
-def clean_files_api():
-    clean_files()
-    return jsonify({"message": "Files cleaned successfully"}), 200
+def clean_files_route():
+    return clean_files_api()
+
+@app.route('/api/clean-files/status', methods=['GET'])
+def clean_status_route():
+    return clean_status_api()
 
 
 @app.route('/api/load-to-generate-imgs', methods=['GET'])
@@ -77,6 +124,11 @@ def watermark_process():
 def generate_ai_text():
     return generate_ai_text_api()
 
+# AI文案流式生成路由（SSE）
+@app.route('/api/generate-ai-text/stream', methods=['POST'])
+def generate_ai_text_stream():
+    return generate_ai_text_stream_api()
+
 @app.route('/api/organize-images', methods=['POST'])
 def organize_images():
     return organize_images_api()
@@ -101,9 +153,65 @@ def text_content_api(weekday, filename):
 def publish_api():
     return publish_post_api()
 
+@app.route('/api/publish-batch', methods=['POST'])
+def publish_batch():
+    return publish_batch_api()
+
+@app.route('/api/publish-accounts', methods=['POST'])
+def publish_accounts():
+    return publish_accounts_api()
+
+@app.route('/api/accounts', methods=['GET'])
+def accounts():
+    return list_accounts_api()
+
+@app.route('/api/outbox', methods=['POST'])
+def outbox_enqueue():
+    return enqueue_publish_api()
+
+@app.route('/api/outbox', methods=['GET'])
+def outbox_list():
+    return list_outbox_api()
+
+@app.route('/api/outbox/<key>', methods=['GET'])
+def outbox_entry(key):
+    return get_outbox_entry_api(key)
+
+@app.route('/api/archive/weeks', methods=['GET'])
+def archive_weeks():
+    return list_archive_weeks_api()
+
+@app.route('/api/archive/weeks/<week>', methods=['GET'])
+def archive_week(week):
+    return get_archive_week_api(week)
+
+@app.route('/api/archive/items', methods=['GET'])
+def archive_items():
+    return query_archive_api()
+
+@app.route('/api/publish-traces', methods=['GET'])
+def publish_traces():
+    return list_traces_api()
+
+@app.route('/api/publish-traces/stats', methods=['GET'])
+def publish_trace_stats():
+    return trace_stats_api()
+
+@app.route('/api/scheduler/next-runs', methods=['GET'])
+def scheduler_next_runs():
+    return get_next_runs_api()
+
+@app.route('/api/scheduler/plan-today', methods=['POST'])
+def scheduler_plan_today():
+    return plan_today_api()
+
 
 if __name__ == '__main__':
     print("Starting Instagram Robot Service...")
     print("\n服务启动在 http://localhost:5000")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    debug = True
+    if should_start_background_services(debug):
+        start_background_services()
+    
+    app.run(host='0.0.0.0', port=5000, debug=debug)
\ No newline at end of file
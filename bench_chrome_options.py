@@ -0,0 +1,95 @@
+import sys
+import time
+import shutil
+import tempfile
+import psutil
+
+from service.ins_robot.login import BROWSER_MODES, get_chrome_options, create_webdriver
+from service.ins_robot.network_blocker import NetworkBlocker
+
+def get_driver_rss(driver):
+    """
+    统计chromedriver及其所有子进程（Chrome浏览器、渲染进程等）的内存占用
+    
+    Returns:
+        int: 常驻内存总量（字节）
+    """
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return 0
+    
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+def measure_mode(mode, url, blocking=True):
+    """
+    测量一种浏览器模式的启动时间、页面加载时间和内存占用
+    
+    Args:
+        mode: 浏览器模式
+        url: 用于测量页面加载的地址
+        blocking: 是否开启发布会话使用的网络屏蔽
+        
+    Returns:
+        dict: 测量结果
+    """
+    # 每种模式使用独立的临时配置目录，保证冷启动条件一致
+    profile_dir = tempfile.mkdtemp(prefix=f"bench_{mode}_")
+    driver = None
+    try:
+        started_at = time.time()
+        driver = create_webdriver(get_chrome_options(mode=mode, user_data_dir=profile_dir))
+        startup_time = time.time() - started_at
+        
+        # 与发布会话一致，开启网络屏蔽后再打开页面
+        network_blocker = NetworkBlocker(driver, categories=None if blocking else [], extra_patterns=None if blocking else [])
+        network_blocker.enable()
+        
+        started_at = time.time()
+        driver.get(url)
+        page_load_time = time.time() - started_at
+        metrics = network_blocker.record_page_metrics() or {}
+        
+        # 等待页面上的异步资源加载稳定后再统计内存
+        time.sleep(5)
+        return {
+            'mode': mode,
+            'blocking': blocking,
+            'startup': startup_time,
+            'page_load': page_load_time,
+            'transfer_kb': metrics.get('transfer_bytes', 0) / 1024,
+            'rss_mb': get_driver_rss(driver) / (1024 * 1024)
+        }
+    finally:
+        if driver:
+            driver.quit()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "https://www.instagram.com/"
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    
+    print(f"=== Chrome配置对比: {url}，每种模式 {rounds} 轮 ===")
+    summary = []
+    for mode in BROWSER_MODES:
+        for blocking in (False, True):
+            results = [measure_mode(mode, url, blocking) for _ in range(rounds)]
+            summary.append({
+                'mode': mode,
+                'blocking': blocking,
+                'startup': sum(r['startup'] for r in results) / rounds,
+                'page_load': sum(r['page_load'] for r in results) / rounds,
+                'transfer_kb': sum(r['transfer_kb'] for r in results) / rounds,
+                'rss_mb': sum(r['rss_mb'] for r in results) / rounds
+            })
+    
+    print(f"{'模式':<10}{'屏蔽':<6}{'启动(秒)':>12}{'页面加载(秒)':>14}{'传输(KB)':>12}{'内存(MB)':>12}")
+    for item in summary:
+        print(f"{item['mode']:<10}{'是' if item['blocking'] else '否':<6}{item['startup']:>12.2f}{item['page_load']:>14.2f}{item['transfer_kb']:>12.1f}{item['rss_mb']:>12.1f}")
@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+from flask import request, jsonify
+from service.storage.week_archive import get_week_archive
+
+def list_archive_weeks_api():
+    """
+    列出已归档的周
+    """
+    try:
+        weeks = get_week_archive().list_weeks()
+        return jsonify({
+            'success': True,
+            'message': f'共有 {len(weeks)} 周归档',
+            'data': {
+                'weeks': weeks
+            }
+        })
+    except Exception as e:
+        print(f"[归档API] 获取归档周列表失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'获取归档周列表失败: {str(e)}'
+        }), 500
+
+def get_archive_week_api(week):
+    """
+    获取一周的归档帖子，week为ISO周标识，如2026-W42
+    """
+    week_entry = get_week_archive().get_week(week)
+    if not week_entry:
+        return jsonify({
+            'success': False,
+            'message': f'没有该周的归档: {week}'
+        }), 404
+    return jsonify({
+        'success': True,
+        'message': f"{week} 共有 {len(week_entry['items'])} 条帖子",
+        'data': week_entry
+    })
+
+def query_archive_api():
+    """
+    查询归档的帖子
+
+    查询参数:
+        month: 月份（YYYY-MM），与start/end二选一
+        start/end: 日期范围（YYYY-MM-DD，包含）
+        q: 文案或名称中包含的关键字
+        published: 为1时只返回已发布的帖子
+    """
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        month = request.args.get('month')
+        if month:
+            year, month_number = (int(part) for part in month.split('-'))
+            first_day = date(year, month_number, 1)
+            next_month = date(year + month_number // 12, month_number % 12 + 1, 1)
+            start, end = first_day.isoformat(), (next_month - timedelta(days=1)).isoformat()
+
+        items = get_week_archive().query(
+            start=start,
+            end=end,
+            text=request.args.get('q'),
+            published_only=request.args.get('published') == '1'
+        )
+        return jsonify({
+            'success': True,
+            'message': f'找到 {len(items)} 条帖子',
+            'data': {
+                'start': start,
+                'end': end,
+                'items': items
+            }
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'日期参数格式错误: {str(e)}'
+        }), 400
+    except Exception as e:
+        print(f"[归档API] 查询归档失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'查询归档失败: {str(e)}'
+        }), 500
@@ -1,21 +1,56 @@
-import os
-import shutil
+from flask import request, jsonify
+from service.clean.clean_engine import get_clean_engine, STAGE_FOLDERS
 
-def clean_files():
-    """清理所有待处理文件夹"""
-    # 定义基础数据目录
-    base_dir = 'd:/otherWorkspace/ins-robot/data'
-    # 定义需要清理的文件夹
-    folders = ['toGenerate', 'toPS', 'toRefine', 'toPublish', 'temp_ai_images']
-    for folder in folders:
-        path = os.path.join(base_dir, folder)
-        if os.path.exists(path):
-            shutil.rmtree(path)
-        if not os.path.exists(path):
-            os.makedirs(path)
+# 定义基础数据目录
+base_dir = 'd:/otherWorkspace/ins-robot/data'
 
-    # 重建toPublish子文件夹
-    publish_path = os.path.join(base_dir, 'toPublish')
-    for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']:
-        day_path = os.path.join(publish_path, day)
-        os.makedirs(day_path, exist_ok=True)
\ No newline at end of file
+def clean_files_api():
+    """
+    清理待处理文件夹：文件夹移入回收区后立即返回，文件在后台删除
+
+    请求体（可选）:
+        folders: 要清理的文件夹列表，默认为全部阶段文件夹
+        keep_weeks: 本批次在回收区保留的周数，默认读取环境变量CLEAN_KEEP_WEEKS
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        folders = data.get('folders') or STAGE_FOLDERS
+        unknown = [folder for folder in folders if folder not in STAGE_FOLDERS]
+        if unknown:
+            return jsonify({
+                'success': False,
+                'message': f'不支持清理的文件夹: {unknown}'
+            }), 400
+
+        keep_weeks = data.get('keep_weeks')
+        result = get_clean_engine(base_dir).clean(folders, int(keep_weeks) if keep_weeks is not None else None)
+        return jsonify({
+            'success': not result['failed'],
+            'message': '文件已移入回收区，正在后台删除' if not result['failed'] else f"部分文件夹清理失败: {result['failed']}",
+            'data': result
+        }), 200
+    except Exception as e:
+        print(f"[清理API] 清理失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'清理失败: {str(e)}'
+        }), 500
+
+def clean_status_api():
+    """
+    获取清理状态：回收区中的批次和后台删除释放的空间
+    """
+    try:
+        status = get_clean_engine(base_dir).get_status()
+        status['total_reclaimed_mb'] = round(status['total_reclaimed_bytes'] / 1024 / 1024, 2)
+        return jsonify({
+            'success': True,
+            'message': f"回收区中有 {len(status['pending_batches'])} 个批次",
+            'data': status
+        })
+    except Exception as e:
+        print(f"[清理API] 获取清理状态失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'获取清理状态失败: {str(e)}'
+        }), 500
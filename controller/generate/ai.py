@@ -7,6 +7,7 @@ import queue
 import base64
 from datetime import datetime
 from flask import request, jsonify
+from service.storage.blob_store import get_blob_store
 
 # 添加service目录到路径，以便导入ai模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -101,7 +102,7 @@ def image_processor_worker():
                             'data': {
                                 'text_content': text_content,
                                 'image': image_url,
-                                'filename': tops_filename
+                                'filename': ai_result.get('filename')
                             }
                         }
                         
@@ -305,9 +306,8 @@ def generate_ai_image():
                     temp_filepath = os.path.join(temp_dir, temp_filename)
                     temp_filepaths.append(temp_filepath)
                     
-                    # 保存图片到临时文件
-                    with open(temp_filepath, 'wb') as f:
-                        f.write(base64.b64decode(image_data))
+                    # 保存图片到临时文件，重复上传的相同图片在媒体存储中只保存一份
+                    get_blob_store().write_bytes(base64.b64decode(image_data), temp_filepath)
                     
                     print(f"[AI图片生成] 任务 {task_id} - 已保存临时图片文件: {temp_filepath}")
                     
@@ -1,6 +1,7 @@
 import os
 import base64
 import json
+from service.storage.dir_index import get_dir_index
 
 def load_images_from_directory(dir_path, dir_name):
     """
@@ -14,40 +15,40 @@ def load_images_from_directory(dir_path, dir_name):
         tuple: (结果字典, 状态码) 或 结果字典
     """
     try:
-        if not os.path.exists(dir_path):
+        # 从目录索引中获取图片文件
+        files = get_dir_index().listdir(dir_path, extensions=('.png', '.jpg', '.jpeg', '.gif', '.webp'))
+        if files is None:
             return {
                 'success': False,
                 'message': f'{dir_name}图片文件夹不存在',
                 'path': dir_path
             }, 404
         
-        # 扫描文件夹中的图片文件
-        files = os.listdir(dir_path)
         images = []
         
-        for file in files:
-            file_path = os.path.join(dir_path, file)
-            if os.path.isfile(file_path) and file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
-                try:
-                    # 读取图片文件并转换为base64
-                    with open(file_path, 'rb') as f:
-                        image_bytes = f.read()
-                    
-                    # 转换为base64编码
-                    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                    
-                    images.append({
-                        'filename': file,
-                        'data': image_base64,
-                        'size': len(image_bytes),
-                        'size_mb': round(len(image_bytes) / (1024 * 1024), 2)
-                    })
-                    
-                    print(f"[加载{dir_name}图片] 成功加载图片: {file} ({len(image_bytes)} bytes)")
-                    
-                except Exception as e:
-                    print(f"[加载{dir_name}图片] 处理图片 {file} 失败: {str(e)}")
-                    continue
+        for entry in files:
+            file = entry['name']
+            file_path = entry['path']
+            try:
+                # 读取图片文件并转换为base64
+                with open(file_path, 'rb') as f:
+                    image_bytes = f.read()
+                
+                # 转换为base64编码
+                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+                
+                images.append({
+                    'filename': file,
+                    'data': image_base64,
+                    'size': len(image_bytes),
+                    'size_mb': round(len(image_bytes) / (1024 * 1024), 2)
+                })
+                
+                print(f"[加载{dir_name}图片] 成功加载图片: {file} ({len(image_bytes)} bytes)")
+                
+            except Exception as e:
+                print(f"[加载{dir_name}图片] 处理图片 {file} 失败: {str(e)}")
+                continue
         
         print(f"[加载{dir_name}图片] 总共加载了 {len(images)} 张图片")
         
@@ -124,25 +125,47 @@ def get_weekday_images(weekday):
         # 构建媒体文件夹路径
         media_path = os.path.join('d:/otherWorkspace/ins-robot/data/toPublish', weekday)
         
-        if not os.path.exists(media_path):
+        # 从目录索引中获取图片文件和轮播帖子文件夹
+        index = get_dir_index()
+        entries = index.listdir(media_path)
+        if entries is None:
             return {
                 'success': False,
                 'message': f'该星期文件夹不存在: {weekday}',
                 'path': media_path
             }
         
-        # 扫描文件夹中的图片文件
-        files = os.listdir(media_path)
         images = []
         
-        for file in files:
-            file_path = os.path.join(media_path, file)
-            if os.path.isfile(file_path) and file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
+        for entry in entries:
+            file = entry['name']
+            file_path = entry['path']
+            if not entry['is_dir'] and file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
+                size = entry['size']
+                images.append({
+                    'filename': file,
+                    'path': file_path,
+                    'size': size,
+                    'size_mb': round(size / (1024 * 1024), 2),
+                    'carousel': False
+                })
+            elif entry['is_dir']:
+                # 子文件夹为轮播帖子，包含多张图片和caption.txt
+                carousel_images = [{
+                    'filename': image['name'],
+                    'path': image['path'],
+                    'size': image['size']
+                } for image in index.listdir(file_path, extensions=('.png', '.jpg', '.jpeg')) or []]
+                if not carousel_images:
+                    continue
+                size = sum(image['size'] for image in carousel_images)
                 images.append({
                     'filename': file,
                     'path': file_path,
-                    'size': os.path.getsize(file_path),
-                    'size_mb': round(os.path.getsize(file_path) / (1024 * 1024), 2)
+                    'size': size,
+                    'size_mb': round(size / (1024 * 1024), 2),
+                    'carousel': True,
+                    'images': carousel_images
                 })
         
         return {
@@ -193,6 +216,11 @@ def get_text_content(weekday, filename):
         # 构建文本文件路径
         text_path = os.path.join('d:/otherWorkspace/ins-robot/data/toPublish', weekday, filename)
         
+        # 轮播帖子的文案保存在同名文件夹中的caption.txt
+        carousel_text_path = os.path.join(os.path.splitext(text_path)[0], 'caption.txt')
+        if not os.path.exists(text_path) and os.path.exists(carousel_text_path):
+            text_path = carousel_text_path
+        
         if not os.path.exists(text_path):
             return {
                 'success': False,
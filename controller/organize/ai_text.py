@@ -1,5 +1,6 @@
-from flask import request, jsonify
-from service.organize.ai_organize import generate_ai_text
+import json
+from flask import request, jsonify, Response, stream_with_context
+from service.organize.ai_organize import generate_ai_text, stream_ai_text, AI_TEXT_MODEL
 
 def generate_ai_text_api():
     """
@@ -23,22 +24,27 @@ def generate_ai_text_api():
         # 调用AI文案生成函数
         result = generate_ai_text(image_names)
         
-        if result['success']:
-            print(f"[AI文案生成API] AI文案生成成功")
+        # 部分名称生成失败时仍返回其余文案，由页面提示失败的序号
+        if result['success'] or len(result['failed']) < len(result['texts']):
+            print(f"[AI文案生成API] AI文案生成完成，失败 {len(result['failed'])} 个")
             return jsonify({
                 'success': True,
-                'message': 'AI文案生成成功',
-                'texts': result['texts'],  # 直接返回texts字段
-                'total_generated': len(result['texts']),
+                'message': 'AI文案生成成功' if result['success'] else f"部分文案生成失败: {result.get('error', '未知错误')}",
+                'texts': result['texts'],  # 与image_names一一对应
+                'failed': result['failed'],
+                'total_generated': len(result['texts']) - len(result['failed']),
                 'ai_response': result.get('ai_response', ''),
-                'model': 'deepseek-v3-1-terminus'
+                'cache_hits': result.get('cache_hits', 0),
+                'api_calls': result.get('api_calls', 0),
+                'model': AI_TEXT_MODEL
             })
         else:
             print(f"[AI文案生成API] AI文案生成失败: {result.get('error', '未知错误')}")
             return jsonify({
                 'success': False,
                 'message': f'AI文案生成失败: {result.get("error", "未知错误")}',
-                'texts': result['texts'],  # 返回默认文案
+                'texts': result['texts'],
+                'failed': result['failed'],
                 'error': result.get('error', '未知错误')
             }), 500
             
@@ -47,4 +53,43 @@ def generate_ai_text_api():
         return jsonify({
             'success': False,
             'message': f'AI文案生成API处理失败: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+def generate_ai_text_stream_api():
+    """
+    AI文案流式生成API - 通过SSE逐条推送文案，每条文案生成后页面立即填入
+    事件数据为JSON：caption（index、text、source）、error（message）、done（failed、cache_hits、api_calls）
+    """
+    try:
+        data = request.get_json()
+        image_names = data.get('image_names', [])  # 图片名称列表
+        
+        print(f"[AI文案生成API] 收到流式生成请求，图片名称数量: {len(image_names)}")
+        
+        # 验证输入数据
+        if not image_names:
+            return jsonify({
+                'success': False,
+                'message': '请提供图片名称'
+            }), 400
+        
+        def generate_events():
+            try:
+                for event in stream_ai_text(image_names):
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            except Exception as e:
+                print(f"[AI文案生成API] 流式生成失败: {str(e)}")
+                yield f"data: {json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False)}\n\n"
+        
+        return Response(
+            stream_with_context(generate_events()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+            
+    except Exception as e:
+        print(f"[AI文案生成API] 处理失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'AI文案流式生成API处理失败: {str(e)}'
+        }), 500
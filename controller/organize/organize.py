@@ -1,20 +1,28 @@
 import os
-import shutil
 from flask import request, jsonify
+from service.ins_robot.file_management_service import CAROUSEL_CAPTION_FILE, MAX_CAROUSEL_ITEMS
+from service.organize.placement import place_file, get_placement_mode
+from service.storage.blob_store import get_blob_store
 
 def organize_images_api():
     """
     整理图片和文案到星期文件夹
-    每个文件夹放一张图片和一个文案文件
+    单图帖子直接放在星期文件夹中，图片和同名txt文案；
+    多图帖子（image_groups中包含多张图片的组）放在星期文件夹下的子文件夹中，作为轮播帖子发布
     """
     try:
         data = request.get_json()
         
         # 获取参数
         image_names = data.get('image_names', [])  # 图片名称列表
-        texts = data.get('texts', [])  # 文案列表
+        image_groups = data.get('image_groups', [])  # 图片分组列表，每组为一条帖子（可选）
+        texts = data.get('texts', [])  # 文案列表，与帖子一一对应
         
-        if not image_names:
+        # 未分组时每张图片单独作为一条帖子
+        if not image_groups:
+            image_groups = [[image_name] for image_name in image_names]
+        
+        if not image_groups:
             return jsonify({
                 'success': False,
                 'message': '图片名称列表不能为空'
@@ -26,10 +34,16 @@ def organize_images_api():
                 'message': '文案列表不能为空'
             }), 400
         
-        if len(image_names) != len(texts):
+        if len(image_groups) != len(texts):
+            return jsonify({
+                'success': False,
+                'message': f'帖子数量({len(image_groups)})与文案数量({len(texts)})不匹配'
+            }), 400
+        
+        if any(not group or len(group) > MAX_CAROUSEL_ITEMS for group in image_groups):
             return jsonify({
                 'success': False,
-                'message': f'图片数量({len(image_names)})与文案数量({len(texts)})不匹配'
+                'message': f'每条帖子需要1到{MAX_CAROUSEL_ITEMS}张图片'
             }), 400
         
         # 定义星期文件夹列表
@@ -54,10 +68,19 @@ def organize_images_api():
         print("[整理] 星期文件夹清空完成")
         
         organized_files = []
+        # 默认通过媒体存储引用图片（硬链接），也可以指定其他放置方式，都不复制文件内容
+        placement_mode = get_placement_mode(data.get('placement'))
+        blob_store = get_blob_store()
+        placements = {}
         
-        # 遍历图片和文案
-        for i, (image_name, text) in enumerate(zip(image_names, texts)):
-            # 如果图片数量超过7个，循环使用星期文件夹
+        def place(source, target):
+            method = blob_store.place(source, target) if placement_mode == 'auto' else place_file(source, target, placement_mode)
+            placements[method] = placements.get(method, 0) + 1
+            return method
+        
+        # 遍历帖子和文案
+        for i, (group, text) in enumerate(zip(image_groups, texts)):
+            # 如果帖子数量超过5个，循环使用星期文件夹
             weekday = weekdays[i % len(weekdays)]
             
             # 创建星期文件夹
@@ -65,40 +88,59 @@ def organize_images_api():
             os.makedirs(weekday_path, exist_ok=True)
             
             # 源图片路径
-            source_image_path = os.path.join(ps_result_path, image_name)
-            
-            if not os.path.exists(source_image_path):
-                print(f"[整理] 图片不存在: {source_image_path}")
+            source_image_paths = [os.path.join(ps_result_path, image_name) for image_name in group]
+            missing_images = [path for path in source_image_paths if not os.path.exists(path)]
+            if missing_images:
+                print(f"[整理] 图片不存在: {missing_images}")
                 continue
             
-            # 目标图片路径
-            target_image_path = os.path.join(weekday_path, image_name)
-            
             try:
-                # 复制图片到目标文件夹
-                shutil.copy2(source_image_path, target_image_path)
-                print(f"[整理] 复制图片: {image_name} -> {weekday_path}")
-                
-                # 创建对应的文案文件
-                text_filename = f"{os.path.splitext(image_name)[0]}.txt"
-                text_file_path = os.path.join(weekday_path, text_filename)
+                if len(group) == 1:
+                    image_name = group[0]
+                    
+                    # 放置图片到目标文件夹
+                    target_image_path = os.path.join(weekday_path, image_name)
+                    method = place(source_image_paths[0], target_image_path)
+                    print(f"[整理] 放置图片({method}): {image_name} -> {weekday_path}")
+                    
+                    # 创建对应的文案文件
+                    text_filename = f"{os.path.splitext(image_name)[0]}.txt"
+                    text_file_path = os.path.join(weekday_path, text_filename)
+                    target_image_paths = [target_image_path]
+                else:
+                    # 轮播帖子：以第一张图片命名子文件夹，文件名加序号保持图片顺序
+                    image_name = os.path.splitext(group[0])[0]
+                    post_path = os.path.join(weekday_path, image_name)
+                    os.makedirs(post_path, exist_ok=True)
+                    
+                    target_image_paths = []
+                    for index, (source_image_path, name) in enumerate(zip(source_image_paths, group)):
+                        target_image_path = os.path.join(post_path, f"{index + 1:02d}_{name}")
+                        place(source_image_path, target_image_path)
+                        target_image_paths.append(target_image_path)
+                    print(f"[整理] 放置轮播图片: {len(group)} 张 -> {post_path}")
+                    
+                    text_filename = CAROUSEL_CAPTION_FILE
+                    text_file_path = os.path.join(post_path, text_filename)
                 
                 # 写入文案内容
                 with open(text_file_path, 'w', encoding='utf-8') as f:
                     f.write(text)
                 
-                print(f"[整理] 创建文案: {text_filename} -> {weekday_path}")
+                print(f"[整理] 创建文案: {text_filename} -> {os.path.dirname(text_file_path)}")
                 
                 organized_files.append({
                     'weekday': weekday,
                     'image_name': image_name,
                     'text_filename': text_filename,
-                    'image_path': target_image_path,
+                    'image_path': target_image_paths[0] if len(group) == 1 else os.path.dirname(text_file_path),
+                    'image_paths': target_image_paths,
+                    'carousel': len(group) > 1,
                     'text_path': text_file_path
                 })
                 
             except Exception as e:
-                print(f"[整理] 处理文件 {image_name} 失败: {str(e)}")
+                print(f"[整理] 处理帖子 {group} 失败: {str(e)}")
                 continue
         
         if not organized_files:
@@ -113,6 +155,7 @@ def organize_images_api():
             'data': {
                 'total_organized': len(organized_files),
                 'organized_files': organized_files,
+                'placements': placements,
                 'weekdays_used': list(set(f['weekday'] for f in organized_files))
             }
         })
@@ -5,6 +5,7 @@ import cv2
 import numpy as np
 from flask import request, jsonify
 from service.ps.watermark import remove_watermark_inpaint, add_watermark
+from service.storage.blob_store import get_blob_store
 
 def watermark_process_logic():
     """
@@ -53,6 +54,7 @@ def watermark_process_logic():
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 temp_input = os.path.join(result_dir, f'temp_input_{timestamp}_{i}.jpg')
                 temp_output = os.path.join(result_dir, f'temp_output_{timestamp}_{i}.jpg')
+                temp_final = os.path.join(result_dir, f'temp_final_{timestamp}_{i}.jpg')
                 final_output = os.path.join(result_dir, original_filename)
                 
                 # 保存原始图片到临时文件
@@ -65,7 +67,10 @@ def watermark_process_logic():
                 
                 print(f"[水印处理API] 第 {i+1} 步: 添加新水印...")
                 # 第二步：添加新水印
-                add_watermark(temp_output, final_output)
+                # 先写入临时文件再纳入媒体存储：目标文件可能已通过硬链接整理到星期文件夹，不能原地改写
+                add_watermark(temp_output, temp_final)
+                if get_blob_store().ingest(temp_final, final_output) is None:
+                    os.replace(temp_final, final_output)
                 
                 # 读取处理后的图片并转换为base64
                 with open(final_output, 'rb') as f:
@@ -83,7 +88,7 @@ def watermark_process_logic():
                 print(f"[水印处理API] 第 {i+1} 张图片处理完成")
                 
                 # 清理临时文件
-                for temp_file in [temp_input, temp_output]:
+                for temp_file in [temp_input, temp_output, temp_final]:
                     if os.path.exists(temp_file):
                         os.remove(temp_file)
                         
@@ -1,7 +1,17 @@
 import os
-import time
+import uuid
+import threading
 from flask import request, jsonify
 
+# 待发布图片的根目录，下面是Monday到Friday的星期文件夹（星期文件夹中的子文件夹为轮播帖子）
+TO_PUBLISH_DIR = 'd:\\otherWorkspace\\ins-robot\\data\\toPublish'
+PUBLISH_WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+# 批量发布记录，用于断点续发
+batch_records = {}
+# 批量发布记录锁，确保线程安全
+batch_records_lock = threading.Lock()
+
 def read_file_content(file_path):
     """
     读取文件内容
@@ -19,6 +29,63 @@ def read_file_content(file_path):
         print(f"[读取文件] 失败: {str(e)}")
         return ''
 
+def read_caption_for_image(weekday, image_file):
+    """
+    读取星期文件夹中与图片同名的文案文件
+    
+    Args:
+        weekday (str): 星期名称
+        image_file (str): 图片文件名
+        
+    Returns:
+        str: 文案内容，如果文件不存在或读取失败返回空字符串
+    """
+    txt_filename = image_file.rsplit('.', 1)[0] + '.txt'
+    txt_path = os.path.join(TO_PUBLISH_DIR, weekday, txt_filename)
+    print(f"[发布API] 尝试读取文本文件: {txt_path}")
+    
+    if not os.path.exists(txt_path):
+        print(f"[发布API] 文本文件不存在: {txt_path}")
+        return ''
+    
+    content = read_file_content(txt_path)
+    if content:
+        print(f"[发布API] 成功读取文本内容，长度: {len(content)}")
+    else:
+        print(f"[发布API] 读取文本文件失败")
+    return content
+
+def expand_post_path(image_path):
+    """
+    将轮播帖子文件夹展开为按文件名排序的图片路径列表
+    
+    Args:
+        image_path (str): 图片路径或轮播帖子文件夹路径
+        
+    Returns:
+        tuple: (图片路径或图片路径列表, 轮播文件夹中的文案内容)
+    """
+    if not image_path or isinstance(image_path, list) or not os.path.isdir(image_path):
+        return image_path, ''
+    
+    from service.ins_robot.file_management_service import FileManagementService
+    post_name = os.path.basename(os.path.normpath(image_path))
+    posts = FileManagementService().list_posts(os.path.dirname(os.path.normpath(image_path)))
+    post = next((post for post in posts if post['name'] == post_name and post['carousel']), None)
+    if not post:
+        return [], ''
+    
+    print(f"[发布API] 轮播帖子 {post_name}，共 {len(post['images'])} 张图片")
+    content = read_file_content(post['caption_path']) if post['caption_path'] else ''
+    return post['images'], content
+
+def image_paths_exist(image_path):
+    """
+    检查单张图片或轮播帖子的所有图片是否都存在
+    """
+    image_paths = image_path if isinstance(image_path, list) else [image_path]
+    return bool(image_paths) and all(path and os.path.exists(path) for path in image_paths)
+
 def publish_post_api():
     """
     Instagram发布API - 基于test_upload_post.py的实现
@@ -32,12 +99,14 @@ def publish_post_api():
             image_path = data.get('image_path', '')
             image_file = data.get('image_file', '')  # 图片文件名
             weekday = data.get('weekday', '')  # 星期几
+            account_name = data.get('account', '')  # 发布账号
         else:
             # 处理 FormData
             content = request.form.get('content', '')
             image_path = request.form.get('image_path', '')
             image_file = request.form.get('image_file', '')
             weekday = request.form.get('weekday', '')
+            account_name = request.form.get('account', '')
         
         print(f"[发布API] 收到发布请求")
         print(f"[发布API] 内容长度: {len(content)}")
@@ -47,39 +116,31 @@ def publish_post_api():
         
         # 如果没有提供完整路径，尝试构建路径 - 使用toPublish目录而不是media目录
         if not image_path and image_file and weekday:
-            image_path = os.path.join('d:\\otherWorkspace\\ins-robot\\data\\toPublish', weekday, image_file)
+            image_path = os.path.join(TO_PUBLISH_DIR, weekday, image_file)
             print(f"[发布API] 构建图片路径: {image_path}")
         
+        # 轮播帖子文件夹展开为图片列表，文案来自文件夹中的caption.txt
+        image_path, carousel_content = expand_post_path(image_path)
+        content = content or carousel_content
+        
         # 验证图片路径是否存在
-        if image_path and not os.path.exists(image_path):
+        if image_path and not image_paths_exist(image_path):
             return jsonify({
                 'success': False,
                 'message': f'图片文件不存在: {image_path}'
             }), 400
         
         # 如果没有提供内容但提供了weekday和image_file，尝试读取对应的文本文件
-        if not content and weekday and image_file:
-            txt_filename = image_file.rsplit('.', 1)[0] + '.txt'
-            txt_path = os.path.join('d:\\otherWorkspace\\ins-robot\\data\\toPublish', weekday, txt_filename)
-            print(f"[发布API] 尝试读取文本文件: {txt_path}")
-            
-            if os.path.exists(txt_path):
-                content = read_file_content(txt_path)
-                if content:
-                    print(f"[发布API] 成功读取文本内容，长度: {len(content)}")
-                else:
-                    print(f"[发布API] 读取文本文件失败")
-            else:
-                print(f"[发布API] 文本文件不存在: {txt_path}")
+        if not content and weekday and image_file and not isinstance(image_path, list):
+            content = read_caption_for_image(weekday, image_file)
         
         # 开始执行发布流程
         print("[发布API] 开始执行Instagram发布流程...")
         
         # 导入必要的模块
         try:
-            from service.ins_robot.login import InstagramLoginService, get_chrome_options, create_webdriver
-            from service.ins_robot.media_upload_service import MediaUploadService
-            from service.ins_robot.text_processing_service import TextProcessingService
+            from service.ins_robot.publish_worker_pool import get_publish_pool
+            from service.ins_robot.publish_outbox import get_outbox
         except ImportError as e:
             print(f"[发布API] 导入模块失败: {e}")
             return jsonify({
@@ -87,86 +148,42 @@ def publish_post_api():
                 'message': f'导入必要模块失败: {e}'
             }), 500
         
-        driver = None
-        try:
-            # 1. 初始化浏览器
-            print("[发布API] 正在初始化浏览器...")
-            options = get_chrome_options(headless=False)
-            driver = create_webdriver(options)
-            
-            # 2. 登录Instagram
-            print("[发布API] 开始登录Instagram...")
-            login_service = InstagramLoginService()
-            login_success = login_service.login(driver)
-            
-            if not login_success:
-                return jsonify({
-                    'success': False,
-                    'message': 'Instagram登录失败'
-                }), 500
-            
-            # 等待页面完全加载
-            print("[发布API] 登录成功，等待页面完全加载...")
-            time.sleep(5)
-            
-            # 3. 初始化服务类
-            media_service = MediaUploadService(driver)
-            text_service = TextProcessingService(driver)
-            
-            # 4. 点击创建帖子按钮
-            print("[发布API] 尝试点击创建帖子按钮...")
-            create_success = media_service.click_create_post_button()
-            
-            if not create_success:
+        pool = get_publish_pool()
+        if account_name and not pool.registry.get(account_name):
+            return jsonify({
+                'success': False,
+                'message': f'账号不存在: {account_name}'
+            }), 400
+        
+        # 在发件箱中预留幂等键，同一图片在同一账号上只发布一次
+        outbox = get_outbox()
+        outbox_key = None
+        if image_path:
+            entry, created = outbox.reserve(image_path, content, account_name, dispatch='direct')
+            if not created:
                 return jsonify({
                     'success': False,
-                    'message': '点击创建按钮失败'
-                }), 500
-            
-            # 5. 等待上传界面加载
-            print("[发布API] 创建按钮点击成功，等待上传界面...")
-            upload_interface_ready = media_service.wait_for_upload_interface()
-            
-            if not upload_interface_ready:
-                print("[发布API 警告] 上传界面检测失败，但将继续尝试上传")
-            
-            # 6. 上传图片文件
-            print(f"[发布API] 尝试上传图片文件: {image_path}")
-            upload_success = media_service.upload_media(image_path)
+                    'message': f'该图片已有发布记录，状态: {entry["state"]}',
+                    'data': {'outbox': entry}
+                }), 409
+            outbox_key = entry['key']
+        
+        def publish_task(publish_service, account):
+            # 执行创建、上传、文案填充和分享
+            on_progress = outbox.progress_callback(outbox_key) if outbox_key else None
+            return publish_service.publish_one(image_path, content, on_progress)
+        
+        result = {'success': False, 'message': 'Instagram登录失败'}
+        try:
+            # 通过发布工作池执行，保证同一账号不会同时发布，并受Chrome实例上限约束
+            result = pool.submit_task(account_name, publish_task).result()
             
-            if not upload_success:
+            if not result['success']:
                 return jsonify({
                     'success': False,
-                    'message': '文件上传失败'
+                    'message': result['message']
                 }), 500
             
-            print("[发布API] 文件上传成功！")
-            
-            # 7. 点击下一步按钮
-            print("[发布API] 点击下一步按钮...")
-            media_service.go_to_next_step()
-            
-            # 8. 继续点击下一步按钮
-            print("[发布API] 继续点击下一步按钮...")
-            media_service.go_to_next_step()
-            
-            # 9. 处理文本内容
-            if content:
-                print("[发布API] 开始处理文本内容...")
-                # 等待文本框准备就绪
-                text_service.wait_for_textarea_ready()
-                # 处理文本内容（包括标签）
-                processed_content = text_service.process_hashtags(content)
-                # 填充文本框
-                text_service.fill_caption_textarea(processed_content)
-                print("[发布API] 文本内容填充完成")
-            else:
-                print("[发布API] 没有文本内容需要填充")
-            
-            # 10. 点击分享按钮
-            print("[发布API] 点击分享按钮...")
-            media_service.click_share_button()
-            
             print("[发布API] Instagram发布流程执行完成！")
             
             return jsonify({
@@ -175,6 +192,9 @@ def publish_post_api():
                 'data': {
                     'content_length': len(content) if content else 0,
                     'image_path': image_path,
+                    'permalink': result.get('permalink'),
+                    'media_id': result.get('media_id'),
+                    'confirmed': result.get('confirmed', False),
                     'status': 'completed',
                     'details': '完整的Instagram发布流程已执行完成，包括登录、上传、文案填充和发布'
                 }
@@ -182,18 +202,436 @@ def publish_post_api():
             
         except Exception as e:
             print(f"[发布API] 执行发布流程时发生错误: {e}")
+            result = {'success': False, 'message': str(e)}
             return jsonify({
                 'success': False,
                 'message': f'执行发布流程失败: {str(e)}'
             }), 500
         finally:
-            # 注意：这里不关闭浏览器，让用户可以观察结果
-            if driver:
-                print("[发布API] 发布流程结束，浏览器保持打开状态以便观察结果")
-                # driver.quit()  # 暂时不关闭浏览器
+            if outbox_key:
+                outbox.record_result(outbox_key, result)
                 
     except Exception as e:
         return jsonify({
             'success': False,
             'message': f'发布API处理失败: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+def collect_publish_items(weekdays=None):
+    """
+    扫描toPublish目录，收集每个星期文件夹中待发布的帖子（单图或轮播文件夹）
+    
+    Args:
+        weekdays (list): 需要收集的星期列表，默认收集周一到周五
+        
+    Returns:
+        list: 发布条目列表
+    """
+    from service.ins_robot.file_management_service import FileManagementService
+    file_service = FileManagementService(base_dir=TO_PUBLISH_DIR)
+    
+    items = []
+    for weekday in weekdays or PUBLISH_WEEKDAYS:
+        weekday_path = os.path.join(TO_PUBLISH_DIR, weekday)
+        if not os.path.isdir(weekday_path):
+            print(f"[批量发布API] 星期文件夹不存在: {weekday_path}")
+            continue
+        
+        for post in file_service.list_posts(weekday_path):
+            items.append({'weekday': weekday, 'image_file': post['name']})
+    
+    return items
+
+def resolve_publish_item(item):
+    """
+    补全发布条目的图片路径和文案
+    
+    Args:
+        item (dict): 包含weekday、image_file、image_path、content的发布条目，
+            image_file为文件夹名称时作为轮播帖子发布
+        
+    Returns:
+        dict: 补全后的发布条目
+    """
+    weekday = item.get('weekday', '')
+    image_file = item.get('image_file', '')
+    image_path = item.get('image_path', '')
+    content = item.get('content', '')
+    
+    if not image_path and image_file and weekday:
+        image_path = os.path.join(TO_PUBLISH_DIR, weekday, image_file)
+    if not image_file and image_path and not isinstance(image_path, list):
+        image_file = os.path.basename(os.path.normpath(image_path))
+    
+    image_path, carousel_content = expand_post_path(image_path)
+    content = content or carousel_content
+    if not content and weekday and image_file and not isinstance(image_path, list):
+        content = read_caption_for_image(weekday, image_file)
+    
+    return {
+        'weekday': weekday,
+        'image_file': image_file,
+        'image_path': image_path,
+        'content': content
+    }
+
+def reserve_batch_items(items, start_index, account_name, skip_indexes=()):
+    """
+    在发件箱中为批量发布的条目预留幂等键
+    
+    Args:
+        items (list): 发布条目列表
+        start_index (int): 从第几个条目开始发布
+        account_name (str): 发布账号
+        skip_indexes (iterable): 需要跳过的条目序号（续发时已经成功的条目）
+        
+    Returns:
+        tuple: ([(原始序号, 带进度回调的条目)], 已有发布记录而跳过的条目结果列表)
+    """
+    from service.ins_robot.publish_outbox import get_outbox, STATE_SHARED, STATE_VERIFIED
+    outbox = get_outbox()
+    
+    publish_items = []
+    skipped_results = []
+    for index in range(start_index, len(items)):
+        if index in skip_indexes:
+            continue
+        item = items[index]
+        if not image_paths_exist(item['image_path']):
+            # 交给发布流程返回图片不存在的错误
+            publish_items.append((index, dict(item)))
+            continue
+        
+        entry, created = outbox.reserve(item['image_path'], item['content'], account_name, dispatch='direct')
+        if not created:
+            skipped_results.append({
+                'index': index,
+                'weekday': item['weekday'],
+                'image_file': item['image_file'],
+                'image_path': item['image_path'],
+                'success': entry['state'] in (STATE_SHARED, STATE_VERIFIED),
+                'skipped': True,
+                'step': 'outbox',
+                'message': f'该图片已有发布记录，状态: {entry["state"]}'
+            })
+            continue
+        
+        publish_item = dict(item, outbox_key=entry['key'], on_progress=outbox.progress_callback(entry['key']))
+        publish_items.append((index, publish_item))
+    
+    return publish_items, skipped_results
+
+def record_batch_results(publish_items, results):
+    """
+    将工作池返回的结果写回发件箱，并恢复条目在批次中的原始序号
+    
+    Args:
+        publish_items (list): reserve_batch_items返回的待发布条目
+        results (list): 工作池返回的发布结果
+        
+    Returns:
+        list: 使用原始序号的发布结果
+    """
+    from service.ins_robot.publish_outbox import get_outbox
+    outbox = get_outbox()
+    
+    results_by_position = {result['index']: result for result in results}
+    mapped_results = []
+    for position, (index, item) in enumerate(publish_items):
+        result = results_by_position.get(position, {'success': False, 'message': '未执行'})
+        if item.get('outbox_key'):
+            outbox.record_result(item['outbox_key'], result)
+        if position in results_by_position:
+            result['index'] = index
+            mapped_results.append(result)
+    return mapped_results
+
+def publish_batch_api():
+    """
+    Instagram批量发布API
+    在同一个已登录的浏览器会话中依次发布多条帖子，支持部分失败继续发布和断点续发
+    
+    请求参数:
+        items: 发布条目列表[{weekday, image_file, content}]，不提供时发布整个toPublish目录
+        weekdays: 不提供items时需要发布的星期列表
+        batch_id: 需要续发的批次ID，只重新发布未成功的条目，已经成功的条目不会再次发布
+        start_index: 从第几个条目开始发布
+    """
+    try:
+        data = request.get_json() or {}
+        batch_id = data.get('batch_id')
+        start_index = int(data.get('start_index', 0))
+        account_name = data.get('account', '')
+        succeeded_indexes = set()
+        
+        if batch_id:
+            # 续发已有批次：跳过已经成功的条目
+            with batch_records_lock:
+                record = batch_records.get(batch_id)
+            if not record:
+                return jsonify({
+                    'success': False,
+                    'message': f'批次不存在: {batch_id}'
+                }), 404
+            items = record['items']
+            account_name = record['account']
+            with batch_records_lock:
+                succeeded_indexes = {index for index, result in record['results'].items() if result.get('success')}
+            print(f"[批量发布API] 续发批次 {batch_id}，跳过已成功的 {len(succeeded_indexes)} 条")
+        else:
+            raw_items = data.get('items') or collect_publish_items(data.get('weekdays'))
+            items = [resolve_publish_item(item) for item in raw_items]
+            batch_id = str(uuid.uuid4())
+            record = {'items': items, 'account': account_name, 'results': {}, 'next_index': 0}
+            with batch_records_lock:
+                batch_records[batch_id] = record
+            print(f"[批量发布API] 新建批次 {batch_id}，共 {len(items)} 条")
+        
+        if not items:
+            return jsonify({
+                'success': False,
+                'message': '没有需要发布的条目'
+            }), 400
+        
+        if start_index < 0 or start_index >= len(items):
+            return jsonify({
+                'success': False,
+                'message': f'无效的起始条目: {start_index}'
+            }), 400
+        
+        from service.ins_robot.publish_worker_pool import get_publish_pool
+        
+        # 在发件箱中预留每个条目，已经发布过的图片直接跳过
+        publish_items, skipped_results = reserve_batch_items(items, start_index, account_name, succeeded_indexes)
+        
+        results = []
+        if publish_items:
+            # 通过发布工作池执行，保证同一账号不会同时发布
+            pool_result = get_publish_pool().submit(account_name, [item for _, item in publish_items]).result()
+            if not pool_result['results']:
+                record_batch_results(publish_items, [])
+                return jsonify({
+                    'success': False,
+                    'message': pool_result['message'],
+                    'batch_id': batch_id
+                }), 500
+            results = record_batch_results(publish_items, pool_result['results'])
+        results = sorted(results + skipped_results, key=lambda result: result['index'])
+        
+        # 合并本次结果，计算下次续发的起始条目
+        with batch_records_lock:
+            for result in results:
+                record['results'][result['index']] = result
+            failed_indexes = [i for i in range(len(items))
+                              if not record['results'].get(i, {}).get('success')]
+            record['next_index'] = failed_indexes[0] if failed_indexes else len(items)
+            next_index = record['next_index']
+        
+        succeeded = sum(1 for result in results if result['success'])
+        print(f"[批量发布API] 批次 {batch_id} 完成，成功 {succeeded}/{len(results)} 条")
+        
+        return jsonify({
+            'success': not failed_indexes,
+            'message': f'批量发布完成，成功 {succeeded}/{len(results)} 条',
+            'data': {
+                'batch_id': batch_id,
+                'total_items': len(items),
+                'start_index': start_index,
+                'next_index': next_index,
+                'failed_indexes': failed_indexes,
+                'results': results
+            }
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"[批量发布API] 处理失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'批量发布API处理失败: {str(e)}'
+        }), 500
+
+def publish_accounts_api():
+    """
+    多账号并发发布API
+    不同账号在各自独立的Chrome配置中并发发布，同一账号的条目依次发布
+    
+    请求参数:
+        accounts: {账号名称: {items: [...], weekdays: [...]}}
+    """
+    try:
+        data = request.get_json() or {}
+        accounts = data.get('accounts') or {}
+        
+        if not accounts:
+            return jsonify({
+                'success': False,
+                'message': '请提供需要发布的账号'
+            }), 400
+        
+        from service.ins_robot.publish_worker_pool import get_publish_pool
+        pool = get_publish_pool()
+        
+        # 先提交所有账号的任务，再统一等待结果，使不同账号并发执行
+        unknown = [account_name for account_name in accounts if not pool.registry.get(account_name)]
+        if unknown:
+            raise ValueError(f"账号不存在: {', '.join(unknown)}")
+        
+        futures = {}
+        account_results = {}
+        for account_name, account_data in accounts.items():
+            raw_items = account_data.get('items') or collect_publish_items(account_data.get('weekdays'))
+            items = [resolve_publish_item(item) for item in raw_items]
+            # 在发件箱中为每个账号的条目预留幂等键，已经发布过的图片直接跳过
+            publish_items, skipped_results = reserve_batch_items(items, 0, account_name)
+            if publish_items:
+                futures[account_name] = (pool.submit(account_name, [item for _, item in publish_items]),
+                                         publish_items, skipped_results)
+            else:
+                account_results[account_name] = {
+                    'success': all(result['success'] for result in skipped_results),
+                    'message': f'账号 {account_name} 没有需要发布的新条目',
+                    'results': skipped_results
+                }
+        
+        for account_name, (future, publish_items, skipped_results) in futures.items():
+            try:
+                pool_result = future.result()
+            except Exception as e:
+                pool_result = {'success': False, 'message': str(e), 'results': []}
+            # 发布结果写回发件箱，并恢复条目的原始序号
+            results = record_batch_results(publish_items, pool_result['results'])
+            results = sorted(results + skipped_results, key=lambda result: result['index'])
+            account_results[account_name] = dict(
+                pool_result,
+                success=bool(pool_result['results']) and all(result['success'] for result in results),
+                results=results
+            )
+        
+        return jsonify({
+            'success': all(result['success'] for result in account_results.values()),
+            'message': f'{len(account_results)} 个账号发布完成',
+            'data': {
+                'accounts': account_results
+            }
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"[多账号发布API] 处理失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'多账号发布API处理失败: {str(e)}'
+        }), 500
+
+def list_accounts_api():
+    """
+    获取已注册的发布账号和发布工作池状态
+    """
+    try:
+        from service.ins_robot.publish_worker_pool import get_publish_pool
+        from service.ins_robot.browser_watchdog import get_watchdog
+        pool = get_publish_pool()
+        pool.registry.reload()
+        
+        return jsonify({
+            'success': True,
+            'message': f'共有 {len(pool.registry.accounts)} 个账号',
+            'data': {
+                'accounts': pool.registry.list_accounts(),
+                'pool': pool.get_status(),
+                'browsers': get_watchdog().get_status()
+            }
+        })
+    except Exception as e:
+        print(f"[账号列表API] 处理失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'获取账号列表失败: {str(e)}'
+        }), 500
+
+def enqueue_publish_api():
+    """
+    将帖子加入发布发件箱，由后台工作池异步发布，立即返回幂等键和当前状态
+    
+    请求参数:
+        image_path 或 weekday + image_file: 图片或轮播帖子文件夹
+        content: 文案（不提供时读取同名txt文件或轮播文件夹中的caption.txt）
+        account: 发布账号
+    """
+    try:
+        data = request.get_json() or {}
+        item = resolve_publish_item(data)
+        
+        if not image_paths_exist(item['image_path']):
+            return jsonify({
+                'success': False,
+                'message': f'图片文件不存在: {item["image_path"]}'
+            }), 400
+        
+        from service.ins_robot.publish_outbox import get_outbox
+        entry, created = get_outbox().enqueue(item['image_path'], item['content'], data.get('account', ''))
+        
+        return jsonify({
+            'success': True,
+            'message': '已加入发布队列' if created else f'该图片已有发布记录，状态: {entry["state"]}',
+            'data': {
+                'created': created,
+                'outbox': entry
+            }
+        }), 202 if created else 200
+        
+    except Exception as e:
+        print(f"[发布队列API] 处理失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'加入发布队列失败: {str(e)}'
+        }), 500
+
+def list_outbox_api():
+    """
+    获取发布发件箱中的记录，可通过state参数按状态过滤
+    """
+    try:
+        from service.ins_robot.publish_outbox import get_outbox
+        entries = get_outbox().list_entries(request.args.get('state'))
+        return jsonify({
+            'success': True,
+            'message': f'共有 {len(entries)} 条发布记录',
+            'data': {
+                'entries': entries
+            }
+        })
+    except Exception as e:
+        print(f"[发布队列API] 获取记录失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'获取发布记录失败: {str(e)}'
+        }), 500
+
+def get_outbox_entry_api(key):
+    """
+    获取单条发布记录
+    """
+    from service.ins_robot.publish_outbox import get_outbox
+    entry = get_outbox().get(key)
+    if not entry:
+        return jsonify({
+            'success': False,
+            'message': f'发布记录不存在: {key}'
+        }), 404
+    return jsonify({
+        'success': True,
+        'message': '成功获取发布记录',
+        'data': {
+            'outbox': entry
+        }
+    })
@@ -0,0 +1,71 @@
+from flask import request, jsonify
+from service.ins_robot.publish_trace import load_traces, aggregate_step_stats, percentile
+
+
+def list_traces_api():
+    """
+    获取最近的发布追踪记录
+
+    Query参数:
+        limit: 最多返回的记录数，默认50
+        kind: 追踪类型，session或publish（可选）
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
+        traces = load_traces(limit, request.args.get('kind'))
+        return jsonify({
+            'success': True,
+            'message': f'共有 {len(traces)} 条追踪记录',
+            'data': {
+                'traces': traces
+            }
+        })
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'limit参数必须是整数'
+        }), 400
+    except Exception as e:
+        print(f"[发布追踪API] 获取追踪记录失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'获取追踪记录失败: {str(e)}'
+        }), 500
+
+
+def trace_stats_api():
+    """
+    按步骤汇总最近发布追踪的p50/p95耗时和定位策略命中情况
+
+    Query参数:
+        limit: 参与统计的最近记录数，默认500
+        success: 为true时只统计发布成功的记录（可选）
+    """
+    try:
+        limit = int(request.args.get('limit', 500))
+        traces = load_traces(limit)
+        if request.args.get('success') == 'true':
+            traces = [trace for trace in traces if trace.get('success')]
+
+        publish_durations = sorted(trace['duration'] for trace in traces
+                                   if trace.get('kind') == 'publish' and trace.get('success'))
+        return jsonify({
+            'success': True,
+            'message': f'已统计 {len(traces)} 条追踪记录',
+            'data': {
+                'trace_count': len(traces),
+                'publish_p50': percentile(publish_durations, 50),
+                'steps': aggregate_step_stats(traces)
+            }
+        })
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'limit参数必须是整数'
+        }), 400
+    except Exception as e:
+        print(f"[发布追踪API] 统计追踪记录失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'统计追踪记录失败: {str(e)}'
+        }), 500
@@ -0,0 +1,51 @@
+from flask import jsonify
+from service.scheduler.publish_scheduler import get_scheduler, get_next_runs, plan_today_publish
+
+def get_next_runs_api():
+    """
+    获取定时发布任务的下次执行时间
+    """
+    try:
+        scheduler = get_scheduler()
+        jobs = get_next_runs()
+        return jsonify({
+            'success': True,
+            'message': f'共有 {len(jobs)} 个定时任务',
+            'data': {
+                'running': scheduler.running,
+                'jobs': jobs
+            }
+        })
+    except Exception as e:
+        print(f"[定时发布API] 获取任务列表失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'获取定时任务失败: {str(e)}'
+        }), 500
+
+def plan_today_api():
+    """
+    为今天安排发布任务（如果尚未安排）
+    """
+    try:
+        if not get_scheduler().running:
+            return jsonify({
+                'success': False,
+                'message': '调度器未启动'
+            }), 400
+        
+        run_time = plan_today_publish()
+        return jsonify({
+            'success': True,
+            'message': f'今天的发布时间: {run_time}' if run_time else '今天没有需要安排的发布任务',
+            'data': {
+                'run_time': run_time.isoformat() if run_time else None,
+                'jobs': get_next_runs()
+            }
+        })
+    except Exception as e:
+        print(f"[定时发布API] 安排任务失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'安排定时任务失败: {str(e)}'
+        }), 500
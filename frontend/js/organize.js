@@ -25,6 +25,7 @@ class ImageOrganizer {
                 status.textContent = `成功加载 ${this.images.length} 张图片`;
                 
                 this.displayImageNames();
+                this.renderTextInputs();
             } else {
                 status.textContent = '加载失败: ' + result.message;
             }
@@ -54,6 +55,21 @@ class ImageOrganizer {
         namesList.appendChild(listContainer);
     }
 
+    // 每张图片对应一个文案输入框
+    renderTextInputs() {
+        const grid = document.getElementById('textInputsGrid');
+        grid.innerHTML = '';
+        
+        this.images.forEach((image, index) => {
+            const input = document.createElement('input');
+            input.type = 'text';
+            input.className = 'text-input-main';
+            input.id = `textInput${index + 1}`;
+            input.placeholder = `文案${index + 1}（${image.filename}）`;
+            grid.appendChild(input);
+        });
+    }
+
     async generateAllAIText() {
         const btn = document.getElementById('generateAllBtn');
         btn.disabled = true;
@@ -62,54 +78,96 @@ class ImageOrganizer {
         try {
             // 获取所有图片名称
             const imageNames = this.images.map(img => img.filename);
+            let generated = 0;
+            let done = null;
+            let errorMessage = '';
             
-            // 调用AI文案生成API - 使用预设主题，无需用户输入
-            const response = await fetch('/api/generate-ai-text', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    image_names: imageNames
-                })
-            });
-            
-            const result = await response.json();
-            
-            if (result.success) {
-                // 将生成的文案填充到输入框
-                const texts = result.texts;
-                for (let i = 0; i < texts.length && i < 5; i++) {
-                    const input = document.getElementById(`textInput${i + 1}`);
+            // 调用流式生成API，每条文案生成后立即填入对应的输入框
+            await this.readEventStream('/api/generate-ai-text/stream', { image_names: imageNames }, event => {
+                if (event.type === 'caption') {
+                    const input = document.getElementById(`textInput${event.index + 1}`);
                     if (input) {
-                        input.value = texts[i];
+                        input.value = event.text;
                     }
+                    generated++;
+                    btn.innerHTML = `<span class="loading"></span> 生成中 ${generated}/${imageNames.length}`;
+                } else if (event.type === 'error') {
+                    errorMessage = event.message;
+                } else if (event.type === 'done') {
+                    done = event;
                 }
-                alert('AI文案生成成功！已自动生成5条文案并填入输入框');
+            });
+            
+            if (!done) {
+                alert('生成失败: ' + (errorMessage || '连接中断'));
+            } else if (done.failed.length > 0) {
+                alert(`已生成 ${imageNames.length - done.failed.length} 条文案，第 ${done.failed.map(i => i + 1).join(', ')} 条生成失败，请手动填写`);
             } else {
-                alert('生成失败: ' + result.message);
+                alert(`AI文案生成成功！已自动生成 ${imageNames.length} 条文案并填入输入框`);
             }
         } catch (error) {
             console.error('生成AI文案失败:', error);
-            alert('生成失败: 网络错误');
+            alert('生成失败: ' + error.message);
         } finally {
             btn.disabled = false;
             btn.innerHTML = '生成AI文案';
         }
     }
 
+    // 以POST请求读取SSE事件流，每收到一个事件调用一次onEvent
+    async readEventStream(url, body, onEvent) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(body)
+        });
+        
+        if (!response.ok) {
+            const result = await response.json().catch(() => ({}));
+            throw new Error(result.message || `HTTP ${response.status}`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            
+            // 事件之间以空行分隔，最后一段可能不完整，留到下次处理
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+            for (const frame of frames) {
+                const data = frame.split('\n')
+                    .filter(line => line.startsWith('data:'))
+                    .map(line => line.slice(5).trim())
+                    .join('\n');
+                if (data) {
+                    onEvent(JSON.parse(data));
+                }
+            }
+        }
+    }
+
     async organizeImages() {
         const status = document.getElementById('organizeStatus');
         const btn = document.getElementById('organizeBtn');
         
-        // 收集5个输入框的文案
+        // 收集每张图片的文案，没有填写文案的图片不参与整理
+        const imageNames = [];
         const texts = [];
-        for (let i = 1; i <= 5; i++) {
-            const input = document.getElementById(`textInput${i}`);
+        this.images.forEach((image, index) => {
+            const input = document.getElementById(`textInput${index + 1}`);
             if (input && input.value.trim()) {
+                imageNames.push(image.filename);
                 texts.push(input.value.trim());
             }
-        }
+        });
         
         if (texts.length === 0) {
             status.textContent = '请至少输入一个文案';
@@ -125,9 +183,6 @@ class ImageOrganizer {
         status.textContent = '正在整理中...';
         
         try {
-            // 获取图片名称列表（只取前5个）
-            const imageNames = this.images.slice(0, 5).map(img => img.filename);
-            
             const response = await fetch('/api/organize-images', {
                 method: 'POST',
                 headers: {
@@ -147,7 +202,7 @@ class ImageOrganizer {
                         <strong>整理成功！</strong><br>
                         已整理 ${result.data.total_organized} 个文件<br>
                         使用的文件夹: ${result.data.weekdays_used.join(', ')}<br>
-                        每个文件夹包含一张图片和一个文案文件
+                        每条帖子包含图片和对应的文案文件
                     </div>
                 `;
                 alert('整理完成！图片和文案已分布到各星期文件夹中');
@@ -9,6 +9,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const charCount = document.getElementById('char-count');
     const publishBtn = document.getElementById('publish-btn');
     const publishStatus = document.getElementById('publish-status');
+    const publishWeekBtn = document.getElementById('publish-week-btn');
 
 
     let selectedFile = null;
@@ -146,6 +147,50 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // 批量发布：在同一个浏览器会话中发布整个toPublish目录
+    let lastBatchId = null;
+
+    publishWeekBtn.addEventListener('click', function() {
+        publishWeek();
+    });
+
+    async function publishWeek() {
+        publishWeekBtn.disabled = true;
+        publishWeekBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 批量发布中...';
+
+        try {
+            // 上一批次有失败条目时，从第一个失败的条目继续发布
+            const body = lastBatchId ? { batch_id: lastBatchId } : {};
+
+            const response = await fetch('http://localhost:5000/api/publish-batch', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(body)
+            });
+
+            const data = await response.json();
+
+            if (data.success) {
+                lastBatchId = null;
+                showStatus(data.message, 'success');
+                showNotification('本周内容全部发布成功！', 'success');
+            } else if (data.data && data.data.batch_id) {
+                lastBatchId = data.data.batch_id;
+                showStatus(`${data.message}，再次点击将从第 ${data.data.next_index + 1} 条继续发布`, 'error');
+            } else {
+                showNotification('批量发布失败：' + data.message, 'error');
+            }
+        } catch (error) {
+            console.error('批量发布失败:', error);
+            showNotification('批量发布失败，请检查网络连接', 'error');
+        } finally {
+            publishWeekBtn.disabled = false;
+            publishWeekBtn.innerHTML = '<span class="btn-icon">🗓️</span> 发布本周全部';
+        }
+    }
+
     function showStatus(message, type) {
         publishStatus.textContent = message;
         publishStatus.className = `publish-status ${type}`;
@@ -261,7 +306,10 @@ document.addEventListener('DOMContentLoaded', function() {
                     images.forEach(image => {
                         const option = document.createElement('option');
                         option.value = image.filename;
-                        option.textContent = `${image.filename} (${image.size_mb}MB)`;
+                        // 轮播帖子显示图片数量
+                        option.textContent = image.carousel
+                            ? `${image.filename} (轮播 ${image.images.length}张, ${image.size_mb}MB)`
+                            : `${image.filename} (${image.size_mb}MB)`;
                         imageSelect.appendChild(option);
                     });
                     imageSelect.disabled = false;
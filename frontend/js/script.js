@@ -52,10 +52,9 @@ document.addEventListener('DOMContentLoaded', function() {
             if (data.success) {
                 // 显示成功消息，包含详细信息
                 let message = `清理完成！\n\n`;
-                message += `总共清理: ${data.data.total_files_cleaned} 个文件\n`;
-                message += `图片: ${data.data.total_image_files_cleaned} 个\n`;
-                message += `文本: ${data.data.total_text_files_cleaned} 个\n`;
-                message += `释放空间: ${data.data.total_size_cleaned_mb} MB`;
+                message += `已移入回收区: ${data.data.moved.join(', ') || '无'}\n`;
+                message += `归档已发布帖子: ${data.data.kept} 个文件\n`;
+                message += `文件将在后台删除，释放的空间可在清理状态中查看`;
                 
                 alert(message);
             } else {
@@ -0,0 +1,94 @@
+import os
+import sys
+import argparse
+import tempfile
+
+from service.replay.replay_server import ReplayServer
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.abspath(__file__))
+replay_trace_file = os.path.join(base_dir, 'data', 'traces', 'replay_traces.jsonl')
+
+def run_replay(server, mode, image_path, content, runs):
+    """
+    在回放服务器上运行完整的登录和发布流程
+
+    Args:
+        server: 已启动的回放服务器
+        mode: 浏览器模式
+        image_path: 要上传的图片路径，轮播帖子为路径列表
+        content: 帖子文案
+        runs: 在同一会话中连续发布的次数
+
+    Returns:
+        list: 每次发布的结果
+    """
+    # 服务模块在导入时读取INSTAGRAM_BASE_URL，必须在设置环境变量之后再导入
+    os.environ['INSTAGRAM_BASE_URL'] = server.base_url
+    from service.ins_robot.account_registry import InstagramAccount
+    from service.ins_robot.publish_service import PublishService
+    from service.ins_robot.publish_trace import set_trace_file
+    from service.ins_robot.session_store import SessionStore
+
+    # 回放的追踪记录写入独立文件，不影响正式发布的统计
+    set_trace_file(replay_trace_file)
+
+    account = InstagramAccount('replay', 'replay_user', 'replay_password', tempfile.mkdtemp(prefix='replay_profile_'))
+    # 每次回放都从完整登录开始，保证各次测量条件一致
+    SessionStore().delete(account.username)
+
+    publish_service = PublishService(account=account, mode=mode)
+    publish_service.in_use = True
+    results = []
+    try:
+        if not publish_service.start_session():
+            print("[回放测试] 登录失败")
+            return results
+        for _ in range(runs):
+            results.append(publish_service.publish_one(image_path, content))
+    finally:
+        publish_service.close_session()
+        SessionStore().delete(account.username)
+    return results
+
+def print_report(trace_count):
+    """
+    打印本次回放中每个步骤的耗时
+    """
+    from service.ins_robot.publish_trace import load_traces, aggregate_step_stats
+
+    traces = load_traces(trace_count, trace_file=replay_trace_file)
+    stats = aggregate_step_stats(traces)
+
+    print(f"\n{'步骤':<28}{'次数':>6}{'p50(s)':>10}{'p95(s)':>10}{'最大(s)':>10}  定位策略")
+    for name, step in stats.items():
+        print(f"{name:<28}{step['count']:>6}{step['p50']:>10.3f}{step['p95']:>10.3f}{step['max']:>10.3f}  {step['locator_wins'] or ''}")
+
+def main():
+    parser = argparse.ArgumentParser(description='在本地Instagram页面快照上回放发布流程并统计每个步骤的耗时')
+    parser.add_argument('--mode', default='headless', help='浏览器模式（gui/headless/lean），默认headless')
+    parser.add_argument('--image', nargs='+', default=[os.path.join(base_dir, 'data', '1.png')], help='要上传的图片，多张图片作为轮播帖子发布')
+    parser.add_argument('--caption', default='replay caption #replay', help='帖子文案')
+    parser.add_argument('--runs', type=int, default=1, help='在同一会话中连续发布的次数')
+    parser.add_argument('--upload-delay', type=float, default=1.0, help='模拟上传处理的耗时（秒）')
+    parser.add_argument('--share-delay', type=float, default=1.0, help='模拟分享请求的耗时（秒）')
+    parser.add_argument('--port', type=int, default=0, help='回放服务器端口，默认自动分配')
+    args = parser.parse_args()
+
+    server = ReplayServer(port=args.port, upload_delay=args.upload_delay, share_delay=args.share_delay)
+    server.start()
+    try:
+        image_paths = [os.path.abspath(path) for path in args.image]
+        image_path = image_paths if len(image_paths) > 1 else image_paths[0]
+        results = run_replay(server, args.mode, image_path, args.caption, args.runs)
+    finally:
+        server.stop()
+
+    # 会话追踪一条，加上每次发布各一条
+    print_report(len(results) + 1)
+    succeeded = sum(1 for result in results if result['success'])
+    print(f"\n[回放测试] 发布成功 {succeeded}/{args.runs}，服务器收到 {len(server.posts)} 条分享")
+    return 0 if succeeded == args.runs and len(server.posts) == args.runs else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
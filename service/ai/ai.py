@@ -162,9 +162,9 @@ def chat(image_file):
             tops_filename = f"{name}{ext}"
             tops_filepath = os.path.join(tops_dir, tops_filename)
             
-            # 保存图片到toPS目录
-            with open(tops_filepath, 'wb') as f:
-                f.write(base64.b64decode(base64_data))
+            # 保存图片到toPS目录（内容保存在媒体存储中，toPS中为引用）
+            from service.storage.blob_store import get_blob_store
+            get_blob_store().write_bytes(base64.b64decode(base64_data), tops_filepath)
             print(f"图片已保存到toPS目录: {tops_filepath}")
             
         
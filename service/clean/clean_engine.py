@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import shutil
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_data_dir = os.path.join(base_dir, 'data')
+
+# 需要清理的阶段文件夹
+STAGE_FOLDERS = ['toGenerate', 'toPS', 'toRefine', 'toPublish', 'temp_ai_images']
+# 清理后在toPublish下重建的星期文件夹
+WEEKDAY_FOLDERS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+# 回收区中的批次清单文件
+MANIFEST_FILE = 'manifest.json'
+# 后台线程检查保留期限的间隔（秒）
+PURGE_CHECK_INTERVAL = 60 * 60
+
+# 全局清理引擎实例
+_engine = None
+# 清理引擎实例锁
+_engine_lock = threading.Lock()
+
+
+class CleanEngine:
+    """
+    增量清理引擎
+    - 清理时把阶段文件夹原子重命名到回收区（data/trash/<批次>）并重建空文件夹，请求立即返回
+    - 后台线程按保留规则删除回收区中的批次，统计实际释放的空间
+    - 保留规则：回收区保留最近N周的批次（可恢复），已发布的帖子在删除批次时移入周归档（data/archive）
+    """
+
+    def __init__(self, data_dir=None, keep_weeks=None, keep_published=None):
+        """
+        初始化清理引擎
+
+        Args:
+            data_dir: 数据目录，默认为项目的data目录
+            keep_weeks: 回收区保留的周数，默认读取环境变量CLEAN_KEEP_WEEKS（默认0，即尽快删除）
+            keep_published: 是否归档已发布的帖子，默认读取环境变量CLEAN_KEEP_PUBLISHED（默认归档）
+        """
+        load_dotenv()
+        self.data_dir = data_dir or default_data_dir
+        self.trash_dir = os.path.join(self.data_dir, 'trash')
+        self.keep_weeks = keep_weeks if keep_weeks is not None else int(os.getenv('CLEAN_KEEP_WEEKS', 0))
+        if keep_published is None:
+            keep_published = os.getenv('CLEAN_KEEP_PUBLISHED', '1').lower() not in ('0', 'false', 'off')
+        self.keep_published = keep_published
+        self.stats = {
+            'total_reclaimed_bytes': 0,
+            'total_purged_files': 0,
+            'total_kept_files': 0,
+            'last_purge': None
+        }
+        self.purging = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        启动后台删除线程（同时继续处理上次运行中没有删除完的批次）
+        """
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='clean-engine', daemon=True)
+            self._thread.start()
+        print("[清理引擎] 后台删除线程已启动")
+
+    @staticmethod
+    def _published_keys():
+        """
+        获取发件箱中已发布帖子的幂等键和发布过的账号
+        """
+        from service.ins_robot.publish_outbox import get_outbox, STATE_SHARED, STATE_VERIFIED
+
+        keys = set()
+        accounts = set()
+        for entry in get_outbox().list_entries():
+            if entry['state'] in (STATE_SHARED, STATE_VERIFIED):
+                keys.add(entry['key'])
+                accounts.add(entry['account'])
+        return keys, accounts
+
+    def _keep_list(self, folders):
+        """
+        计算需要保留的已发布帖子（单图为图片文件，轮播为文件夹），路径相对于数据目录
+        按内容哈希+账号匹配发件箱的幂等键，同一路径上的新内容不会被误认为已发布，重命名过的已发布帖子也能找到
+        """
+        if not self.keep_published or 'toPublish' not in folders:
+            return []
+        keys, accounts = self._published_keys()
+        if not keys:
+            return []
+
+        from service.ins_robot.file_management_service import FileManagementService
+        from service.ins_robot.publish_outbox import PublishOutbox
+
+        publish_dir = os.path.join(self.data_dir, 'toPublish')
+        file_service = FileManagementService(base_dir=publish_dir)
+        keep = []
+        for weekday in file_service.weekday_folders + ['Saturday', 'Sunday']:
+            for post in file_service.list_posts(os.path.join(publish_dir, weekday)):
+                try:
+                    content_hash = PublishOutbox.content_hash(post['images'] if post['carousel'] else post['images'][0])
+                except OSError as e:
+                    print(f"[清理引擎] 计算内容哈希失败: {post['name']}, {e}")
+                    continue
+                if any(PublishOutbox.key_for_hash(content_hash, account) in keys for account in accounts):
+                    path = os.path.dirname(post['images'][0]) if post['carousel'] else post['images'][0]
+                    keep.append(os.path.relpath(path, self.data_dir))
+        return keep
+
+    def clean(self, folders=None, keep_weeks=None):
+        """
+        清理阶段文件夹：重命名到回收区后立即返回，文件在后台删除
+
+        Args:
+            folders: 要清理的文件夹，默认为全部阶段文件夹
+            keep_weeks: 本批次在回收区保留的周数（可选，默认使用引擎设置）
+
+        Returns:
+            dict: 批次信息（batch_id、moved、failed、keep_until）
+        """
+        from service.storage.dir_index import get_dir_index
+
+        folders = folders or STAGE_FOLDERS
+        keep_weeks = self.keep_weeks if keep_weeks is None else keep_weeks
+        now = time.time()
+        batch_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        batch_dir = os.path.join(self.trash_dir, batch_id)
+        os.makedirs(batch_dir, exist_ok=True)
+
+        manifest = {
+            'batch_id': batch_id,
+            'created_at': now,
+            'keep_until': now + keep_weeks * 7 * 24 * 60 * 60,
+            'keep': self._keep_list(folders),
+            'moved': [],
+            'failed': {}
+        }
+
+        for folder in folders:
+            path = os.path.join(self.data_dir, folder)
+            if os.path.exists(path) and os.listdir(path):
+                try:
+                    # 先取消目录索引对该文件夹的监听，Windows上被监听的目录无法重命名
+                    get_dir_index().release(path)
+                    # 同一卷上的重命名是原子操作，与文件数量和大小无关
+                    os.rename(path, os.path.join(batch_dir, folder))
+                    manifest['moved'].append(folder)
+                except OSError as e:
+                    print(f"[清理引擎] 移动文件夹 {folder} 失败: {e}")
+                    manifest['failed'][folder] = str(e)
+            os.makedirs(path, exist_ok=True)
+
+        # 重建toPublish子文件夹
+        if 'toPublish' in folders:
+            for day in WEEKDAY_FOLDERS:
+                os.makedirs(os.path.join(self.data_dir, 'toPublish', day), exist_ok=True)
+
+        self._write_manifest(batch_dir, manifest)
+        print(f"[清理引擎] 批次 {batch_id} 已移入回收区: {manifest['moved']}，待归档的已发布文件 {len(manifest['keep'])} 个")
+
+        self.start()
+        self._wakeup.set()
+        return {
+            'batch_id': batch_id,
+            'moved': manifest['moved'],
+            'failed': manifest['failed'],
+            'kept': len(manifest['keep']),
+            'keep_until': manifest['keep_until']
+        }
+
+    @staticmethod
+    def _write_manifest(batch_dir, manifest):
+        manifest_path = os.path.join(batch_dir, MANIFEST_FILE)
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, manifest_path)
+
+    def _list_batches(self):
+        """
+        读取回收区中的所有批次清单，按创建时间排序
+        """
+        if not os.path.exists(self.trash_dir):
+            return []
+        batches = []
+        for name in sorted(os.listdir(self.trash_dir)):
+            manifest_path = os.path.join(self.trash_dir, name, MANIFEST_FILE)
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    batches.append(json.load(f))
+            except Exception:
+                # 没有清单的批次（如写入清单前中断）立即删除，不保留文件
+                batches.append({'batch_id': name, 'created_at': 0, 'keep_until': 0, 'keep': []})
+        return batches
+
+    def _keep_published(self, batch_dir, batch):
+        """
+        把批次中已发布的帖子移入周归档
+
+        Returns:
+            int: 归档的文件数量
+        """
+        publish_dir = os.path.join(batch_dir, 'toPublish')
+        keep = batch.get('keep', [])
+        if not keep or not os.path.isdir(publish_dir):
+            return 0
+
+        from service.storage.week_archive import get_week_archive
+
+        keep = {os.path.normcase(relative) for relative in keep}
+
+        def is_published(post):
+            path = os.path.dirname(post['images'][0]) if post['carousel'] else post['images'][0]
+            return os.path.normcase(os.path.relpath(path, batch_dir)) in keep
+
+        # 没有发布时间的帖子归入清理批次所在的周
+        result = get_week_archive().archive_folder(publish_dir, reference_time=batch.get('created_at'), include=is_published)
+        return result['files'] if result else 0
+
+    def _purge_batch(self, batch):
+        """
+        删除一个批次，只统计真正释放的空间（仍被其他硬链接引用的文件不计入）
+
+        Returns:
+            dict: 删除的文件数量、保留的文件数量和释放的字节数
+        """
+        batch_id = batch['batch_id']
+        batch_dir = os.path.join(self.trash_dir, batch_id)
+        self.purging = batch_id
+        kept = self._keep_published(batch_dir, batch)
+
+        files = 0
+        reclaimed = 0
+        for root, _, names in os.walk(batch_dir, topdown=False):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.lstat(path)
+                    os.remove(path)
+                except OSError as e:
+                    print(f"[清理引擎] 删除文件失败: {path}, {e}")
+                    continue
+                files += 1
+                if stat.st_nlink <= 1:
+                    reclaimed += stat.st_size
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        self.purging = None
+        return {'batch_id': batch_id, 'files': files, 'kept': kept, 'reclaimed_bytes': reclaimed, 'purged_at': time.time()}
+
+    def purge_expired(self):
+        """
+        删除回收区中超过保留期限的批次，并清理不再被引用的媒体存储内容
+
+        Returns:
+            list: 每个被删除批次的统计
+        """
+        results = []
+        now = time.time()
+        for batch in self._list_batches():
+            if batch.get('keep_until', 0) > now:
+                continue
+            result = self._purge_batch(batch)
+            results.append(result)
+            print(f"[清理引擎] 批次 {result['batch_id']} 删除完成: {result['files']} 个文件，"
+                  f"归档已发布文件 {result['kept']} 个，释放 {result['reclaimed_bytes'] / 1024 / 1024:.1f} MB")
+
+        if results:
+            # 阶段文件删除后，媒体存储中不再被引用的内容才真正释放空间
+            from service.storage.blob_store import get_blob_store
+            blob_result = get_blob_store().gc()
+            with self._lock:
+                for result in results:
+                    self.stats['total_reclaimed_bytes'] += result['reclaimed_bytes']
+                    self.stats['total_purged_files'] += result['files']
+                    self.stats['total_kept_files'] += result['kept']
+                self.stats['total_reclaimed_bytes'] += blob_result['reclaimed_bytes']
+                self.stats['last_purge'] = dict(results[-1], blob_reclaimed_bytes=blob_result['reclaimed_bytes'])
+        return results
+
+    def _run(self):
+        while True:
+            try:
+                self.purge_expired()
+            except Exception as e:
+                print(f"[清理引擎] 后台删除失败: {e}")
+            self._wakeup.wait(PURGE_CHECK_INTERVAL)
+            self._wakeup.clear()
+
+    def get_status(self):
+        """
+        获取清理状态
+
+        Returns:
+            dict: 回收区中的批次、正在删除的批次和累计释放的空间
+        """
+        with self._lock:
+            status = dict(self.stats)
+        status['pending_batches'] = [{
+            'batch_id': batch['batch_id'],
+            'created_at': batch.get('created_at'),
+            'keep_until': batch.get('keep_until'),
+            'moved': batch.get('moved', []),
+            'kept': len(batch.get('keep', []))
+        } for batch in self._list_batches()]
+        status['purging'] = self.purging
+        status['keep_weeks'] = self.keep_weeks
+        status['keep_published'] = self.keep_published
+        return status
+
+
+def get_clean_engine(data_dir=None):
+    """
+    获取全局清理引擎实例
+
+    Args:
+        data_dir: 数据目录（只在第一次创建时使用）
+
+    Returns:
+        CleanEngine: 清理引擎
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = CleanEngine(data_dir)
+        return _engine
@@ -0,0 +1,125 @@
+import os
+import json
+from dotenv import load_dotenv
+from service.ins_robot.login import get_chrome_profile_path
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_accounts_file = os.path.join(base_dir, 'data', 'accounts.json')
+
+DEFAULT_ACCOUNT = 'default'
+
+
+class InstagramAccount:
+    """
+    Instagram账号信息，每个账号使用独立的Chrome用户数据目录
+    """
+
+    def __init__(self, name, username, password, profile_dir=None):
+        """
+        初始化账号信息
+
+        Args:
+            name: 账号在系统中的名称
+            username: Instagram用户名
+            password: Instagram密码
+            profile_dir: 独立的Chrome用户数据目录（为None时使用默认的selenium_profile）
+        """
+        self.name = name
+        self.username = username
+        self.password = password
+        self.profile_dir = profile_dir
+
+    def to_dict(self):
+        """
+        转换为可返回给前端的字典（不包含密码）
+        """
+        return {
+            'name': self.name,
+            'username': self.username,
+            'profile_dir': self.profile_dir,
+            'has_password': bool(self.password)
+        }
+
+
+class AccountRegistry:
+    """
+    账号注册表，读取data/accounts.json中的多账号配置
+
+    配置格式:
+        {"accounts": [{"name": "brand_a", "username": "xxx", "password_env": "IG_PASSWORD_BRAND_A"}]}
+
+    密码只通过环境变量引用，不直接写在配置文件中。.env中的IG_USERNAME/IG_PASSWORD
+    始终作为名为default的账号注册，并继续使用原有的selenium_profile目录。
+    """
+
+    def __init__(self, accounts_file=None):
+        """
+        初始化账号注册表
+
+        Args:
+            accounts_file: 账号配置文件路径，默认为data/accounts.json
+        """
+        self.accounts_file = accounts_file or default_accounts_file
+        self.accounts = {}
+        self.reload()
+
+    def reload(self):
+        """
+        重新加载账号配置
+        """
+        load_dotenv()
+        accounts = {}
+
+        default_username = os.getenv('IG_USERNAME')
+        if default_username:
+            accounts[DEFAULT_ACCOUNT] = InstagramAccount(
+                DEFAULT_ACCOUNT, default_username, os.getenv('IG_PASSWORD')
+            )
+
+        if os.path.exists(self.accounts_file):
+            try:
+                with open(self.accounts_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                for item in config.get('accounts', []):
+                    name = item['name']
+                    accounts[name] = InstagramAccount(
+                        name,
+                        item.get('username') or os.getenv(item.get('username_env', '')),
+                        os.getenv(item.get('password_env', '')),
+                        # 每个账号独立的Chrome配置目录，避免cookie和登录状态互相覆盖
+                        item.get('profile_dir') or os.path.join(get_chrome_profile_root(), name)
+                    )
+            except Exception as e:
+                print(f"[账号注册表] 读取账号配置失败: {e}")
+
+        self.accounts = accounts
+        print(f"[账号注册表] 已加载 {len(accounts)} 个账号: {list(accounts.keys())}")
+
+    def get(self, name=None):
+        """
+        获取账号信息
+
+        Args:
+            name: 账号名称，为空时返回default账号
+
+        Returns:
+            InstagramAccount: 账号信息，如果不存在则返回None
+        """
+        return self.accounts.get(name or DEFAULT_ACCOUNT)
+
+    def list_accounts(self):
+        """
+        获取所有账号信息
+
+        Returns:
+            list: 账号信息字典列表
+        """
+        return [account.to_dict() for account in self.accounts.values()]
+
+
+def get_chrome_profile_root():
+    """
+    获取存放各账号独立Chrome配置目录的根目录
+    """
+    return get_chrome_profile_path() + "_accounts"
@@ -0,0 +1,331 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+import psutil
+from dotenv import load_dotenv
+
+from service.ins_robot.login import get_chrome_profile_path
+
+# 监控线程的检查间隔（秒）
+WATCHDOG_INTERVAL = 5
+# 会话存活时间和内存占用的默认上限，超过后在两次发布之间重建会话
+DEFAULT_MAX_SESSION_AGE_MINUTES = 60
+DEFAULT_MAX_SESSION_RSS_MB = 1500
+# 没有正在执行的操作时，会话空闲超过该时间会被回收（秒）
+IDLE_TIMEOUT = 5 * 60
+# 各类操作的默认期限（秒）
+OPERATION_DEADLINES = {
+    'start_session': 180,
+    'publish_one': 600,
+    'find_recent_post': 180
+}
+
+# 全局监控实例
+_watchdog = None
+# 监控实例锁
+_watchdog_lock = threading.Lock()
+
+
+def get_process_tree(pid):
+    """
+    获取进程及其所有子进程
+
+    Returns:
+        list: psutil.Process列表，进程不存在时返回空列表
+    """
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def kill_process_tree(pid):
+    """
+    结束进程及其所有子进程（chromedriver、Chrome浏览器和渲染进程）
+
+    Returns:
+        int: 结束的进程数量
+    """
+    processes = get_process_tree(pid)
+    for process in processes:
+        try:
+            process.kill()
+        except psutil.Error:
+            continue
+    psutil.wait_procs(processes, timeout=5)
+    return len(processes)
+
+
+def get_profile_dirs():
+    """
+    获取本项目使用的所有Chrome配置目录：默认的selenium_profile（各账号默认目录也在其下）和账号配置中自定义的目录
+    """
+    from service.ins_robot.account_registry import AccountRegistry
+
+    profile_dirs = {get_chrome_profile_path()}
+    for account in AccountRegistry().accounts.values():
+        if account.profile_dir:
+            profile_dirs.add(account.profile_dir)
+    return profile_dirs
+
+
+def kill_orphan_chrome(profile_dirs=None):
+    """
+    结束上次运行遗留的Chrome进程：使用本项目Chrome配置目录、但所属chromedriver已经不存在的进程树
+    只处理使用本项目配置目录的Chrome，chromedriver只有在是这类Chrome的父进程时才会被结束，不影响其他项目和用户的浏览器
+    应在服务启动时、创建任何浏览器之前调用
+
+    Args:
+        profile_dirs: 本项目的Chrome配置目录（可选，默认为所有已注册账号的配置目录）
+
+    Returns:
+        int: 结束的进程数量
+    """
+    profile_dirs = profile_dirs or get_profile_dirs()
+    orphans = {}
+    for process in psutil.process_iter(['pid', 'name', 'cmdline']):
+        try:
+            name = (process.info['name'] or '').lower()
+            cmdline = ' '.join(process.info['cmdline'] or [])
+            # 只看使用本项目配置目录的浏览器主进程
+            if 'chrome' not in name or 'chromedriver' in name or '--type=' in cmdline \
+                    or not any(profile_dir in cmdline for profile_dir in profile_dirs):
+                continue
+            parent = process.parent()
+            if parent is not None and 'chromedriver' in (parent.name() or '').lower():
+                # 由chromedriver启动：chromedriver的父进程（上次运行的服务）已经退出时结束整个chromedriver进程树
+                if psutil.pid_exists(parent.ppid()) and parent.ppid() != 1:
+                    continue
+                orphans[parent.pid] = parent.name()
+            else:
+                # 父进程不是chromedriver即视为遗留进程
+                orphans[process.pid] = process.info['name']
+        except psutil.Error:
+            continue
+
+    killed = 0
+    for pid, name in orphans.items():
+        print(f"[浏览器监控] 结束遗留的浏览器进程树 {pid} ({name})")
+        killed += kill_process_tree(pid)
+
+    print(f"[浏览器监控] 启动清理完成，共结束 {killed} 个遗留进程")
+    return killed
+
+
+class BrowserWatchdog:
+    """
+    浏览器监控，跟踪每个发布会话的Chrome进程树
+    - 为会话上的操作设置期限，超时后结束进程树，使阻塞的WebDriver调用立即报错返回
+    - 统计进程树的内存占用和子进程数量，超过存活时间或内存上限的会话在两次发布之间重建
+    - 空闲过久的会话：正在被工作线程使用（in_use）时只请求重建，由该线程在下一次发布前关闭；
+      没有工作线程使用时直接关闭
+    """
+
+    def __init__(self, max_age=None, max_rss=None, interval=WATCHDOG_INTERVAL):
+        """
+        初始化浏览器监控
+
+        Args:
+            max_age: 会话最长存活时间（秒），默认读取环境变量BROWSER_MAX_AGE_MINUTES
+            max_rss: 会话进程树内存上限（字节），默认读取环境变量BROWSER_MAX_RSS_MB
+            interval: 监控检查间隔（秒）
+        """
+        load_dotenv()
+        self.max_age = max_age or int(os.getenv('BROWSER_MAX_AGE_MINUTES', DEFAULT_MAX_SESSION_AGE_MINUTES)) * 60
+        self.max_rss = max_rss or int(os.getenv('BROWSER_MAX_RSS_MB', DEFAULT_MAX_SESSION_RSS_MB)) * 1024 * 1024
+        self.interval = interval
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """
+        启动后台监控线程
+        """
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='browser-watchdog', daemon=True)
+            self._thread.start()
+        print("[浏览器监控] 监控线程已启动")
+
+    def register(self, publish_service):
+        """
+        登记一个已经创建浏览器的发布会话
+        """
+        try:
+            pid = publish_service.driver.service.process.pid
+        except Exception:
+            pid = None
+        now = time.time()
+        with self._lock:
+            self.sessions[id(publish_service)] = {
+                'service': publish_service,
+                'pid': pid,
+                'account': publish_service.account.name if publish_service.account else None,
+                'mode': publish_service.mode,
+                'started_at': now,
+                'last_active_at': now,
+                'operation': None,
+                'deadline': None,
+                'recycle_reason': None,
+                'rss': 0,
+                'processes': 0
+            }
+        self.start()
+
+    def unregister(self, publish_service):
+        """
+        会话关闭后取消登记
+
+        Returns:
+            dict: 被取消的会话记录，不存在时返回None
+        """
+        with self._lock:
+            return self.sessions.pop(id(publish_service), None)
+
+    @contextmanager
+    def deadline(self, publish_service, operation, seconds=None):
+        """
+        为会话上的一个操作设置期限，超时后监控线程会结束该会话的浏览器进程树
+        """
+        seconds = seconds or OPERATION_DEADLINES.get(operation, 300)
+        with self._lock:
+            session = self.sessions.get(id(publish_service))
+            if session:
+                session['operation'] = operation
+                session['deadline'] = time.time() + seconds
+        try:
+            yield
+        finally:
+            with self._lock:
+                session = self.sessions.get(id(publish_service))
+                if session:
+                    session['operation'] = None
+                    session['deadline'] = None
+                    session['last_active_at'] = time.time()
+
+    def should_recycle(self, publish_service):
+        """
+        判断会话是否超过存活时间或内存上限，或者监控线程已请求重建（如空闲过久）
+
+        Returns:
+            str: 需要重建的原因，不需要时返回None
+        """
+        with self._lock:
+            session = self.sessions.get(id(publish_service))
+            if not session:
+                return None
+            pid = session['pid']
+            age = time.time() - session['started_at']
+            recycle_reason = session['recycle_reason']
+
+        if recycle_reason:
+            return recycle_reason
+        if age > self.max_age:
+            return f'会话已运行 {age / 60:.0f} 分钟'
+        rss = self._measure(pid)[0]
+        if rss > self.max_rss:
+            return f'浏览器内存占用 {rss / 1024 / 1024:.0f} MB'
+        return None
+
+    def kill_session(self, publish_service, reason):
+        """
+        强制结束会话的浏览器进程树
+        """
+        with self._lock:
+            session = self.sessions.get(id(publish_service))
+            pid = session['pid'] if session else None
+        if pid:
+            print(f"[浏览器监控] {reason}，结束浏览器进程树 {pid}")
+            kill_process_tree(pid)
+
+    @staticmethod
+    def _measure(pid):
+        """
+        统计进程树的常驻内存总量和进程数量
+        """
+        processes = get_process_tree(pid) if pid else []
+        rss = 0
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss, len(processes)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[浏览器监控] 检查失败: {e}")
+
+    def check(self):
+        """
+        检查所有会话：结束超过操作期限的会话，回收长时间空闲的会话，更新内存统计
+        """
+        now = time.time()
+        with self._lock:
+            sessions = list(self.sessions.values())
+
+        for session in sessions:
+            rss, processes = self._measure(session['pid'])
+            session['rss'] = rss
+            session['processes'] = processes
+            publish_service = session['service']
+
+            if session['deadline'] and now > session['deadline']:
+                # 结束进程树后，阻塞中的WebDriver调用会因连接断开而报错，调用线程随之返回
+                self.kill_session(publish_service, f"操作 {session['operation']} 超过期限")
+                self.unregister(publish_service)
+            elif session['pid'] and processes == 0:
+                print(f"[浏览器监控] 账号 {session['account']} 的浏览器进程已退出")
+                self.unregister(publish_service)
+            elif not session['operation'] and not session['recycle_reason'] \
+                    and now - session['last_active_at'] > IDLE_TIMEOUT:
+                reason = f"会话空闲超过 {IDLE_TIMEOUT // 60} 分钟"
+                if getattr(publish_service, 'in_use', False):
+                    # 工作线程可能正处于两次操作之间，不能在监控线程中关闭，由该线程在下一次发布前重建
+                    print(f"[浏览器监控] 账号 {session['account']} 的{reason}，请求重建会话")
+                    session['recycle_reason'] = reason
+                else:
+                    print(f"[浏览器监控] 账号 {session['account']} 的{reason}且没有工作线程使用，关闭浏览器")
+                    publish_service.close_session()
+
+    def get_status(self):
+        """
+        获取所有会话的监控状态
+
+        Returns:
+            list: 每个会话的账号、进程、内存和当前操作
+        """
+        now = time.time()
+        with self._lock:
+            return [{
+                'account': session['account'],
+                'pid': session['pid'],
+                'mode': session['mode'],
+                'age': round(now - session['started_at']),
+                'rss_mb': round(session['rss'] / 1024 / 1024, 1),
+                'processes': session['processes'],
+                'operation': session['operation'],
+                'deadline_in': round(session['deadline'] - now) if session['deadline'] else None
+            } for session in self.sessions.values()]
+
+
+def get_watchdog():
+    """
+    获取全局浏览器监控实例
+
+    Returns:
+        BrowserWatchdog: 浏览器监控
+    """
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = BrowserWatchdog()
+        return _watchdog
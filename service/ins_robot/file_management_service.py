@@ -1,6 +1,14 @@
 import os
 import shutil
 from datetime import datetime, timedelta
+from service.storage.dir_index import get_dir_index
+
+# 可以发布的图片格式
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# 轮播帖子文件夹中的文案文件名
+CAROUSEL_CAPTION_FILE = "caption.txt"
+# Instagram单条轮播帖子最多包含的图片数量
+MAX_CAROUSEL_ITEMS = 10
 
 class FileManagementService:
     """
@@ -20,7 +28,7 @@ class FileManagementService:
     def create_weekly_folder_structure(self):
         """
         创建每周的文件夹结构
-        - 首先删除旧的文件夹内容（如果存在）
+        - 首先把旧的帖子移入周归档，再删除剩余内容（如果存在）
         - 直接在base_dir下创建周一至周五的子文件夹
         
         Returns:
@@ -29,9 +37,13 @@ class FileManagementService:
         try:
             print(f"[文件管理服务] 开始创建每周文件夹结构")
             
-            # 删除旧的media文件夹内容（如果存在）
+            # 旧的帖子移入周归档，再删除剩余内容（如果存在）
             if os.path.exists(self.base_dir):
+                from service.storage.week_archive import get_week_archive
+                get_week_archive().archive_folder(self.base_dir)
                 print(f"[文件管理服务] 删除旧的media文件夹内容（如果存在）: {self.base_dir}")
+                # 删除前取消目录索引的监听，Windows上被监听的目录无法删除
+                get_dir_index().release(self.base_dir)
                 shutil.rmtree(self.base_dir)
             
             # 创建base_dir
@@ -91,19 +103,15 @@ class FileManagementService:
             images = []
             texts = []
             
-            # 遍历今天的文件夹
-            for file in os.listdir(today_folder):
-                file_path = os.path.join(today_folder, file)
+            # 从目录索引中遍历今天的文件夹
+            for entry in get_dir_index().listdir(today_folder, files_only=True) or []:
+                # 检查文件扩展名
+                _, ext = os.path.splitext(entry['name'].lower())
                 
-                # 检查是否为文件
-                if os.path.isfile(file_path):
-                    # 检查文件扩展名
-                    _, ext = os.path.splitext(file.lower())
-                    
-                    if ext in [".jpg", ".jpeg", ".png"]:
-                        images.append(file_path)
-                    elif ext == ".txt":
-                        texts.append(file_path)
+                if ext in [".jpg", ".jpeg", ".png"]:
+                    images.append(entry['path'])
+                elif ext == ".txt":
+                    texts.append(entry['path'])
             
             print(f"[文件管理服务] 找到 {len(images)} 个图片文件和 {len(texts)} 个文案文件")
             return {"images": images, "texts": texts}
@@ -111,6 +119,67 @@ class FileManagementService:
             print(f"[文件管理服务] 获取媒体文件时出错: {e}")
             return {"images": [], "texts": []}
     
+    def list_posts(self, folder_path):
+        """
+        列出星期文件夹中的待发布帖子
+        - 单图帖子：星期文件夹中的图片文件，文案为同名txt文件
+        - 轮播帖子：星期文件夹中的子文件夹，包含多张图片（按文件名排序）和caption.txt文案
+        
+        Args:
+            folder_path: 星期文件夹路径
+            
+        Returns:
+            list: 帖子列表，每个帖子为{"name", "carousel", "images": [图片路径列表], "caption_path"}
+        """
+        posts = []
+        index = get_dir_index()
+        entries = index.listdir(folder_path)
+        if entries is None:
+            return posts
+        names = {entry['name'] for entry in entries}
+        
+        for entry in entries:
+            name = entry['name']
+            path = entry['path']
+            if entry['is_dir']:
+                images = [image['path'] for image in index.listdir(path, extensions=IMAGE_EXTENSIONS) or []]
+                if not images:
+                    continue
+                if len(images) > MAX_CAROUSEL_ITEMS:
+                    print(f"[文件管理服务] 轮播帖子 {name} 有 {len(images)} 张图片，只发布前 {MAX_CAROUSEL_ITEMS} 张")
+                    images = images[:MAX_CAROUSEL_ITEMS]
+                caption_path = os.path.join(path, CAROUSEL_CAPTION_FILE)
+                posts.append({
+                    "name": name,
+                    "carousel": True,
+                    "images": images,
+                    "caption_path": caption_path if index.stat(caption_path) else None
+                })
+            elif name.lower().endswith(IMAGE_EXTENSIONS):
+                caption_path = os.path.splitext(path)[0] + ".txt"
+                posts.append({
+                    "name": name,
+                    "carousel": False,
+                    "images": [path],
+                    "caption_path": caption_path if os.path.basename(caption_path) in names else None
+                })
+        return posts
+    
+    def get_posts_for_today(self):
+        """
+        获取今天需要发布的帖子（包括单图帖子和轮播帖子）
+        
+        Returns:
+            list: 帖子列表，格式同list_posts
+        """
+        today_folder = self.get_today_folder_path()
+        if not today_folder:
+            return []
+        
+        posts = self.list_posts(today_folder)
+        print(f"[文件管理服务] 找到 {len(posts)} 条待发布帖子，其中轮播帖子 {sum(1 for post in posts if post['carousel'])} 条")
+        return posts
+    
     def read_text_file(self, file_path):
         """
         读取文本文件内容
@@ -152,9 +221,9 @@ class FileManagementService:
             # 检查星期文件夹
             for weekday in self.weekday_folders:
                 weekday_path = os.path.join(self.base_dir, weekday)
-                if os.path.exists(weekday_path):
+                files = get_dir_index().listdir(weekday_path, files_only=True)
+                if files is not None:
                     # 统计文件数量
-                    files = [f for f in os.listdir(weekday_path) if os.path.isfile(os.path.join(weekday_path, f))]
                     print(f"[文件管理服务] {weekday}: {len(files)} 个文件")
                 else:
                     print(f"[文件管理服务] {weekday}: 文件夹不存在")
@@ -176,9 +245,10 @@ class FileManagementService:
         
         # 检查星期文件夹是否存在
         structure_exists = False
-        if os.path.exists(self.base_dir):
+        entries = get_dir_index().listdir(self.base_dir)
+        if entries is not None:
             # 检查是否至少有一个星期文件夹存在
-            existing_folders = os.listdir(self.base_dir)
+            existing_folders = [entry['name'] for entry in entries]
             for weekday in self.weekday_folders:
                 if weekday in existing_folders:
                     structure_exists = True
@@ -195,13 +265,14 @@ class FileManagementService:
             str: 当前周文件夹路径，如果不存在则返回None
         """
         try:
-            if not os.path.exists(self.base_dir):
+            entries = get_dir_index().listdir(self.base_dir, dirs_only=True)
+            if entries is None:
                 return None
             
             today = datetime.now()
             
-            # 查找当前周的主文件夹
-            for folder in os.listdir(self.base_dir):
+            # 查找当前周的主文件夹（目录列表来自目录索引，不再每次扫描base_dir）
+            for folder in (entry['name'] for entry in entries):
                 # 检查文件夹是否符合MMDD-MMDD格式
                 if len(folder) == 9 and folder[4] == '-':
                     try:
@@ -235,4 +306,4 @@ class FileManagementService:
             
         except Exception as e:
             print(f"[文件管理服务] 获取当前周文件夹时出错: {e}")
-            return None
\ No newline at end of file
+            return None
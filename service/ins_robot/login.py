@@ -5,6 +5,19 @@ import time
 from dotenv import load_dotenv
 import os
 import platform
+from service.ins_robot.session_store import SessionStore, INSTAGRAM_HOME_URL, INSTAGRAM_LIGHT_URL
+from service.ins_robot.publish_trace import annotate_span
+
+# 快速登录检测的最长等待时间（秒），页面渲染完成后通常在一次轮询（0.1秒）内得到结果
+LOGIN_PROBE_TIMEOUT = 3
+# 提交登录表单后等待登录完成的最长时间（秒），登录成功后立即返回
+LOGIN_SUBMIT_TIMEOUT = 15
+# 与界面语言和混淆class无关的页面标记：登录表单的密码框，或只有登录后才有的私信/发现链接
+LOGIN_MARKER_SCRIPT = """
+if (document.querySelector('input[name="password"]')) { return 'login_form'; }
+if (document.querySelector('a[href^="/direct/"], a[href="/explore/"]')) { return 'app'; }
+return null;
+"""
 
 class InstagramLoginService:
     """
@@ -20,6 +33,8 @@ class InstagramLoginService:
         # 从环境变量获取默认账号密码（可选）
         self.default_username = os.getenv('IG_USERNAME')
         self.default_password = os.getenv('IG_PASSWORD')
+        # 会话快照存储，用于跳过完整的UI登录流程
+        self.session_store = SessionStore()
     
     def login(self, driver, username=None, password=None):
         """
@@ -47,15 +62,17 @@ class InstagramLoginService:
         try:
             print(f"[登录服务] 正在使用账号 {username} 登录Instagram...")
             
-            # 打开Instagram网站
-            driver.get("https://www.instagram.com/")
+            # 优先使用浏览器配置中已有的会话或保存的会话快照
+            if self._restore_session(driver, username):
+                return True
             
-            # 等待页面加载完成
-            time.sleep(3)
+            # 打开Instagram网站
+            driver.get(INSTAGRAM_HOME_URL)
             
             # 检查是否已经登录
             if self._verify_login_success(driver):
                 print(f"[登录服务] 检测到账号 {username} 已经处于登录状态，无需重复登录！")
+                self.session_store.save(driver, username)
                 return True
             
             # 如果未登录，则填写登录表单
@@ -66,12 +83,13 @@ class InstagramLoginService:
             login_button = driver.find_element(By.XPATH, "//button[@type='submit']")
             login_button.click()
             
-            # 验证登录是否成功
-            success = self._verify_login_success(driver)
+            # 验证登录是否成功（登录完成后立即返回）
+            success = self._verify_login_success(driver, timeout=LOGIN_SUBMIT_TIMEOUT, wait_for_login=True)
             
             if success:
                 # 处理登录后的通知提示
                 print(f"[登录服务] 账号 {username} 登录成功！")
+                self.session_store.save(driver, username)
             else:
                 print(f"[登录服务] 账号 {username} 登录失败")
                 
@@ -81,6 +99,42 @@ class InstagramLoginService:
             print(f"[登录服务] 登录过程中发生错误: {e}")
             raise
     
+    def _restore_session(self, driver, username):
+        """
+        通过会话cookie快速判断登录状态，无需加载完整主页
+        - 先打开同源的轻量页面，检查浏览器配置中已有的sessionid cookie
+        - 如果没有有效cookie，再尝试恢复该账号保存的会话快照
+        - 打开主页后再快速检测一次登录状态，会话已失效时删除快照并返回False
+        
+        Returns:
+            bool: 是否已经恢复到登录状态（此时浏览器已打开主页）
+        """
+        try:
+            driver.get(INSTAGRAM_LIGHT_URL)
+            
+            if SessionStore.is_cookie_valid(driver.get_cookies()):
+                print(f"[登录服务] 浏览器配置中已存在账号 {username} 的有效会话")
+            else:
+                snapshot = self.session_store.load(username)
+                if not self.session_store.is_snapshot_valid(snapshot):
+                    print("[登录服务] 没有可用的会话快照，执行完整登录流程")
+                    return False
+                if not self.session_store.restore(driver, snapshot):
+                    print("[登录服务] 会话快照恢复失败，执行完整登录流程")
+                    self.session_store.delete(username)
+                    return False
+                print(f"[登录服务] 已从会话快照恢复账号 {username} 的登录状态")
+            
+            driver.get(INSTAGRAM_HOME_URL)
+            # cookie存在不代表会话仍然有效（可能已被服务器撤销或过期），以主页实际状态为准
+            if self._probe_login_state(driver) is not True:
+                print(f"[登录服务] 账号 {username} 的会话已失效，执行完整登录流程")
+                self.session_store.delete(username)
+                return False
+            return True
+        except Exception as e:
+            print(f"[登录服务] 恢复会话时出错: {e}")
+            return False
     
     def _fill_login_form(self, driver, username, password):
         """
@@ -115,12 +169,63 @@ class InstagramLoginService:
         else:
             raise Exception("[登录服务] 无法定位登录表单元素")
     
-    def _verify_login_success(self, driver):
+    def _probe_login_state(self, driver, timeout=LOGIN_PROBE_TIMEOUT, wait_for_login=False):
+        """
+        快速判断登录状态：sessionid cookie + 一个与界面语言无关的页面标记
+        
+        Args:
+            driver: Selenium WebDriver实例
+            timeout: 最长等待时间（秒）
+            wait_for_login: 为True时只等待登录成功（提交登录表单后页面上仍有登录表单）
+            
+        Returns:
+            bool: True为已登录，False为未登录，None为无法判断
+        """
+        def probe(d):
+            has_cookie = SessionStore.is_cookie_valid(d.get_cookies())
+            marker = d.execute_script(LOGIN_MARKER_SCRIPT)
+            if has_cookie and marker == 'app':
+                return 'logged_in'
+            if not wait_for_login and not has_cookie and marker == 'login_form':
+                return 'logged_out'
+            return None
+        
+        started_at = time.time()
+        try:
+            state = WebDriverWait(driver, timeout, poll_frequency=0.1).until(probe)
+        except Exception:
+            state = None
+        
+        elapsed = round(time.time() - started_at, 3)
+        annotate_span(login_probe=state or 'unknown', login_probe_time=elapsed)
+        print(f"[登录服务] 快速登录检测结果: {state or '无法判断'}，耗时 {elapsed} 秒")
+        if state is None:
+            return None
+        return state == 'logged_in'
+    
+    def _verify_login_success(self, driver, timeout=LOGIN_PROBE_TIMEOUT, wait_for_login=False):
         """
-        验证登录是否成功，使用多种验证方法
+        验证登录是否成功，优先使用快速检测，无法判断时再使用较慢的界面检查
+        
+        Args:
+            driver: Selenium WebDriver实例
+            timeout: 快速检测的最长等待时间（秒）
+            wait_for_login: 是否只等待登录成功（提交登录表单后使用）
         """
         print("[登录服务] 正在验证登录状态...")
         
+        state = self._probe_login_state(driver, timeout, wait_for_login)
+        if state is not None:
+            return state
+        
+        return self._verify_login_by_ui(driver)
+    
+    def _verify_login_by_ui(self, driver):
+        """
+        通过界面元素和URL验证登录状态（较慢，仅在快速检测无法判断时使用）
+        """
+        print("[登录服务] 使用界面元素验证登录状态...")
+        
         
         # 方法: 检查是否有主页元素（基于1.txt中的HTML结构）
         try:
@@ -148,45 +253,98 @@ class InstagramLoginService:
         return False
 
 
-def get_chrome_options(headless=False, profile_name="Default"):
+def get_chrome_profile_path():
+    """
+    根据不同操作系统获取默认的selenium专用Chrome配置路径
+    
+    Returns:
+        str: Chrome用户数据目录
+    """
+    system = platform.system()
+    user_home = os.path.expanduser("~")
+    
+    if system == "Windows":
+        # Windows系统路径
+        return "C:\\Users\\hou\\AppData\\Local\\Google\\selenium_profile"
+    elif system == "Darwin":  # macOS
+        # macOS系统路径
+        return os.path.join(user_home, "Library", "Application Support", "Google", "Chrome", "selenium_profile")
+    else:
+        # 其他系统（如Linux）的默认路径
+        return os.path.join(user_home, ".config", "google-chrome", "selenium_profile")
+
+# 浏览器模式：gui为完整图形界面，headless为普通无头模式，lean为精简资源的无头模式
+BROWSER_MODES = ('gui', 'headless', 'lean')
+# 精简模式下固定的小窗口尺寸（保持Instagram桌面版侧边栏布局）
+LEAN_WINDOW_SIZE = "1280,900"
+def get_browser_mode(headless=None, mode=None):
+    """
+    确定浏览器模式：显式传入的mode优先，其次是headless参数，最后读取环境变量CHROME_MODE（默认lean）
+    
+    Args:
+        headless: 是否启用无头模式（True对应headless，False对应gui）
+        mode: 浏览器模式
+        
+    Returns:
+        str: 浏览器模式
+    """
+    if mode is None and headless is not None:
+        mode = 'headless' if headless else 'gui'
+    if mode is None:
+        load_dotenv()
+        mode = os.getenv('CHROME_MODE', 'lean').lower()
+    if mode not in BROWSER_MODES:
+        print(f"[浏览器配置] 未知的浏览器模式 {mode}，使用lean模式")
+        mode = 'lean'
+    return mode
+
+def get_chrome_options(headless=None, profile_name="Default", user_data_dir=None, mode=None):
     """
     配置Chrome浏览器选项，提供跨平台兼容的浏览器配置
     
     Args:
-        headless: 是否启用无头模式
+        headless: 是否启用无头模式（为None时按环境变量CHROME_MODE选择）
         profile_name: Chrome配置文件名称
+        user_data_dir: Chrome用户数据目录（多账号时每个账号独立），默认使用selenium_profile
+        mode: 浏览器模式（gui/headless/lean），优先级高于headless参数
         
     Returns:
         Options: 配置好的ChromeOptions实例
     """
     from selenium.webdriver.chrome.options import Options
     
+    mode = get_browser_mode(headless, mode)
+    print(f"[浏览器配置] 浏览器模式: {mode}")
+    
     # 创建Chrome浏览器实例
     options = Options()
-    options.add_argument("--start-maximized")
     
-    # 设置无头模式（如果需要）
-    if headless:
+    if mode == 'gui':
+        options.add_argument("--start-maximized")
+    elif mode == 'headless':
         options.add_argument("--headless")
         options.add_argument("--disable-gpu")
         options.add_argument("--window-size=1920,1080")
+    else:
+        # 精简无头模式：新版headless + 关闭后台网络、扩展和不需要的浏览器功能
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument(f"--window-size={LEAN_WINDOW_SIZE}")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-component-extensions-with-background-pages")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-background-timer-throttling")
+        options.add_argument("--disable-default-apps")
+        options.add_argument("--disable-sync")
+        options.add_argument("--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication")
+        options.add_argument("--no-first-run")
+        options.add_argument("--mute-audio")
+        options.add_argument("--autoplay-policy=user-gesture-required")
+        options.add_argument("--disable-dev-shm-usage")
     
     # 根据不同操作系统设置不同的Chrome配置文件路径
-    system = platform.system()
-    user_home = os.path.expanduser("~")
-    
-    if system == "Windows":
-        # Windows系统路径
-        chrome_profile_path = "C:\\Users\\hou\\AppData\\Local\\Google\\selenium_profile"
-        print(f"[浏览器配置] Windows系统，使用Chrome配置路径: {chrome_profile_path}")
-    elif system == "Darwin":  # macOS
-        # macOS系统路径
-        chrome_profile_path = os.path.join(user_home, "Library", "Application Support", "Google", "Chrome", "selenium_profile")
-        print(f"[浏览器配置] macOS系统，使用Chrome配置路径: {chrome_profile_path}")
-    else:
-        # 其他系统（如Linux）的默认路径
-        chrome_profile_path = os.path.join(user_home, ".config", "google-chrome", "selenium_profile")
-        print(f"[浏览器配置] {system}系统，使用Chrome配置路径: {chrome_profile_path}")
+    chrome_profile_path = user_data_dir or get_chrome_profile_path()
+    print(f"[浏览器配置] {platform.system()}系统，使用Chrome配置路径: {chrome_profile_path}")
     
     # 确保配置文件目录存在
     os.makedirs(chrome_profile_path, exist_ok=True)
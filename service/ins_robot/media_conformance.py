@@ -0,0 +1,140 @@
+import io
+import os
+import hashlib
+import threading
+from PIL import Image, ImageCms, ImageOps
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_prepared_dir = os.path.join(base_dir, 'data', 'prepared')
+
+# Instagram支持的宽高比范围（竖图4:5到横图1.91:1），超出范围会在上传后被强制裁剪
+MIN_ASPECT_RATIO = 4 / 5
+MAX_ASPECT_RATIO = 1.91
+# Instagram保存的最大宽度和最大边长，更大的图片会在服务端重新压缩
+MAX_WIDTH = 1080
+MAX_EDGE = 1440
+JPEG_QUALITY = 90
+# 填充宽高比时使用的背景色
+PAD_COLOR = (255, 255, 255)
+# 处理规则变化时递增，使旧的缓存失效
+CONFORMANCE_VERSION = 1
+
+# 同一张图片同时被多个发布线程处理时只生成一次
+_prepare_lock = threading.Lock()
+
+
+class MediaConformanceService:
+    """
+    上传前的媒体规范化服务，将图片转换为Instagram可以直接使用的sRGB JPEG，
+    避免上传大文件和在裁剪界面重新处理
+    """
+
+    def __init__(self, prepared_dir=None):
+        """
+        初始化媒体规范化服务
+
+        Args:
+            prepared_dir: 规范化结果缓存目录，默认为data/prepared
+        """
+        self.prepared_dir = prepared_dir or default_prepared_dir
+
+    @staticmethod
+    def _source_hash(image_path):
+        """
+        计算源文件内容哈希（包含处理规则版本）
+        """
+        file_hash = hashlib.sha256(f"v{CONFORMANCE_VERSION}:".encode('utf-8'))
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    @staticmethod
+    def _to_srgb(img):
+        """
+        按内嵌的ICC配置文件转换到sRGB，并将透明背景合成到白色背景上
+        """
+        icc_profile = img.info.get('icc_profile')
+        if icc_profile:
+            try:
+                source_profile = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+                srgb_profile = ImageCms.createProfile('sRGB')
+                if img.mode not in ('RGB', 'RGBA'):
+                    img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+                img = ImageCms.profileToProfile(img, source_profile, srgb_profile, outputMode=img.mode)
+            except Exception as e:
+                print(f"[媒体规范化] ICC配置文件转换失败，按sRGB处理: {e}")
+
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, PAD_COLOR)
+            background.paste(img, mask=img.getchannel('A'))
+            return background
+        return img.convert('RGB')
+
+    @staticmethod
+    def _fit_aspect_ratio(img):
+        """
+        宽高比超出Instagram范围时用背景色填充，而不是让Instagram裁掉画面
+        """
+        width, height = img.size
+        ratio = width / height
+        if ratio < MIN_ASPECT_RATIO:
+            canvas_size = (round(height * MIN_ASPECT_RATIO), height)
+        elif ratio > MAX_ASPECT_RATIO:
+            canvas_size = (width, round(width / MAX_ASPECT_RATIO))
+        else:
+            return img
+
+        canvas = Image.new('RGB', canvas_size, PAD_COLOR)
+        canvas.paste(img, ((canvas_size[0] - width) // 2, (canvas_size[1] - height) // 2))
+        return canvas
+
+    @staticmethod
+    def _fit_size(img):
+        """
+        按最大宽度和最大边长等比缩小
+        """
+        width, height = img.size
+        scale = min(1.0, MAX_WIDTH / width, MAX_EDGE / max(width, height))
+        if scale >= 1.0:
+            return img
+        return img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.Resampling.LANCZOS)
+
+    def prepare(self, image_path):
+        """
+        生成符合Instagram要求的图片，已处理过的图片直接返回缓存
+
+        Args:
+            image_path: 源图片路径
+
+        Returns:
+            str: 规范化后的图片路径，处理失败时返回源图片路径
+        """
+        try:
+            prepared_path = os.path.join(self.prepared_dir, f"{self._source_hash(image_path)}.jpg")
+            with _prepare_lock:
+                if os.path.exists(prepared_path):
+                    print(f"[媒体规范化] 使用缓存的规范化图片: {prepared_path}")
+                    return prepared_path
+
+                with Image.open(image_path) as source:
+                    # 先按EXIF方向旋转，保存时不再写入EXIF等元数据
+                    img = ImageOps.exif_transpose(source)
+                    img = self._to_srgb(img)
+                    img = self._fit_aspect_ratio(img)
+                    img = self._fit_size(img)
+
+                    os.makedirs(self.prepared_dir, exist_ok=True)
+                    temp_path = prepared_path + '.tmp'
+                    img.save(temp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                    os.replace(temp_path, prepared_path)
+
+            print(f"[媒体规范化] {os.path.basename(image_path)} "
+                  f"({os.path.getsize(image_path) / 1024:.1f} KB, {source.size[0]}x{source.size[1]}) -> "
+                  f"{os.path.getsize(prepared_path) / 1024:.1f} KB, {img.size[0]}x{img.size[1]}")
+            return prepared_path
+        except Exception as e:
+            print(f"[媒体规范化] 处理图片失败，使用原图上传: {e}")
+            return image_path
@@ -4,6 +4,163 @@ from selenium.webdriver.common.by import By
 import os
 import time
 
+from service.ins_robot.publish_trace import record_locator, annotate_span
+from service.ins_robot.media_conformance import MediaConformanceService
+from service.ins_robot.file_management_service import MAX_CAROUSEL_ITEMS
+from service.ins_robot.session_store import INSTAGRAM_HOME_URL
+
+# 上传完成检测的超时时间：基础时间 + 按最低上传速度估算的传输时间 + 每个文件的处理时间（秒）
+UPLOAD_BASE_TIMEOUT = 10
+UPLOAD_MIN_BYTES_PER_SECOND = 256 * 1024
+UPLOAD_PER_FILE_TIMEOUT = 2
+UPLOAD_MAX_TIMEOUT = 120
+
+# 在页面中注入MutationObserver，等待裁剪界面出现预览（blob图片或canvas）且下一步按钮可用
+UPLOAD_READY_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var timeoutMs = arguments[0];
+var nextTexts = ['继续', 'Next'];
+
+function isReady() {
+    var roots = document.querySelectorAll('[role="dialog"]');
+    roots = roots.length ? Array.prototype.slice.call(roots) : [document];
+    var hasPreview = roots.some(function (root) {
+        return root.querySelector('img[src^="blob:"], canvas, [style*="blob:"]') !== null;
+    });
+    if (!hasPreview) {
+        return false;
+    }
+    return roots.some(function (root) {
+        return Array.prototype.some.call(root.querySelectorAll('[role="button"], button'), function (el) {
+            return nextTexts.indexOf((el.textContent || '').trim()) !== -1
+                && !el.disabled && el.getAttribute('aria-disabled') !== 'true';
+        });
+    });
+}
+
+var startedAt = performance.now();
+if (isReady()) {
+    done({ready: true, elapsed: 0});
+    return;
+}
+
+var finished = false;
+function finish(ready) {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    done({ready: ready, elapsed: (performance.now() - startedAt) / 1000});
+}
+
+var observer = new MutationObserver(function () {
+    if (isReady()) {
+        finish(true);
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ['src', 'style', 'disabled', 'aria-disabled']});
+var timer = setTimeout(function () { finish(false); }, timeoutMs);
+"""
+
+# 分享结果确认的最长等待时间（秒）
+SHARE_CONFIRM_TIMEOUT = 60
+
+# 在点击分享前注入，拦截fetch和XHR中发布接口（/media/configure/、/media/configure_sidecar/）的响应
+SHARE_HOOK_SCRIPT = """
+if (window.__igShareHookInstalled) {
+    window.__igShareResult = null;
+    return;
+}
+window.__igShareHookInstalled = true;
+window.__igShareResult = null;
+
+function isConfigureUrl(url) {
+    return /\\/media\\/configure(_sidecar)?\\//.test(url || '');
+}
+
+function recordResponse(status, text) {
+    try {
+        var data = JSON.parse(text);
+        var media = data.media || {};
+        window.__igShareResult = {ok: status < 400 && data.status === 'ok', status: status,
+                                  media_id: media.id || media.pk || null, code: media.code || null};
+    } catch (e) {
+        window.__igShareResult = {ok: status < 400, status: status, media_id: null, code: null};
+    }
+}
+
+var originalFetch = window.fetch;
+window.fetch = function (input, init) {
+    var url = typeof input === 'string' ? input : (input && input.url);
+    var promise = originalFetch.apply(this, arguments);
+    if (isConfigureUrl(url)) {
+        promise.then(function (response) {
+            response.clone().text().then(function (text) { recordResponse(response.status, text); });
+        }).catch(function () {});
+    }
+    return promise;
+};
+
+var originalOpen = XMLHttpRequest.prototype.open;
+XMLHttpRequest.prototype.open = function (method, url) {
+    this.__igUrl = url;
+    return originalOpen.apply(this, arguments);
+};
+var originalSend = XMLHttpRequest.prototype.send;
+XMLHttpRequest.prototype.send = function () {
+    var xhr = this;
+    if (isConfigureUrl(xhr.__igUrl)) {
+        xhr.addEventListener('loadend', function () {
+            recordResponse(xhr.status, typeof xhr.response === 'string' ? xhr.response : xhr.responseText);
+        });
+    }
+    return originalSend.apply(this, arguments);
+};
+"""
+
+# 等待发布接口的响应或"已分享"对话框，先出现哪个就立即返回
+SHARE_CONFIRM_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var timeoutMs = arguments[0];
+var sharedTexts = ['已分享你的帖子', '已分享帖子', 'Your post has been shared', 'Post shared'];
+var startedAt = performance.now();
+
+function check() {
+    var elapsed = (performance.now() - startedAt) / 1000;
+    var result = window.__igShareResult;
+    if (result) {
+        return {confirmed: result.ok, source: 'network', status: result.status,
+                media_id: result.media_id, code: result.code, elapsed: elapsed};
+    }
+    var dialogText = Array.prototype.map.call(document.querySelectorAll('[role="dialog"]'), function (el) {
+        return el.textContent || '';
+    }).join(' ');
+    if (sharedTexts.some(function (text) { return dialogText.indexOf(text) !== -1; })) {
+        // 对话框已出现但响应可能稍后才被解析，继续等待片刻以获取帖子编号
+        if (!window.__igSharedDialogAt) {
+            window.__igSharedDialogAt = performance.now();
+        } else if (performance.now() - window.__igSharedDialogAt > 1000) {
+            return {confirmed: true, source: 'dialog', media_id: null, code: null, elapsed: elapsed};
+        }
+    }
+    return null;
+}
+
+window.__igSharedDialogAt = null;
+var timer = setInterval(function () {
+    var result = check();
+    if (result) {
+        clearInterval(timer);
+        done(result);
+    } else if (performance.now() - startedAt > timeoutMs) {
+        clearInterval(timer);
+        done({confirmed: false, source: 'timeout', media_id: null, code: null, elapsed: timeoutMs / 1000});
+    }
+}, 100);
+"""
+
 class MediaUploadService:
     """
     媒体上传服务类，提供Instagram媒体上传相关功能
@@ -17,6 +174,9 @@ class MediaUploadService:
             driver: Selenium WebDriver实例
         """
         self.driver = driver
+        self.conformance_service = MediaConformanceService()
+        # 最近一次分享的确认结果，包含confirmed、media_id、code和permalink
+        self.last_share_result = None
     
     def click_create_post_button(self):
         """
@@ -49,10 +209,14 @@ class MediaUploadService:
                         EC.element_to_be_clickable((by, value))
                     )
                     print("[媒体上传服务] 成功找到创建帖子按钮")
+                    record_locator(i + 1, i + 1, value)
                     break
                 except Exception as e:
                     print(f"[媒体上传服务] 定位策略 {i+1} 失败: {e}")
             
+            if not create_post_button:
+                record_locator(None, len(create_post_locators))
+
             if create_post_button:
                 create_post_button.click()
                 print("[媒体上传服务] 成功点击创建帖子按钮")
@@ -90,39 +254,90 @@ class MediaUploadService:
     
     def upload_media(self, file_path):
         """
-        上传媒体文件
+        上传媒体文件，传入多个文件时作为轮播帖子一次性上传
         
         Args:
-            file_path: 媒体文件的绝对路径
+            file_path: 媒体文件的绝对路径，轮播帖子为按顺序排列的路径列表（最多10个）
             
         Returns:
             bool: 上传是否成功
         """
         try:
-            print(f"[媒体上传服务] 准备上传文件: {file_path}")
+            file_paths = list(file_path) if isinstance(file_path, (list, tuple)) else [file_path]
+            print(f"[媒体上传服务] 准备上传 {len(file_paths)} 个文件: {file_paths}")
             
-            # 检查文件是否存在
-            if not os.path.exists(file_path):
-                print(f"[媒体上传服务] 错误: 文件 {file_path} 不存在")
+            if not file_paths or len(file_paths) > MAX_CAROUSEL_ITEMS:
+                print(f"[媒体上传服务] 错误: 每条帖子需要1到{MAX_CAROUSEL_ITEMS}个文件，当前为 {len(file_paths)} 个")
                 return False
             
+            # 检查文件是否存在
+            for path in file_paths:
+                if not os.path.exists(path):
+                    print(f"[媒体上传服务] 错误: 文件 {path} 不存在")
+                    return False
+            
             # 查找文件输入元素
             file_input = WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.XPATH, "//input[@type='file']"))
             )
             
-            # 上传文件
-            file_input.send_keys(file_path)
+            # 上传前转换为Instagram可直接使用的图片，减少上传和裁剪界面的处理时间
+            upload_paths = [self.conformance_service.prepare(path) for path in file_paths]
+            annotate_span(
+                file_count=len(upload_paths),
+                source_bytes=sum(os.path.getsize(path) for path in file_paths),
+                upload_bytes=sum(os.path.getsize(path) for path in upload_paths)
+            )
+            
+            # 上传文件，文件输入框带有multiple属性，多个文件用换行分隔一次性发送
+            file_input.send_keys("\n".join(upload_paths))
             print("[媒体上传服务] 文件上传开始")
             
-            # 等待上传完成（根据网络情况可能需要调整等待时间）
-            time.sleep(5)
+            # 等待裁剪界面出现预览且下一步按钮可用，而不是固定等待
+            upload_bytes = sum(os.path.getsize(path) for path in upload_paths)
+            if not self.wait_for_upload_complete(upload_bytes, len(upload_paths)):
+                return False
             print("[媒体上传服务] 文件上传完成")
             return True
         except Exception as e:
             print(f"[媒体上传服务] 上传文件时出错: {e}")
             return False
     
+    def wait_for_upload_complete(self, upload_bytes, file_count=1):
+        """
+        等待上传的文件在裁剪界面中处理完成，超时时间根据文件大小调整
+        
+        Args:
+            upload_bytes: 上传文件的总字节数
+            file_count: 上传的文件数量
+            
+        Returns:
+            bool: 上传是否在超时前完成
+        """
+        timeout = min(
+            UPLOAD_MAX_TIMEOUT,
+            UPLOAD_BASE_TIMEOUT + upload_bytes / UPLOAD_MIN_BYTES_PER_SECOND + UPLOAD_PER_FILE_TIMEOUT * file_count
+        )
+        print(f"[媒体上传服务] 等待上传完成，超时时间: {timeout:.1f}秒")
+        
+        started_at = time.time()
+        try:
+            # 脚本超时比页面内的超时稍长，保证由页面内的计时器返回结果
+            self.driver.set_script_timeout(timeout + 5)
+            result = self.driver.execute_async_script(UPLOAD_READY_SCRIPT, int(timeout * 1000)) or {}
+        except Exception as e:
+            print(f"[媒体上传服务] 检测上传完成时出错: {e}")
+            result = {'ready': False}
+        
+        elapsed = round(time.time() - started_at, 3)
+        annotate_span(upload_wait=elapsed, upload_timeout=round(timeout, 1), upload_ready=bool(result.get('ready')))
+        if result.get('ready'):
+            print(f"[媒体上传服务] 上传完成，耗时 {elapsed} 秒")
+            return True
+        
+        print(f"[媒体上传服务] 上传在 {timeout:.1f} 秒内未完成")
+        return False
+    
     def go_to_next_step(self):
         """
         点击下一步按钮，进入下一上传阶段
@@ -160,10 +375,14 @@ class MediaUploadService:
                         EC.element_to_be_clickable((by, value))
                     )
                     print(f"[媒体上传服务] 成功找到下一步按钮，使用策略 {i+1}")
+                    record_locator(i + 1, i + 1, value)
                     break
                 except Exception as e:
                     print(f"[媒体上传服务] 定位策略 {i+1} 失败: {e}")
             
+            if not next_button:
+                record_locator(None, len(next_button_locators))
+
             if next_button:
                 # 滚动到元素位置确保可见
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", next_button)
@@ -192,6 +411,48 @@ class MediaUploadService:
             print(f"[媒体上传服务] 点击下一步按钮时出错: {e}")
             return False
     
+    def _install_share_hook(self):
+        """
+        注入发布接口的响应监听，用于获取帖子的media id和短代码
+        """
+        try:
+            self.driver.execute_script(SHARE_HOOK_SCRIPT)
+        except Exception as e:
+            print(f"[媒体上传服务] 注入发布接口监听失败，只能通过对话框确认: {e}")
+    
+    def wait_for_share_confirmation(self, timeout=SHARE_CONFIRM_TIMEOUT):
+        """
+        等待分享完成的确认：发布接口的响应或"已分享"对话框
+        
+        Args:
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            dict: 确认结果，包含confirmed、source（network/dialog/timeout）、media_id、code、permalink和elapsed
+        """
+        try:
+            self.driver.set_script_timeout(timeout + 5)
+            result = self.driver.execute_async_script(SHARE_CONFIRM_SCRIPT, int(timeout * 1000)) or {}
+        except Exception as e:
+            print(f"[媒体上传服务] 等待分享确认时出错: {e}")
+            result = {'confirmed': False, 'source': 'timeout', 'media_id': None, 'code': None, 'elapsed': None}
+        
+        result['permalink'] = f"{INSTAGRAM_HOME_URL}p/{result['code']}/" if result.get('code') else None
+        annotate_span(
+            share_confirmed=result.get('confirmed'),
+            share_source=result.get('source'),
+            share_wait=result.get('elapsed'),
+            media_id=result.get('media_id')
+        )
+        
+        if result.get('confirmed'):
+            print(f"[媒体上传服务] 分享已确认（{result['source']}），耗时 {result.get('elapsed', 0):.2f} 秒，链接: {result['permalink']}")
+        elif result.get('source') == 'timeout':
+            print(f"[媒体上传服务] {timeout} 秒内没有收到分享确认，帖子可能已经发布")
+        else:
+            print(f"[媒体上传服务] 发布接口返回失败，状态码: {result.get('status')}")
+        return result
+    
     def click_share_button(self):
         """
         点击分享按钮，发布帖子
@@ -201,6 +462,7 @@ class MediaUploadService:
         """
         try:
             print("[媒体上传服务] 查找分享按钮...")
+            self.last_share_result = None
             
             # 基于a.txt中的实际HTML结构优化 - 只使用可靠的属性
             share_button_locators = [
@@ -225,6 +487,7 @@ class MediaUploadService:
                         EC.element_to_be_clickable((by, value))
                     )
                     print(f"[媒体上传服务] 成功找到分享按钮，使用策略 {i+1}")
+                    record_locator(i + 1, i + 1, value)
                     # 验证元素文本内容
                     element_text = share_button.text.strip()
                     print(f"[媒体上传服务] 分享按钮文本内容: '{element_text}'")
@@ -232,6 +495,9 @@ class MediaUploadService:
                 except Exception as e:
                     print(f"[媒体上传服务] 定位策略 {i+1} 失败: {e}")
             
+            if not share_button:
+                record_locator(None, len(share_button_locators))
+
             if share_button:
                 # 滚动到元素位置确保可见
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", share_button)
@@ -243,6 +509,9 @@ class MediaUploadService:
                 else:
                     print("[媒体上传服务] 警告: 分享按钮可能不可见或不可用")
                 
+                # 点击前注入发布接口的响应监听
+                self._install_share_hook()
+                
                 # 尝试多种点击方式
                 try:
                     share_button.click()
@@ -256,10 +525,11 @@ class MediaUploadService:
                         print(f"[媒体上传服务] 点击分享按钮失败: {e}")
                         return False
                 
-                # 等待发布完成
+                # 等待发布接口响应或已分享对话框，而不是固定等待
                 print("[媒体上传服务] 等待发布完成...")
-                time.sleep(10)  # 增加等待时间确保发布完成
-                return True
+                self.last_share_result = self.wait_for_share_confirmation()
+                # 发布接口明确返回失败时视为分享失败
+                return self.last_share_result['confirmed'] or self.last_share_result['source'] == 'timeout'
             else:
                 print("[媒体上传服务] 无法找到分享按钮，所有定位策略均失败")
                 return False
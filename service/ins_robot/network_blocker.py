@@ -0,0 +1,182 @@
+import os
+from dotenv import load_dotenv
+
+from service.ins_robot.publish_trace import annotate_span
+
+# 可屏蔽的资源类别，匹配规则为Network.setBlockedURLs的通配符格式
+# 媒体地址带有?stp=...&_nc_ht=...等查询参数，扩展名规则末尾需要加*，否则只能匹配以扩展名结尾的地址
+BLOCK_CATEGORIES = {
+    # 主页动态、快拍和头像中的图片（上传对话框打开时临时放开）
+    'feed_media': [
+        "*.jpg*", "*.jpeg*", "*.png*", "*.webp*", "*.gif*", "*.heic*",
+        "*scontent*.cdninstagram.com*", "*.fbcdn.net*"
+    ],
+    # 动态和快拍中自动播放的视频
+    'video': [
+        "*.mp4*", "*.m4v*", "*.webm*", "*.m4a*", "*.m3u8*", "*.mpd*"
+    ],
+    # 统计和日志上报
+    'analytics': [
+        "*/ajax/bz*", "*/logging/falco*", "*/logging_client_events*",
+        "*connect.facebook.net*", "*facebook.com/tr*",
+        "*google-analytics.com*", "*googletagmanager.com*"
+    ]
+}
+# 默认屏蔽的类别
+DEFAULT_BLOCK_CATEGORIES = ('feed_media', 'video', 'analytics')
+# 上传对话框打开期间放开的类别
+DIALOG_ALLOWED_CATEGORIES = ('feed_media',)
+
+# 读取当前文档的加载耗时和传输量（performance API只统计当前页面，已屏蔽的请求不会出现）
+PAGE_METRICS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var transfer = nav ? nav.transferSize : 0;
+for (var i = 0; i < resources.length; i++) { transfer += resources[i].transferSize || 0; }
+return {
+    dom_ready: nav ? nav.domContentLoadedEventEnd / 1000 : null,
+    load: nav && nav.loadEventEnd ? nav.loadEventEnd / 1000 : null,
+    transfer_bytes: transfer,
+    resources: resources.length
+};
+"""
+
+
+def get_block_categories():
+    """
+    读取要屏蔽的资源类别，环境变量NETWORK_BLOCK_CATEGORIES为逗号分隔的类别名，设置为空时不屏蔽
+
+    Returns:
+        list: 类别名列表
+    """
+    load_dotenv()
+    value = os.getenv('NETWORK_BLOCK_CATEGORIES')
+    if value is None:
+        return list(DEFAULT_BLOCK_CATEGORIES)
+
+    categories = []
+    for name in value.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in BLOCK_CATEGORIES:
+            print(f"[网络屏蔽] 未知的屏蔽类别 {name}，已忽略")
+            continue
+        categories.append(name)
+    return categories
+
+
+class NetworkBlocker:
+    """
+    通过Chrome DevTools Protocol在网络层屏蔽发布不需要的资源（动态中的图片、视频和统计上报），
+    减少打开主页和创建对话框时的加载时间和流量
+    """
+
+    def __init__(self, driver, categories=None, extra_patterns=None):
+        """
+        初始化网络屏蔽
+
+        Args:
+            driver: Selenium WebDriver实例
+            categories: 要屏蔽的类别，默认读取环境变量NETWORK_BLOCK_CATEGORIES
+            extra_patterns: 额外屏蔽的URL规则，默认读取环境变量NETWORK_BLOCK_EXTRA（逗号分隔）
+        """
+        self.driver = driver
+        self.categories = get_block_categories() if categories is None else list(categories)
+        if extra_patterns is None:
+            extra_patterns = [p.strip() for p in os.getenv('NETWORK_BLOCK_EXTRA', '').split(',') if p.strip()]
+        self.extra_patterns = extra_patterns
+        self.allowed = set()
+        self.active = False
+
+    def _patterns(self):
+        """
+        计算当前生效的屏蔽规则
+        """
+        patterns = []
+        for name in self.categories:
+            if name not in self.allowed:
+                patterns.extend(BLOCK_CATEGORIES[name])
+        return patterns + self.extra_patterns
+
+    def _apply(self):
+        """
+        将屏蔽规则下发到浏览器
+
+        Returns:
+            bool: 操作是否成功
+        """
+        patterns = self._patterns() if self.active else []
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+            return True
+        except Exception as e:
+            print(f"[网络屏蔽] 设置屏蔽规则失败: {e}")
+            return False
+
+    def enable(self):
+        """
+        开启屏蔽（发布会话开始时调用）
+        """
+        if not self.categories and not self.extra_patterns:
+            return False
+        self.active = True
+        self.allowed.clear()
+        if self._apply():
+            print(f"[网络屏蔽] 已屏蔽: {', '.join(self.categories + (['extra'] if self.extra_patterns else []))}")
+            return True
+        return False
+
+    def disable(self):
+        """
+        关闭全部屏蔽（浏览器交给用户继续使用时调用）
+        """
+        if not self.active:
+            return True
+        self.active = False
+        return self._apply()
+
+    def allow(self, *categories):
+        """
+        临时放开指定类别，例如上传对话框中需要加载的图片
+        """
+        if not self.active:
+            return True
+        self.allowed.update(categories)
+        return self._apply()
+
+    def restore(self):
+        """
+        恢复被临时放开的类别
+        """
+        if not self.active or not self.allowed:
+            return True
+        self.allowed.clear()
+        return self._apply()
+
+    def record_page_metrics(self):
+        """
+        记录当前页面的就绪时间和传输量到当前的追踪步骤
+
+        Returns:
+            dict: dom_ready、load（秒）、transfer_bytes和resources，读取失败时返回None
+        """
+        try:
+            metrics = self.driver.execute_script(PAGE_METRICS_SCRIPT)
+        except Exception as e:
+            print(f"[网络屏蔽] 读取页面加载数据失败: {e}")
+            return None
+        if not metrics:
+            return None
+
+        annotate_span(
+            page_ready=round(metrics['dom_ready'], 3) if metrics.get('dom_ready') is not None else None,
+            page_load=round(metrics['load'], 3) if metrics.get('load') is not None else None,
+            transfer_bytes=metrics.get('transfer_bytes', 0),
+            resources=metrics.get('resources', 0),
+            blocking=self.active
+        )
+        print(f"[网络屏蔽] 页面就绪 {metrics.get('dom_ready')} 秒，"
+              f"传输 {metrics.get('transfer_bytes', 0) / 1024:.1f} KB，资源 {metrics.get('resources', 0)} 个")
+        return metrics
@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from service.ins_robot.account_registry import DEFAULT_ACCOUNT
+from service.storage.dir_index import get_dir_index
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_outbox_dir = os.path.join(base_dir, 'data', 'outbox')
+
+# 发布状态
+STATE_QUEUED = 'queued'
+STATE_UPLOADING = 'uploading'
+STATE_CAPTIONED = 'captioned'
+STATE_SHARED = 'shared'
+STATE_VERIFIED = 'verified'
+# 分享按钮点击之前失败，可以安全重试
+STATE_FAILED = 'failed'
+# 无法确认是否已经发布，需要人工确认，绝不自动重试
+STATE_NEEDS_REVIEW = 'needs_review'
+
+# 全局发件箱实例
+_outbox = None
+# 发件箱实例锁
+_outbox_lock = threading.Lock()
+
+
+class PublishOutbox:
+    """
+    发布发件箱，持久化记录每条帖子的发布状态，保证同一图片在同一账号上至多发布一次
+
+    状态流转: queued -> uploading -> captioned -> shared -> verified
+    - 分享时捕获到帖子链接则直接记为verified
+    - 分享按钮点击之前失败记为failed，可以重新入队
+    - captioned之后中断时分享按钮可能已经点击，恢复时先检查账号主页再决定是否重试
+    """
+
+    def __init__(self, outbox_dir=None, pool=None):
+        """
+        初始化发布发件箱
+
+        Args:
+            outbox_dir: 发件箱数据目录，默认为data/outbox
+            pool: 发布工作池，默认使用全局工作池
+        """
+        self.outbox_dir = outbox_dir or default_outbox_dir
+        self.outbox_file = os.path.join(self.outbox_dir, 'outbox.json')
+        self.pool = pool
+        self.entries = {}
+        # 已经交给工作池、尚未完成的条目
+        self._in_flight = set()
+        self._lock = threading.RLock()
+        self._load()
+
+    def _get_pool(self):
+        if self.pool is None:
+            from service.ins_robot.publish_worker_pool import get_publish_pool
+            self.pool = get_publish_pool()
+        return self.pool
+
+    def _load(self):
+        """
+        从磁盘加载发件箱记录
+        """
+        if not os.path.exists(self.outbox_file):
+            return
+        try:
+            with open(self.outbox_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+            print(f"[发布发件箱] 已加载 {len(self.entries)} 条发布记录")
+        except Exception as e:
+            print(f"[发布发件箱] 加载发布记录失败: {e}")
+
+    def _save(self):
+        """
+        将发件箱记录原子写入磁盘（先写临时文件再替换）
+        """
+        os.makedirs(self.outbox_dir, exist_ok=True)
+        temp_file = self.outbox_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.outbox_file)
+
+    @staticmethod
+    def content_hash(image_path):
+        """
+        计算帖子图片的内容哈希
+
+        Args:
+            image_path: 图片路径，轮播帖子为按顺序排列的图片路径列表
+
+        Returns:
+            str: 内容哈希
+        """
+        if isinstance(image_path, (list, tuple)):
+            image_hash = hashlib.sha256()
+            for path in image_path:
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        image_hash.update(chunk)
+            return image_hash.hexdigest()
+        # 单图的内容哈希由目录索引缓存，文件未变化时不重新读取
+        return get_dir_index().file_hash(image_path)
+
+    @staticmethod
+    def key_for_hash(content_hash, account_name=None):
+        """
+        根据内容哈希和目标账号生成幂等键
+        """
+        return hashlib.sha256(f"{account_name or DEFAULT_ACCOUNT}:{content_hash}".encode('utf-8')).hexdigest()
+
+    @classmethod
+    def make_key(cls, image_path, account_name=None):
+        """
+        根据图片内容哈希和目标账号生成幂等键
+
+        Args:
+            image_path: 图片路径，轮播帖子为按顺序排列的图片路径列表
+            account_name: 账号名称
+
+        Returns:
+            str: 幂等键
+        """
+        return cls.key_for_hash(cls.content_hash(image_path), account_name)
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            return dict(entry) if entry else None
+
+    def list_entries(self, state=None):
+        """
+        获取发布记录列表
+
+        Args:
+            state: 只返回指定状态的记录（可选）
+
+        Returns:
+            list: 发布记录，按创建时间排序
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in self.entries.values() if not state or entry['state'] == state]
+        return sorted(entries, key=lambda entry: entry['created_at'])
+
+    def reserve(self, image_path, content='', account_name=None, dispatch='worker'):
+        """
+        为一次发布预留幂等键
+
+        Args:
+            image_path: 图片路径，轮播帖子为图片路径列表
+            content: 帖子文案
+            account_name: 账号名称
+            dispatch: worker表示由后台工作池发布，direct表示由调用方自行发布
+
+        Returns:
+            tuple: (发布记录, 是否为新预留)。已发布或正在发布的图片返回已有记录和False
+        """
+        key = self.make_key(image_path, account_name)
+        with self._lock:
+            existing = self.entries.get(key)
+            if existing and existing['state'] != STATE_FAILED:
+                print(f"[发布发件箱] 图片 {image_path} 已有发布记录，状态: {existing['state']}")
+                return dict(existing), False
+
+            now = time.time()
+            entry = {
+                'key': key,
+                'image_path': image_path,
+                'content': content,
+                'account': account_name or DEFAULT_ACCOUNT,
+                'dispatch': dispatch,
+                'state': STATE_QUEUED,
+                'attempts': (existing or {}).get('attempts', 0) + 1,
+                'created_at': (existing or {}).get('created_at', now),
+                'updated_at': now,
+                'history': (existing or {}).get('history', []) + [[STATE_QUEUED, now]],
+                'error': None,
+                'permalink': None
+            }
+            self.entries[key] = entry
+            self._save()
+            print(f"[发布发件箱] 预留发布记录 {key[:12]}，图片: {image_path}")
+            return dict(entry), True
+
+    def update_state(self, key, state, **fields):
+        """
+        更新发布记录状态并立即持久化
+
+        Args:
+            key: 幂等键
+            state: 新状态
+            fields: 需要一并更新的字段
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return
+            now = time.time()
+            entry.update(fields)
+            entry['state'] = state
+            entry['updated_at'] = now
+            entry['history'].append([state, now])
+            if state == STATE_CAPTIONED:
+                entry['captioned_at'] = now
+            self._save()
+        print(f"[发布发件箱] 发布记录 {key[:12]} 状态更新为 {state}")
+
+    def progress_callback(self, key):
+        """
+        生成PublishService.publish_one使用的阶段回调
+        """
+        return lambda state: self.update_state(key, state)
+
+    def record_result(self, key, result):
+        """
+        根据发布结果更新最终状态
+
+        Args:
+            key: 幂等键
+            result: PublishService.publish_one的返回结果
+        """
+        entry = self.get(key)
+        if not entry:
+            return
+        if result.get('success'):
+            if result.get('permalink'):
+                # 发布接口已返回帖子编号，无需再检查主页
+                self.update_state(key, STATE_VERIFIED, permalink=result['permalink'], media_id=result.get('media_id'))
+            elif entry['state'] != STATE_SHARED:
+                self.update_state(key, STATE_SHARED)
+        elif entry['state'] in (STATE_CAPTIONED, STATE_SHARED):
+            # 分享按钮可能已经点击，不能当作失败自动重试
+            self.update_state(key, STATE_NEEDS_REVIEW, error=result.get('message'))
+        else:
+            self.update_state(key, STATE_FAILED, error=result.get('message'))
+
+    def enqueue(self, image_path, content='', account_name=None):
+        """
+        将一条帖子加入发布队列，由后台工作池异步发布
+
+        Returns:
+            tuple: (发布记录, 是否为新入队)
+        """
+        entry, created = self.reserve(image_path, content, account_name, dispatch='worker')
+        if created:
+            self.dispatch()
+        return entry, created
+
+    def dispatch(self):
+        """
+        将所有排队中的条目交给发布工作池（工作池负责并发上限和同账号顺序执行）
+        """
+        with self._lock:
+            queued = [entry for entry in self.entries.values()
+                      if entry['state'] == STATE_QUEUED and entry['dispatch'] == 'worker'
+                      and entry['key'] not in self._in_flight]
+            for entry in sorted(queued, key=lambda entry: entry['created_at']):
+                self._submit(entry)
+
+    def _submit(self, entry):
+        key = entry['key']
+        image_path = entry['image_path']
+        item = {
+            'image_path': image_path,
+            # 轮播帖子以所在文件夹名称作为条目名称
+            'image_file': os.path.basename(os.path.dirname(image_path[0]) if isinstance(image_path, list) else image_path),
+            'content': entry['content'],
+            'on_progress': self.progress_callback(key)
+        }
+        try:
+            future = self._get_pool().submit(entry['account'], [item])
+        except ValueError as e:
+            self.update_state(key, STATE_FAILED, error=str(e))
+            return
+
+        self._in_flight.add(key)
+        future.add_done_callback(lambda done: self._on_publish_done(key, done))
+
+    def _on_publish_done(self, key, future):
+        try:
+            pool_result = future.result()
+            results = pool_result['results']
+            result = results[0] if results else {'success': False, 'message': pool_result['message']}
+        except Exception as e:
+            result = {'success': False, 'message': str(e)}
+
+        self.record_result(key, result)
+        with self._lock:
+            self._in_flight.discard(key)
+
+    def recover(self):
+        """
+        崩溃恢复：处理上次进程退出时未完成的发布记录
+        - queued/uploading: 分享按钮尚未点击，后台条目重新入队，直接发布的条目记为失败
+        - captioned: 分享按钮可能已经点击，先检查账号主页，确认未发布才重新入队
+        """
+        with self._lock:
+            pending = [dict(entry) for entry in self.entries.values()
+                       if entry['state'] in (STATE_QUEUED, STATE_UPLOADING, STATE_CAPTIONED)]
+
+        for entry in pending:
+            key = entry['key']
+            if entry['state'] in (STATE_QUEUED, STATE_UPLOADING):
+                if entry['dispatch'] == 'worker':
+                    self.update_state(key, STATE_QUEUED)
+                else:
+                    self.update_state(key, STATE_FAILED, error='发布过程中服务中断')
+            elif entry['state'] == STATE_CAPTIONED:
+                self._verify_on_profile(entry)
+
+        self.dispatch()
+
+    def _verify_on_profile(self, entry):
+        """
+        打开账号主页确认中断的发布是否已经生效
+        """
+        key = entry['key']
+
+        def check_task(publish_service, account):
+            return {'permalink': publish_service.find_recent_post(
+                account.username, entry['content'], entry.get('captioned_at', entry['updated_at']))}
+
+        def on_checked(future):
+            try:
+                permalink = future.result().get('permalink')
+            except Exception as e:
+                # 无法确认时宁可人工处理，也不冒重复发布的风险
+                self.update_state(key, STATE_NEEDS_REVIEW, error=f'恢复检查失败: {e}')
+                return
+
+            if permalink:
+                self.update_state(key, STATE_VERIFIED, permalink=permalink)
+            elif entry['dispatch'] == 'worker':
+                self.update_state(key, STATE_QUEUED)
+                self.dispatch()
+            else:
+                self.update_state(key, STATE_FAILED, error='发布过程中服务中断，主页未找到该帖子')
+
+        def on_done(future):
+            with self._lock:
+                self._in_flight.discard(key)
+            on_checked(future)
+
+        print(f"[发布发件箱] 发布记录 {key[:12]} 中断于captioned，检查账号主页...")
+        try:
+            future = self._get_pool().submit_task(entry['account'], check_task)
+        except ValueError as e:
+            self.update_state(key, STATE_NEEDS_REVIEW, error=str(e))
+            return
+        with self._lock:
+            self._in_flight.add(key)
+        future.add_done_callback(on_done)
+
+
+def get_outbox():
+    """
+    获取全局发布发件箱实例
+
+    Returns:
+        PublishOutbox: 发布发件箱
+    """
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = PublishOutbox()
+        return _outbox
@@ -0,0 +1,347 @@
+import os
+import time
+
+from service.ins_robot.login import InstagramLoginService, get_chrome_options, create_webdriver, get_browser_mode
+from service.ins_robot.media_upload_service import MediaUploadService
+from service.ins_robot.text_processing_service import TextProcessingService
+from service.ins_robot.session_store import INSTAGRAM_HOME_URL
+from service.ins_robot.publish_trace import start_trace, finish_trace, trace_span
+from service.ins_robot.browser_watchdog import get_watchdog, kill_process_tree
+from service.ins_robot.network_blocker import NetworkBlocker, DIALOG_ALLOWED_CATEGORIES
+
+
+class PublishService:
+    """
+    发布会话服务类，在同一个已登录的浏览器会话中执行一次或多次Instagram发布流程
+    """
+
+    def __init__(self, headless=None, account=None, mode=None):
+        """
+        初始化发布会话服务
+
+        Args:
+            headless: 是否使用无头模式启动浏览器（为None时按环境变量CHROME_MODE选择，默认lean）
+            account: InstagramAccount账号信息（可选，默认使用环境变量中的账号和默认Chrome配置）
+            mode: 浏览器模式（gui/headless/lean），优先级高于headless参数
+        """
+        self.mode = get_browser_mode(headless, mode)
+        self.account = account
+        self.driver = None
+        self.media_service = None
+        self.text_service = None
+        self.network_blocker = None
+        self.published_count = 0
+        # 是否有工作线程正在使用该会话（由使用者在整个任务期间设置），浏览器监控不会在使用中关闭会话
+        self.in_use = False
+
+    def start_session(self):
+        """
+        启动浏览器并登录Instagram，整个会话只执行一次
+
+        Returns:
+            bool: 会话是否启动成功
+        """
+        if self.driver and self.media_service:
+            return True
+
+        account_name = self.account.name if self.account else None
+        start_trace('session', account=account_name, mode=self.mode)
+        success = False
+        try:
+            print("[发布会话] 正在初始化浏览器...")
+            profile_dir = self.account.profile_dir if self.account else None
+            options = get_chrome_options(mode=self.mode, user_data_dir=profile_dir)
+            with trace_span('create_webdriver'):
+                self.driver = create_webdriver(options)
+            # 登记到浏览器监控，登录卡住时由监控结束浏览器进程
+            watchdog = get_watchdog()
+            watchdog.register(self)
+            # 在打开第一个页面之前开启网络屏蔽，登录时加载的主页也不下载动态中的图片和视频
+            self.network_blocker = NetworkBlocker(self.driver)
+            self.network_blocker.enable()
+
+            print("[发布会话] 开始登录Instagram...")
+            login_service = InstagramLoginService()
+            username = self.account.username if self.account else None
+            password = self.account.password if self.account else None
+            with watchdog.deadline(self, 'start_session'):
+                with trace_span('login'):
+                    logged_in = login_service.login(self.driver, username, password)
+                    self.network_blocker.record_page_metrics()
+                if not logged_in:
+                    print("[发布会话] Instagram登录失败")
+                    return False
+
+                # 等待页面完全加载
+                print("[发布会话] 登录成功，等待页面完全加载...")
+                with trace_span('post_login_wait'):
+                    time.sleep(5)
+
+            self.media_service = MediaUploadService(self.driver)
+            self.text_service = TextProcessingService(self.driver)
+            success = True
+            return True
+        finally:
+            # 登录失败或超时时关闭半初始化的浏览器，下次start_session重新启动而不是误报成功
+            if not success:
+                self.close_session()
+            finish_trace(success)
+
+    def close_session(self):
+        """
+        关闭浏览器会话
+        """
+        if self.driver:
+            get_watchdog().unregister(self)
+            try:
+                pid = self.driver.service.process.pid
+            except Exception:
+                pid = None
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"[发布会话] 关闭浏览器失败: {e}")
+            finally:
+                # quit失败或有残留的浏览器子进程时直接结束整个进程树
+                if pid:
+                    kill_process_tree(pid)
+                self.driver = None
+                self.media_service = None
+                self.text_service = None
+                self.network_blocker = None
+                self.published_count = 0
+
+    def _recycle_if_needed(self):
+        """
+        会话超过存活时间或内存上限时，关闭浏览器并重新登录
+
+        Returns:
+            bool: 会话是否可用
+        """
+        reason = get_watchdog().should_recycle(self)
+        if not reason:
+            return True
+        print(f"[发布会话] {reason}，重建浏览器会话...")
+        self.close_session()
+        return self.start_session()
+
+    def _return_to_home(self):
+        """
+        回到Instagram主页，为下一次发布做准备（关闭上一次发布后的弹窗）
+        """
+        print("[发布会话] 返回主页，准备下一次发布...")
+        if self.network_blocker:
+            # 上一次发布可能在上传对话框中失败，先恢复被临时放开的屏蔽
+            self.network_blocker.restore()
+        self.driver.get(INSTAGRAM_HOME_URL)
+        if self.network_blocker:
+            self.network_blocker.record_page_metrics()
+        time.sleep(3)
+
+    def publish_one(self, image_path, content='', on_progress=None):
+        """
+        在当前会话中发布一条帖子
+
+        Args:
+            image_path: 图片的绝对路径，轮播帖子为按顺序排列的路径列表
+            content: 帖子文案
+            on_progress: 发布阶段回调（可选），依次收到uploading、captioned、shared
+
+        Returns:
+            dict: 发布结果，包含success、message和失败的step，分享成功时包含confirmed、media_id和permalink
+        """
+        # 发布前检查会话是否需要重建（重建会话有自己的追踪记录，需在开始本次追踪之前完成）
+        if self.driver and not self._recycle_if_needed():
+            return {'success': False, 'step': 'session', 'message': '重建浏览器会话失败'}
+
+        account_name = self.account.name if self.account else None
+        trace = start_trace('publish', account=account_name, mode=self.mode, image_path=image_path)
+        result = None
+        try:
+            with get_watchdog().deadline(self, 'publish_one'):
+                result = self._publish_steps(image_path, content, on_progress)
+            trace.attrs['step'] = result['step']
+            return result
+        finally:
+            finish_trace(bool(result and result['success']))
+
+    def _publish_steps(self, image_path, content='', on_progress=None):
+        """
+        执行发布的各个步骤，每个步骤记录到当前的发布追踪中
+        """
+        def report(state):
+            if on_progress:
+                on_progress(state)
+
+        if not self.driver:
+            return {'success': False, 'step': 'session', 'message': '浏览器会话未启动'}
+
+        image_paths = image_path if isinstance(image_path, (list, tuple)) else [image_path]
+        missing_paths = [path for path in image_paths if not path or not os.path.exists(path)]
+        if not image_paths or missing_paths:
+            return {'success': False, 'step': 'validate', 'message': f'图片文件不存在: {missing_paths or image_path}'}
+
+        # 同一会话中的第二次及以后的发布需要先回到主页
+        if self.published_count > 0:
+            with trace_span('return_to_home'):
+                self._return_to_home()
+
+        print("[发布会话] 尝试点击创建帖子按钮...")
+        with trace_span('click_create_post_button'):
+            created = self.media_service.click_create_post_button()
+        if not created:
+            return {'success': False, 'step': 'create', 'message': '点击创建按钮失败'}
+
+        print("[发布会话] 创建按钮点击成功，等待上传界面...")
+        # 上传对话框中的图片需要正常加载，视频和统计上报仍然屏蔽
+        self.network_blocker.allow(*DIALOG_ALLOWED_CATEGORIES)
+        with trace_span('wait_for_upload_interface'):
+            upload_ready = self.media_service.wait_for_upload_interface()
+        if not upload_ready:
+            print("[发布会话 警告] 上传界面检测失败，但将继续尝试上传")
+
+        print(f"[发布会话] 尝试上传图片文件: {image_path}")
+        report('uploading')
+        with trace_span('upload_media', carousel=len(image_paths) > 1):
+            uploaded = self.media_service.upload_media(image_path)
+        if not uploaded:
+            return {'success': False, 'step': 'upload', 'message': '文件上传失败'}
+
+        print("[发布会话] 文件上传成功，点击两次下一步按钮...")
+        with trace_span('next_step_crop'):
+            self.media_service.go_to_next_step()
+        with trace_span('next_step_filter'):
+            self.media_service.go_to_next_step()
+
+        if content:
+            print("[发布会话] 开始处理文本内容...")
+            with trace_span('wait_for_textarea_ready'):
+                self.text_service.wait_for_textarea_ready()
+            processed_content = self.text_service.process_hashtags(content)
+            with trace_span('fill_caption', characters=len(processed_content)):
+                self.text_service.fill_caption_textarea(processed_content)
+            print("[发布会话] 文本内容填充完成")
+        else:
+            print("[发布会话] 没有文本内容需要填充")
+
+        # 从这里开始分享按钮可能已被点击，失败后不能直接重试
+        report('captioned')
+        print("[发布会话] 点击分享按钮...")
+        with trace_span('click_share_button'):
+            share_success = self.media_service.click_share_button()
+        self.network_blocker.restore()
+        if not share_success:
+            return {'success': False, 'step': 'share', 'message': '分享失败或发布接口返回错误'}
+
+        self.published_count += 1
+        report('shared')
+        share_result = self.media_service.last_share_result or {}
+        print("[发布会话] 本次发布流程执行完成")
+        return {
+            'success': True,
+            'step': 'share',
+            'message': '发布成功' if share_result.get('confirmed') else '已点击分享，但未收到发布确认',
+            'confirmed': bool(share_result.get('confirmed')),
+            'media_id': share_result.get('media_id'),
+            'permalink': share_result.get('permalink')
+        }
+
+    def publish_batch(self, items, start_index=0, skip_indexes=()):
+        """
+        在同一个会话中依次发布多条帖子，单条失败不影响后续条目
+
+        Args:
+            items: 发布条目列表，每个条目为包含image_path和content的字典（轮播帖子的image_path为路径列表）
+            start_index: 从第几个条目开始发布
+            skip_indexes: 需要跳过的条目序号（断点续发时已经成功的条目）
+
+        Returns:
+            list: 每个条目的发布结果
+        """
+        results = []
+        for index, item in enumerate(items):
+            if index < start_index or index in skip_indexes:
+                continue
+
+            print(f"[发布会话] 发布第 {index + 1}/{len(items)} 条: {item.get('image_path')}")
+            started_at = time.time()
+            try:
+                result = self.publish_one(item.get('image_path'), item.get('content', ''), item.get('on_progress'))
+            except Exception as e:
+                print(f"[发布会话] 第 {index + 1} 条发布时发生错误: {e}")
+                result = {'success': False, 'step': 'exception', 'message': str(e)}
+
+            result.update({
+                'index': index,
+                'weekday': item.get('weekday', ''),
+                'image_file': item.get('image_file', ''),
+                'image_path': item.get('image_path', ''),
+                'duration': round(time.time() - started_at, 2)
+            })
+            results.append(result)
+
+            # 发布失败后页面状态未知，回到主页后继续下一条
+            if not result['success'] and self.driver:
+                try:
+                    self._return_to_home()
+                except Exception as e:
+                    # 浏览器已崩溃或被监控结束，重建会话后继续
+                    print(f"[发布会话] 返回主页失败，重建浏览器会话: {e}")
+                    self.close_session()
+                    if not self.start_session():
+                        print("[发布会话] 重建浏览器会话失败，停止本批次")
+                        break
+
+        return results
+
+    def find_recent_post(self, username, content, since, max_posts=3):
+        """
+        在账号主页的最近几条帖子中查找指定文案的帖子，用于确认崩溃前是否已经发布
+
+        Args:
+            username: Instagram用户名
+            content: 帖子文案
+            since: 发布尝试开始的时间戳，早于该时间的帖子不计入
+            max_posts: 最多检查的帖子数量
+
+        Returns:
+            str: 找到的帖子链接，如果没有找到则返回None
+        """
+        with get_watchdog().deadline(self, 'find_recent_post'):
+            return self._find_recent_post(username, content, since, max_posts)
+
+    def _find_recent_post(self, username, content, since, max_posts):
+        from selenium.webdriver.common.by import By
+
+        print(f"[发布会话] 检查账号 {username} 主页最近 {max_posts} 条帖子...")
+        self.driver.get(f"{INSTAGRAM_HOME_URL}{username}/")
+        time.sleep(3)
+
+        post_links = []
+        for link in self.driver.find_elements(By.XPATH, "//a[contains(@href, '/p/')]"):
+            href = link.get_attribute('href')
+            if href and href not in post_links:
+                post_links.append(href)
+            if len(post_links) >= max_posts:
+                break
+
+        snippet = ' '.join((content or '').split())[:30]
+        for post_link in post_links:
+            self.driver.get(post_link)
+            time.sleep(2)
+
+            posted_at = self.driver.execute_script(
+                "var t = document.querySelector('time[datetime]');"
+                "return t ? Date.parse(t.getAttribute('datetime')) / 1000 : null;"
+            )
+            # 允许两分钟的时钟误差
+            if posted_at and posted_at < since - 120:
+                continue
+
+            page_text = ' '.join(self.driver.find_element(By.TAG_NAME, 'body').text.split())
+            if not snippet or snippet in page_text:
+                print(f"[发布会话] 在主页找到已发布的帖子: {post_link}")
+                return post_link
+
+        print("[发布会话] 主页中没有找到对应的帖子")
+        return None
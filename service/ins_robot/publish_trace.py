@@ -0,0 +1,262 @@
+import os
+import math
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_trace_file = os.path.join(base_dir, 'data', 'traces', 'publish_traces.jsonl')
+
+# 当前线程正在记录的发布追踪（每个发布工作线程独立）
+_local = threading.local()
+# 追踪文件写入锁
+_trace_file_lock = threading.Lock()
+
+
+class PublishTrace:
+    """
+    发布追踪类，记录一次发布流程中每个步骤的耗时、获胜的定位策略和重试次数
+    """
+
+    def __init__(self, kind='publish', **attrs):
+        """
+        初始化发布追踪
+
+        Args:
+            kind: 追踪类型，session为浏览器启动和登录，publish为单条帖子发布
+            attrs: 附加信息（账号、图片路径等）
+        """
+        self.trace_id = str(uuid.uuid4())
+        self.kind = kind
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.spans = []
+        self._span_stack = []
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        记录一个步骤的耗时，步骤内抛出的异常会被标记为error后继续抛出
+        """
+        span = {
+            'name': name,
+            'offset': round(time.time() - self.started_at, 3),
+            'status': 'ok',
+            'attrs': dict(attrs)
+        }
+        self._span_stack.append(span)
+        started_at = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span['status'] = 'error'
+            span['attrs']['error'] = str(e)
+            raise
+        finally:
+            span['duration'] = round(time.perf_counter() - started_at, 3)
+            self._span_stack.pop()
+            self.spans.append(span)
+
+    def annotate(self, **attrs):
+        """
+        为当前步骤添加信息
+        """
+        if self._span_stack:
+            self._span_stack[-1]['attrs'].update(attrs)
+
+    def to_dict(self, success=None):
+        return {
+            'trace_id': self.trace_id,
+            'kind': self.kind,
+            'started_at': self.started_at,
+            'duration': round(time.time() - self.started_at, 3),
+            'success': success,
+            'attrs': self.attrs,
+            'spans': self.spans
+        }
+
+
+def set_trace_file(trace_file):
+    """
+    修改默认的追踪文件路径（回放测试等场景使用独立文件，避免混入正式发布的统计）
+
+    Args:
+        trace_file: 追踪文件路径
+    """
+    global default_trace_file
+    default_trace_file = trace_file
+
+
+def start_trace(kind='publish', **attrs):
+    """
+    为当前线程开始一个新的发布追踪
+
+    Returns:
+        PublishTrace: 发布追踪
+    """
+    trace = PublishTrace(kind, **attrs)
+    _local.trace = trace
+    return trace
+
+
+def current_trace():
+    """
+    获取当前线程正在记录的发布追踪
+
+    Returns:
+        PublishTrace: 发布追踪，没有时返回None
+    """
+    return getattr(_local, 'trace', None)
+
+
+def finish_trace(success, trace_file=None):
+    """
+    结束当前线程的发布追踪并写入JSONL文件
+
+    Args:
+        success: 发布是否成功
+        trace_file: 追踪文件路径，默认为data/traces/publish_traces.jsonl
+
+    Returns:
+        dict: 追踪记录，没有正在记录的追踪时返回None
+    """
+    trace = current_trace()
+    if not trace:
+        return None
+    _local.trace = None
+
+    record = trace.to_dict(success)
+    trace_file = trace_file or default_trace_file
+    try:
+        with _trace_file_lock:
+            os.makedirs(os.path.dirname(trace_file), exist_ok=True)
+            with open(trace_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except Exception as e:
+        print(f"[发布追踪] 写入追踪记录失败: {e}")
+
+    summary = ', '.join(f"{span['name']}={span['duration']}s" for span in record['spans'])
+    print(f"[发布追踪] {record['kind']} 耗时 {record['duration']}s: {summary}")
+    return record
+
+
+@contextmanager
+def trace_span(name, **attrs):
+    """
+    在当前追踪中记录一个步骤，没有正在记录的追踪时不做任何事
+    """
+    trace = current_trace()
+    if not trace:
+        yield None
+        return
+    with trace.span(name, **attrs) as span:
+        yield span
+
+
+def record_locator(strategy, attempts, locator=None):
+    """
+    记录当前步骤中成功的定位策略和尝试次数
+
+    Args:
+        strategy: 成功的定位策略序号（从1开始），全部失败时为None
+        attempts: 尝试的定位策略数量
+        locator: 成功的定位表达式
+    """
+    trace = current_trace()
+    if trace:
+        trace.annotate(locator_strategy=strategy, locator_attempts=attempts, locator=locator)
+
+
+def annotate_span(**attrs):
+    """
+    为当前追踪中正在记录的步骤添加信息，没有正在记录的追踪时不做任何事
+    """
+    trace = current_trace()
+    if trace:
+        trace.annotate(**attrs)
+
+
+def load_traces(limit=100, kind=None, trace_file=None):
+    """
+    读取最近的追踪记录
+
+    Args:
+        limit: 最多返回的记录数
+        kind: 只返回指定类型的记录（可选）
+        trace_file: 追踪文件路径
+
+    Returns:
+        list: 追踪记录，最新的在前
+    """
+    trace_file = trace_file or default_trace_file
+    if not os.path.exists(trace_file):
+        return []
+
+    traces = []
+    with open(trace_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not kind or record.get('kind') == kind:
+                traces.append(record)
+    return list(reversed(traces[-limit:])) if limit else list(reversed(traces))
+
+
+def percentile(sorted_values, percent):
+    """
+    计算已排序数值的百分位数（最近秩法）
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def aggregate_step_stats(traces):
+    """
+    按步骤汇总耗时的p50/p95以及定位策略的获胜次数
+
+    Args:
+        traces: 追踪记录列表
+
+    Returns:
+        dict: {步骤名称: {count, errors, p50, p95, max, locator_wins, page_ready_p50, transfer_kb_p50}}
+    """
+    steps = {}
+    for trace in traces:
+        for span in trace.get('spans', []):
+            step = steps.setdefault(span['name'], {'durations': [], 'errors': 0, 'locator_wins': {}, 'retries': 0,
+                                                    'page_ready': [], 'transfer_bytes': []})
+            step['durations'].append(span['duration'])
+            if span.get('status') == 'error':
+                step['errors'] += 1
+            strategy = span.get('attrs', {}).get('locator_strategy')
+            if strategy is not None:
+                step['locator_wins'][str(strategy)] = step['locator_wins'].get(str(strategy), 0) + 1
+            step['retries'] += max(span.get('attrs', {}).get('locator_attempts', 1) - 1, 0)
+            # 打开页面的步骤记录了页面就绪时间和传输量
+            if span.get('attrs', {}).get('page_ready') is not None:
+                step['page_ready'].append(span['attrs']['page_ready'])
+            if span.get('attrs', {}).get('transfer_bytes') is not None:
+                step['transfer_bytes'].append(span['attrs']['transfer_bytes'])
+
+    stats = {}
+    for name, step in steps.items():
+        durations = sorted(step['durations'])
+        stats[name] = {
+            'count': len(durations),
+            'errors': step['errors'],
+            'p50': percentile(durations, 50),
+            'p95': percentile(durations, 95),
+            'max': durations[-1],
+            'locator_wins': step['locator_wins'],
+            'locator_retries': step['retries'],
+            'page_ready_p50': percentile(sorted(step['page_ready']), 50) if step['page_ready'] else None,
+            'transfer_kb_p50': round(percentile(sorted(step['transfer_bytes']), 50) / 1024, 1) if step['transfer_bytes'] else None
+        }
+    return stats
@@ -0,0 +1,171 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from service.ins_robot.account_registry import AccountRegistry
+from service.ins_robot.publish_service import PublishService
+
+# 全局发布工作池实例
+_publish_pool = None
+# 工作池锁，确保只创建一次
+_publish_pool_lock = threading.Lock()
+
+
+class PublishWorkerPool:
+    """
+    多账号发布工作池
+    - 不同账号的发布任务并发执行
+    - 同时运行的Chrome实例数量不超过max_browsers
+    - 同一账号的任务按提交顺序依次执行，不会同时发布
+    """
+
+    def __init__(self, max_browsers=2, registry=None):
+        """
+        初始化发布工作池
+
+        Args:
+            max_browsers: 本机同时运行的Chrome实例上限
+            registry: 账号注册表
+        """
+        self.max_browsers = max_browsers
+        self.registry = registry or AccountRegistry()
+        self.executor = ThreadPoolExecutor(max_workers=max_browsers, thread_name_prefix='publish-worker')
+        # 每个账号的待执行任务队列
+        self._pending = {}
+        # 正在执行任务的账号
+        self._busy = set()
+        self._lock = threading.Lock()
+
+    def submit(self, account_name, items, start_index=0, headless=None, skip_indexes=()):
+        """
+        提交一个账号的批量发布任务
+
+        Args:
+            account_name: 账号名称
+            items: 发布条目列表
+            start_index: 从第几个条目开始发布
+            skip_indexes: 需要跳过的条目序号（断点续发时已经成功的条目）
+            headless: 是否使用无头模式（为None时按环境变量CHROME_MODE选择）
+
+        Returns:
+            Future: 任务结果，完成后为{'success', 'message', 'results'}字典
+
+        Raises:
+            ValueError: 账号不存在
+        """
+        def publish_task(publish_service, account):
+            results = publish_service.publish_batch(items, start_index=start_index, skip_indexes=skip_indexes)
+            succeeded = sum(1 for result in results if result['success'])
+            return {
+                'success': succeeded == len(results),
+                'message': f'账号 {account.name} 发布完成，成功 {succeeded}/{len(results)} 条',
+                'results': results
+            }
+
+        return self.submit_task(account_name, publish_task, headless=headless)
+
+    def submit_task(self, account_name, task, headless=None):
+        """
+        提交一个需要该账号已登录浏览器会话的任务
+
+        Args:
+            account_name: 账号名称
+            task: 任务函数，参数为(PublishService, InstagramAccount)，返回结果字典
+            headless: 是否使用无头模式（为None时按环境变量CHROME_MODE选择）
+
+        Returns:
+            Future: 任务结果
+
+        Raises:
+            ValueError: 账号不存在
+        """
+        account = self.registry.get(account_name)
+        if not account:
+            raise ValueError(f"账号不存在: {account_name}")
+
+        future = Future()
+        with self._lock:
+            self._pending.setdefault(account.name, deque()).append((future, account, task, headless))
+            print(f"[发布工作池] 账号 {account.name} 提交任务，排队数: {len(self._pending[account.name])}")
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        """
+        将空闲账号的下一个任务交给线程池执行
+        """
+        with self._lock:
+            for account_name, queue in self._pending.items():
+                if queue and account_name not in self._busy:
+                    self._busy.add(account_name)
+                    task = queue.popleft()
+                    self.executor.submit(self._run_task, *task)
+
+    def _run_task(self, future, account, task, headless):
+        """
+        在工作线程中为一个账号启动浏览器会话并执行任务
+        """
+        if not future.set_running_or_notify_cancel():
+            self._finish(account.name)
+            return
+
+        print(f"[发布工作池] 账号 {account.name} 开始执行任务")
+        publish_service = PublishService(headless=headless, account=account)
+        # 整个任务期间标记会话正在使用，浏览器监控只请求重建，由本线程关闭会话
+        publish_service.in_use = True
+        try:
+            if not publish_service.start_session():
+                future.set_result({
+                    'success': False,
+                    'message': f'账号 {account.name} 登录失败',
+                    'results': []
+                })
+                return
+
+            future.set_result(task(publish_service, account))
+        except Exception as e:
+            print(f"[发布工作池] 账号 {account.name} 任务失败: {e}")
+            future.set_exception(e)
+        finally:
+            publish_service.close_session()
+            publish_service.in_use = False
+            self._finish(account.name)
+
+    def _finish(self, account_name):
+        """
+        标记账号空闲并调度该账号的下一个任务
+        """
+        with self._lock:
+            self._busy.discard(account_name)
+        self._dispatch()
+
+    def get_status(self):
+        """
+        获取工作池状态
+
+        Returns:
+            dict: 正在发布的账号和各账号排队的任务数
+        """
+        with self._lock:
+            return {
+                'max_browsers': self.max_browsers,
+                'busy_accounts': sorted(self._busy),
+                'pending': {name: len(queue) for name, queue in self._pending.items() if queue}
+            }
+
+
+def get_publish_pool():
+    """
+    获取全局发布工作池实例，Chrome实例上限通过环境变量MAX_CHROME_INSTANCES配置
+
+    Returns:
+        PublishWorkerPool: 发布工作池
+    """
+    global _publish_pool
+    with _publish_pool_lock:
+        if _publish_pool is None:
+            load_dotenv()
+            _publish_pool = PublishWorkerPool(max_browsers=int(os.getenv('MAX_CHROME_INSTANCES', 2)))
+        return _publish_pool
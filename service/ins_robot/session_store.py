@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import requests
+from dotenv import load_dotenv
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_session_dir = os.path.join(base_dir, 'data', 'sessions')
+
+load_dotenv()
+# Instagram站点地址，可通过环境变量INSTAGRAM_BASE_URL指向本地回放服务器
+INSTAGRAM_BASE_URL = os.getenv('INSTAGRAM_BASE_URL', 'https://www.instagram.com').rstrip('/')
+INSTAGRAM_HOME_URL = f"{INSTAGRAM_BASE_URL}/"
+# 同源的轻量页面，用于在不加载完整主页的情况下读写cookie和localStorage
+INSTAGRAM_LIGHT_URL = f"{INSTAGRAM_BASE_URL}/robots.txt"
+SESSION_COOKIE = "sessionid"
+# cookie剩余有效期小于该值时视为过期（秒）
+EXPIRY_MARGIN = 10 * 60
+# 快照超过该时间后，额外发送一次轻量请求确认会话仍然有效（秒）
+REMOTE_CHECK_AGE = 24 * 60 * 60
+
+
+class SessionStore:
+    """
+    会话快照存储类，按账号保存和恢复Instagram的cookie与localStorage
+    """
+
+    def __init__(self, session_dir=None):
+        """
+        初始化会话快照存储
+
+        Args:
+            session_dir: 快照保存目录，默认为data/sessions
+        """
+        self.session_dir = session_dir or default_session_dir
+
+    def _snapshot_path(self, username):
+        """
+        获取账号对应的快照文件路径
+        """
+        safe_name = "".join(ch for ch in username if ch.isalnum() or ch in "._-")
+        return os.path.join(self.session_dir, f"{safe_name}.json")
+
+    def save(self, driver, username):
+        """
+        保存当前浏览器中的cookie和localStorage快照
+
+        Args:
+            driver: Selenium WebDriver实例（需要处于instagram.com域名下）
+            username: Instagram用户名
+
+        Returns:
+            bool: 是否保存成功
+        """
+        try:
+            snapshot = {
+                'username': username,
+                'saved_at': time.time(),
+                'cookies': driver.get_cookies(),
+                'local_storage': driver.execute_script(
+                    "var items = {};"
+                    "for (var i = 0; i < window.localStorage.length; i++) {"
+                    "  var key = window.localStorage.key(i);"
+                    "  items[key] = window.localStorage.getItem(key);"
+                    "}"
+                    "return items;"
+                ) or {}
+            }
+
+            os.makedirs(self.session_dir, exist_ok=True)
+            snapshot_path = self._snapshot_path(username)
+            temp_path = snapshot_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(temp_path, snapshot_path)
+
+            print(f"[会话存储] 已保存账号 {username} 的会话快照，cookie数量: {len(snapshot['cookies'])}")
+            return True
+        except Exception as e:
+            print(f"[会话存储] 保存会话快照失败: {e}")
+            return False
+
+    def load(self, username):
+        """
+        读取账号的会话快照
+
+        Args:
+            username: Instagram用户名
+
+        Returns:
+            dict: 会话快照，如果不存在或读取失败则返回None
+        """
+        snapshot_path = self._snapshot_path(username)
+        if not os.path.exists(snapshot_path):
+            return None
+
+        try:
+            with open(snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[会话存储] 读取会话快照失败: {e}")
+            return None
+
+    def delete(self, username):
+        """
+        删除账号的会话快照（会话失效时调用）
+        """
+        snapshot_path = self._snapshot_path(username)
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+            print(f"[会话存储] 已删除账号 {username} 的会话快照")
+
+    @staticmethod
+    def is_cookie_valid(cookies):
+        """
+        根据sessionid cookie的过期时间判断会话是否有效
+
+        Args:
+            cookies: cookie列表
+
+        Returns:
+            bool: 会话cookie是否存在且未过期
+        """
+        for cookie in cookies or []:
+            if cookie.get('name') == SESSION_COOKIE and cookie.get('value'):
+                expiry = cookie.get('expiry')
+                return expiry is None or expiry - time.time() > EXPIRY_MARGIN
+        return False
+
+    def check_session_request(self, snapshot):
+        """
+        使用快照中的cookie发送一次轻量请求，确认会话在服务端仍然有效
+
+        Args:
+            snapshot: 会话快照
+
+        Returns:
+            bool: 会话是否有效
+        """
+        try:
+            cookies = {cookie['name']: cookie['value'] for cookie in snapshot.get('cookies', [])}
+            response = requests.get(
+                f"{INSTAGRAM_BASE_URL}/accounts/edit/",
+                cookies=cookies,
+                headers={'User-Agent': 'Mozilla/5.0'},
+                allow_redirects=False,
+                timeout=5
+            )
+            # 未登录时会被重定向到登录页
+            valid = response.status_code == 200
+            print(f"[会话存储] 轻量请求验证会话，状态码: {response.status_code}")
+            return valid
+        except Exception as e:
+            print(f"[会话存储] 轻量请求验证会话失败: {e}")
+            return False
+
+    def is_snapshot_valid(self, snapshot):
+        """
+        判断会话快照是否可以直接使用
+
+        Args:
+            snapshot: 会话快照
+
+        Returns:
+            bool: 快照是否有效
+        """
+        if not snapshot or not self.is_cookie_valid(snapshot.get('cookies')):
+            return False
+
+        # 较旧的快照额外做一次服务端验证
+        if time.time() - snapshot.get('saved_at', 0) > REMOTE_CHECK_AGE:
+            return self.check_session_request(snapshot)
+        return True
+
+    def restore(self, driver, snapshot):
+        """
+        将会话快照恢复到浏览器中（调用前需已打开instagram.com同源页面）
+
+        Args:
+            driver: Selenium WebDriver实例
+            snapshot: 会话快照
+
+        Returns:
+            bool: 是否恢复成功
+        """
+        try:
+            for cookie in snapshot.get('cookies', []):
+                cookie = {key: value for key, value in cookie.items()
+                          if key in ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry')}
+                if 'expiry' in cookie:
+                    cookie['expiry'] = int(cookie['expiry'])
+                try:
+                    driver.add_cookie(cookie)
+                except Exception as e:
+                    print(f"[会话存储] 恢复cookie {cookie.get('name')} 失败: {e}")
+
+            local_storage = snapshot.get('local_storage') or {}
+            if local_storage:
+                driver.execute_script(
+                    "var items = arguments[0];"
+                    "for (var key in items) { window.localStorage.setItem(key, items[key]); }",
+                    local_storage
+                )
+
+            print(f"[会话存储] 已恢复会话快照，cookie数量: {len(snapshot.get('cookies', []))}")
+            return self.is_cookie_valid(driver.get_cookies())
+        except Exception as e:
+            print(f"[会话存储] 恢复会话快照失败: {e}")
+            return False
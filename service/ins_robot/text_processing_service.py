@@ -5,6 +5,8 @@ from selenium.webdriver.common.keys import Keys
 import time
 import re
 
+from service.ins_robot.publish_trace import record_locator
+
 class TextProcessingService:
     """
     文本处理服务类，提供Instagram文本处理相关功能
@@ -56,6 +58,8 @@ class TextProcessingService:
                         EC.element_to_be_clickable((by, value))
                     )
                     
+                    record_locator(i + 1, i + 1, value)
+
                     # 判断元素类型
                     tag_name = text_element.tag_name.lower()
                     if tag_name == 'div' and text_element.get_attribute('contenteditable') == 'true':
@@ -72,6 +76,9 @@ class TextProcessingService:
                 except Exception as e:
                     print(f"[文本处理服务] 定位策略 {i+1} 失败: {e}")
             
+            if not text_element:
+                record_locator(None, len(caption_locators))
+
             if text_element:
                 # 根据元素类型采用不同的输入方式
                 if element_type == 'contenteditable_div':
@@ -1,106 +1,451 @@
 import os
-from openai import OpenAI
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from openai import OpenAI, DefaultHttpxClient, BadRequestError
+from service.organize.translation_cache import get_translation_cache
+from service.organize.caption_parser import IncrementalArrayParser, parse_captions
 
-def generate_ai_text(image_names):
+# 方舟（DeepSeek）接口地址和文案模型，接口地址可通过环境变量ARK_BASE_URL修改
+DEFAULT_ARK_BASE_URL = "https://ark.cn-beijing.volces.com/api/v3"
+AI_TEXT_MODEL = "deepseek-v3-1-terminus"
+# 提示词修改后递增，使翻译缓存中的旧结果失效
+PROMPT_VERSION = 3
+# 分批：每批图片名称的输入token上限、每条文案预估的输出token和单次请求的输出token上限
+CHUNK_INPUT_TOKENS = 600
+OUTPUT_TOKENS_PER_NAME = 80
+MAX_OUTPUT_TOKENS = 2000
+# 同时进行的请求数量和每分钟请求上限
+MAX_CONCURRENT_REQUESTS = 4
+REQUESTS_PER_MINUTE = 30
+# 连接池上限：整理页面的并发请求不多，保留少量长连接以复用TLS连接
+MAX_CONNECTIONS = 10
+MAX_KEEPALIVE_CONNECTIONS = 5
+KEEPALIVE_EXPIRY = 120
+# 建立连接的超时较短，生成文案的读取超时较长（秒）
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 120
+# 连接错误、429和5xx由SDK自动重试（指数退避）
+MAX_RETRIES = 3
+
+# 全局客户端及其创建时使用的配置
+_client = None
+_client_config = None
+# 客户端锁
+_client_lock = threading.Lock()
+# 接口是否支持JSON模式（response_format），请求被拒绝后置为False
+_json_mode_supported = True
+
+
+class RateLimiter:
+    """
+    请求速率限制，保证相邻两次请求的开始时间间隔不小于60/每分钟请求数
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE):
+        self.interval = 60 / requests_per_minute
+        self._next_at = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        等待直到可以发出下一次请求
+        """
+        with self._lock:
+            now = time.time()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+# 所有文案请求共用的速率限制
+_rate_limiter = RateLimiter()
+
+def get_ai_client():
+    """
+    获取共享的方舟OpenAI兼容客户端，多个请求和线程复用同一个连接池
+    只有API Key或接口地址变化时才重新创建
+    
+    Returns:
+        OpenAI: 客户端实例
+    """
+    global _client, _client_config
+    config = (os.environ.get("ARK_API_KEY"), os.environ.get("ARK_BASE_URL", DEFAULT_ARK_BASE_URL))
+    with _client_lock:
+        if _client is None or _client_config != config:
+            import httpx
+            
+            api_key, base_url = config
+            # 旧客户端可能仍在其他线程中使用，不主动关闭，释放引用后由垃圾回收关闭连接
+            _client = OpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                max_retries=MAX_RETRIES,
+                http_client=DefaultHttpxClient(
+                    timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY
+                    )
+                )
+            )
+            _client_config = config
+            print(f"[AI客户端] 已创建客户端: {base_url}")
+        return _client
+
+def estimate_tokens(text):
+    """
+    粗略估算文本的token数量：中文等非ASCII字符按每字1个，ASCII字符按每4个1个
     """
-    使用AI生成文案内容
+    return int(sum(1 if ord(ch) > 127 else 0.25 for ch in text)) + 1
+
+def split_into_chunks(image_names):
+    """
+    按token预算把图片名称分批，每批的输入和预估输出都不超过上限
     
     Args:
         image_names: 图片名称列表
     
     Returns:
-        dict: 包含生成的文案内容
+        list: 每批为[(原始序号, 图片名称), ...]
     """
+    max_names = max(MAX_OUTPUT_TOKENS // OUTPUT_TOKENS_PER_NAME, 1)
+    chunks = []
+    chunk = []
+    chunk_tokens = 0
+    for index, name in enumerate(image_names):
+        tokens = estimate_tokens(name) + 4
+        if chunk and (chunk_tokens + tokens > CHUNK_INPUT_TOKENS or len(chunk) >= max_names):
+            chunks.append(chunk)
+            chunk = []
+            chunk_tokens = 0
+        chunk.append((index, name))
+        chunk_tokens += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def _json_mode_enabled():
+    """
+    是否请求JSON模式输出：环境变量AI_JSON_MODE可关闭，接口不支持时自动关闭
+    """
+    return _json_mode_supported and os.environ.get("AI_JSON_MODE", "1").lower() not in ("0", "false", "off")
+
+def _chunk_request(image_names):
+    """
+    构建一批图片名称的翻译请求参数
+    """
+    count = len(image_names)
     
-    # 初始化OpenAI客户端
-    client = OpenAI(
-        base_url="https://ark.cn-beijing.volces.com/api/v3",
-        api_key=os.environ.get("ARK_API_KEY"),
-    )
-    
-    # 构建提示词
+    # 构建提示词：按序号列出名称，要求返回带index的JSON数组，避免漏译或错位
+    # JSON模式要求回复为对象，数组放在captions字段中
+    numbered_names = '\n'.join(f"{index}: {name}" for index, name in enumerate(image_names))
     prompt = f"""
-    请基于以下用户的5张图片名称，依次生成5个对应的英文翻译内容。
+    请将以下{count}个奢侈品图片名称依次翻译为对应的英文文案。
     
-    图片名称:
-    {', '.join(image_names)}
+    图片名称（序号: 名称）:
+    {numbered_names}
     
-    返回格式为JSON，包含5个文案字段：text1, text2, text3, text4, text5
+    只返回JSON，不要其他内容，格式为{{"captions": [{{"index": 序号, "text": "英文文案"}}, ...]}}。
+    captions共{count}个元素，index与上面的序号一一对应。
     """
     
+    request = {
+        'model': AI_TEXT_MODEL,
+        'messages': [
+            {"role": "system", "content": "你是一个专业的奢侈品英文翻译者。"},
+            {"role": "user", "content": prompt}
+        ],
+        'temperature': 0.7,
+        'max_tokens': min(count * OUTPUT_TOKENS_PER_NAME + 200, MAX_OUTPUT_TOKENS + 200)
+    }
+    if _json_mode_enabled():
+        request['response_format'] = {"type": "json_object"}
+    return request
+
+def _is_response_format_error(error):
+    """
+    判断请求错误是否由接口不支持response_format（JSON模式）引起
+    """
+    body = error.body if isinstance(getattr(error, 'body', None), dict) else {}
+    detail = body.get('error', body) if isinstance(body.get('error', body), dict) else {}
+    if detail.get('param') == 'response_format':
+        return True
+    message = f"{detail.get('message', '')} {error}".lower()
+    return 'response_format' in message or 'json_object' in message
+
+def _create_completion(request, stream=False):
+    """
+    发送请求，接口不支持JSON模式时去掉response_format重试一次，之后不再请求JSON模式
+    """
+    global _json_mode_supported
+    client = get_ai_client()
+    _rate_limiter.acquire()
     try:
-        # 发送请求到AI模型
-        completion = client.chat.completions.create(
-            model="deepseek-v3-1-terminus",
-            messages=[
-                {"role": "system", "content": "你是一个专业的奢侈品英文翻译者。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        
-        # 获取AI回复内容
-        ai_response = completion.choices[0].message.content
-        
-        print(f"AI生成成功: {ai_response}")
-        
-        # 清理AI回复，移除代码块标记
-        cleaned_response = ai_response.strip()
-        if cleaned_response.startswith('```json'):
-            cleaned_response = cleaned_response[7:].strip()  # 移除 ```json
-        if cleaned_response.endswith('```'):
-            cleaned_response = cleaned_response[:-3].strip()  # 移除 ```
+        return client.chat.completions.create(stream=stream, **request)
+    except BadRequestError as e:
+        # 只有错误确实与response_format有关时才关闭JSON模式，上下文超长、内容审核等错误直接抛出
+        if 'response_format' not in request or not _is_response_format_error(e):
+            raise
+        print(f"[AI文案生成] 接口不支持JSON模式，改用普通输出: {e}")
+        _json_mode_supported = False
+        request = {key: value for key, value in request.items() if key != 'response_format'}
+        _rate_limiter.acquire()
+        return client.chat.completions.create(stream=stream, **request)
+
+def _repair_missing(image_names, texts, on_caption=None):
+    """
+    只为缺失的序号重新请求一次，避免因个别文案缺失或格式错误而重新生成整批
+    
+    Args:
+        image_names: 本批图片名称列表
+        texts: 已解析出的文案列表，缺失的位置为None（会被原地补全）
+        on_caption: 补全一条文案后的回调（可选），参数为(本批内序号, 文案)
+    
+    Returns:
+        str: 补全请求的AI原始回复，不需要补全时返回空字符串
+    """
+    missing = [index for index, text in enumerate(texts) if text is None]
+    if not missing:
+        return ''
+    
+    print(f"[AI文案生成] 批次中 {len(missing)}/{len(texts)} 条文案缺失，只重新请求缺失的部分")
+    ai_response, repaired = _translate_chunk([image_names[index] for index in missing], repair=False)
+    for index, text in zip(missing, repaired):
+        if text:
+            texts[index] = text
+            if on_caption:
+                on_caption(index, text)
+    return ai_response
+
+def _translate_chunk(image_names, repair=True):
+    """
+    调用AI模型翻译一批图片名称
+    
+    Args:
+        image_names: 本批图片名称列表
+        repair: 是否为缺失的文案补充请求一次
+    
+    Returns:
+        tuple: (AI原始回复, 与图片名称按顺序对应的文案列表，仍然缺失的位置为None)
+    """
+    # 发送请求到AI模型
+    completion = _create_completion(_chunk_request(image_names))
+    
+    # 获取AI回复内容
+    ai_response = completion.choices[0].message.content or ''
+    print(f"[AI文案生成] 批次({len(image_names)}个名称)生成成功")
+    
+    texts = parse_captions(ai_response, len(image_names))
+    if repair:
+        repair_response = _repair_missing(image_names, texts)
+        if repair_response:
+            ai_response = f"{ai_response}\n{repair_response}"
+    return ai_response, texts
+
+def _stream_chunk(image_names, on_caption):
+    """
+    以流式请求翻译一批图片名称，每条文案解析完成后立即回调
+    
+    Args:
+        image_names: 本批图片名称列表
+        on_caption: 回调函数，参数为(本批内序号, 文案)
+    
+    Returns:
+        tuple: (AI原始回复, 与图片名称按顺序对应的文案列表，仍然缺失的位置为None)
+    """
+    count = len(image_names)
+    parser = IncrementalArrayParser()
+    texts = [None] * count
+    parts = []
+    
+    stream = _create_completion(_chunk_request(image_names), stream=True)
+    for event in stream:
+        if not event.choices:
+            continue
+        delta = event.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        for item in parser.feed(delta):
+            if isinstance(item, dict):
+                index, text = item.get('index'), item.get('text')
+            else:
+                index, text = None, item
+            if not isinstance(index, int):
+                # 没有index的元素按出现顺序对应
+                index = next((i for i, value in enumerate(texts) if value is None), None)
+            if isinstance(index, int) and 0 <= index < count and texts[index] is None \
+                    and isinstance(text, str) and text.strip():
+                texts[index] = text.strip()
+                on_caption(index, texts[index])
+    
+    ai_response = ''.join(parts)
+    print(f"[AI文案生成] 批次({count}个名称)流式生成完成")
+    
+    # 流式解析漏掉的元素（如回复格式不规范）再按完整回复解析一次
+    for index, text in enumerate(parse_captions(ai_response, count)):
+        if texts[index] is None and text:
+            texts[index] = text
+            on_caption(index, text)
+    
+    repair_response = _repair_missing(image_names, texts, on_caption)
+    if repair_response:
+        ai_response = f"{ai_response}\n{repair_response}"
+    return ai_response, texts
+
+def _lookup_cache(cache, image_names):
+    """
+    查询翻译缓存
+    
+    Returns:
+        tuple: (与图片名称对应的缓存文案列表（未命中为None）, 命中数量, 需要翻译的名称列表)
+    """
+    texts = [cache.get(name, AI_TEXT_MODEL, PROMPT_VERSION) for name in image_names]
+    cache_hits = sum(1 for text in texts if text)
+    
+    # 缓存键相同的名称（如同一商品的不同格式）只翻译一次
+    missing_names = {}
+    for name, text in zip(image_names, texts):
+        if text is None:
+            missing_names.setdefault(cache.make_key(name), name)
+    return texts, cache_hits, list(missing_names.values())
+
+def generate_ai_text(image_names):
+    """
+    使用AI生成文案内容，支持任意数量的图片名称
+    - 先查询翻译缓存，只把未命中的图片名称发送给AI模型
+    - 未命中的名称按token预算分批，在速率限制内并发请求，结果按原始顺序组装
+    
+    Args:
+        image_names: 图片名称列表
+    
+    Returns:
+        dict: texts与image_names一一对应（生成失败的位置为空字符串），
+              failed为生成失败的序号，cache_hits为缓存命中数，api_calls为AI调用次数
+    """
+    cache = get_translation_cache()
+    texts, cache_hits, missing_names = _lookup_cache(cache, image_names)
+    
+    chunks = split_into_chunks(missing_names)
+    if chunks:
+        print(f"[AI文案生成] 缓存命中 {cache_hits} 个，{len(missing_names)} 个名称分 {len(chunks)} 批请求AI")
+    else:
+        print(f"[AI文案生成] 全部 {cache_hits} 个名称命中缓存，无需调用AI")
+    
+    translations = {}
+    ai_responses = [''] * len(chunks)
+    errors = []
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        futures = {
+            executor.submit(_translate_chunk, [name for _, name in chunk]): chunk_index
+            for chunk_index, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            chunk_index = futures[future]
+            chunk = chunks[chunk_index]
+            try:
+                ai_responses[chunk_index], chunk_texts = future.result()
+            except Exception as e:
+                print(f"[AI文案生成] 第 {chunk_index + 1} 批生成失败: {e}")
+                errors.append(str(e))
+                continue
+            chunk_translations = {name: text for (_, name), text in zip(chunk, chunk_texts) if text}
+            # 每批完成后立即写入缓存，其他批次失败也不影响已生成的结果
+            cache.put_many(chunk_translations, AI_TEXT_MODEL, PROMPT_VERSION)
+            translations.update(chunk_translations)
+    
+    translated_by_key = {cache.make_key(name): text for name, text in translations.items()}
+    texts = [text or translated_by_key.get(cache.make_key(name)) for name, text in zip(image_names, texts)]
+    failed = [index for index, text in enumerate(texts) if not text]
+    
+    result = {
+        "success": not failed,
+        "texts": [text or '' for text in texts],
+        "failed": failed,
+        "ai_response": '\n'.join(response for response in ai_responses if response),
+        "cache_hits": cache_hits,
+        "api_calls": len(chunks)
+    }
+    if failed:
+        result["error"] = '; '.join(errors) or f"{len(failed)} 个名称没有返回文案"
+        print(f"AI生成失败: {result['error']}")
+    return result
+
+def stream_ai_text(image_names):
+    """
+    流式生成文案：缓存命中的文案立即返回，其余名称分批并发流式请求，每条文案完成后立即返回
+    
+    Args:
+        image_names: 图片名称列表
+    
+    Yields:
+        dict: 事件，type为caption（index、text、source）、error（message）或done（failed、cache_hits、api_calls）
+    """
+    cache = get_translation_cache()
+    texts, cache_hits, missing_names = _lookup_cache(cache, image_names)
+    
+    # 同一缓存键可能对应多个位置
+    positions = {}
+    for index, name in enumerate(image_names):
+        positions.setdefault(cache.make_key(name), []).append(index)
+    
+    for index, text in enumerate(texts):
+        if text:
+            yield {'type': 'caption', 'index': index, 'text': text, 'source': 'cache'}
+    
+    chunks = split_into_chunks(missing_names)
+    print(f"[AI文案生成] 流式生成：缓存命中 {cache_hits} 个，{len(missing_names)} 个名称分 {len(chunks)} 批请求AI")
+    
+    events = queue.Queue()
+    
+    def run_chunk(chunk):
+        names = [name for _, name in chunk]
         
-        # 解析AI回复，提取文案内容
-        texts = []
+        def on_caption(index, text):
+            for position in positions[cache.make_key(names[index])]:
+                events.put({'type': 'caption', 'index': position, 'text': text, 'source': 'ai'})
         
-        # 尝试解析JSON格式的回复
         try:
-            import json
-            ai_data = json.loads(cleaned_response)
-            # 如果AI返回的是JSON对象，提取text1到text5字段
-            for i in range(1, 6):
-                key = f"text{i}"
-                if key in ai_data and ai_data[key].strip():
-                    texts.append(ai_data[key].strip())
-        except json.JSONDecodeError:
-            # 如果不是JSON格式，按行分割处理
-            lines = [line.strip() for line in cleaned_response.split('\n') if line.strip()]
-            for line in lines:
-                # 跳过JSON标记和空行
-                if line in ['{', '}', '[', ']'] or line.startswith('"') and line.endswith('"'):
-                    continue
-                # 提取引号内的内容
-                if '"' in line:
-                    parts = line.split('"')
-                    if len(parts) >= 4:  # key": "value"
-                        value = parts[3]
-                        if value.strip() and value != '':
-                            texts.append(value.strip())
-                elif line.strip() and not line.startswith('{'):
-                    texts.append(line.strip())
-        
-        # 确保返回5个文案，不足则补充
-        while len(texts) < 5:
-            texts.append(f"AI生成的精彩文案{len(texts) + 1}")
-        
-        # 只取前5个
-        texts = texts[:5]
-        
-        return {
-            "success": True,
-            "texts": texts[:5],
-            "ai_response": ai_response
-        }
+            _, chunk_texts = _stream_chunk(names, on_caption)
+            cache.put_many({name: text for name, text in zip(names, chunk_texts) if text}, AI_TEXT_MODEL, PROMPT_VERSION)
+        except Exception as e:
+            print(f"[AI文案生成] 流式批次生成失败: {e}")
+            events.put({'type': 'error', 'message': str(e)})
+        finally:
+            events.put(None)
+    
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+    try:
+        for chunk in chunks:
+            executor.submit(run_chunk, chunk)
         
-    except Exception as e:
-        print(f"AI生成失败: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "texts": ["AI生成失败，使用默认文案1", "AI生成失败，使用默认文案2", "AI生成失败，使用默认文案3", "AI生成失败，使用默认文案4", "AI生成失败，使用默认文案5"]
-        }
+        # 每个批次结束时放入一个None，全部结束后停止读取
+        remaining = len(chunks)
+        while remaining:
+            event = events.get()
+            if event is None:
+                remaining -= 1
+                continue
+            if event['type'] == 'caption':
+                texts[event['index']] = event['text']
+            yield event
+    except GeneratorExit:
+        # 浏览器断开连接：取消还没有开始的批次，不再为没有人读取的结果请求AI
+        print("[AI文案生成] 客户端已断开，取消未开始的批次")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    
+    yield {
+        'type': 'done',
+        'failed': [index for index, text in enumerate(texts) if not text],
+        'cache_hits': cache_hits,
+        'api_calls': len(chunks)
+    }
 
 if __name__ == "__main__":
     # 测试函数 - 使用data/photoshop文件夹中的实际图片
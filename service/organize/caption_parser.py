@@ -0,0 +1,206 @@
+import re
+import json
+
+# 可以作为文案数组的对象字段名（JSON模式下回复必须是对象）
+ARRAY_KEYS = ('captions', 'items', 'texts', 'results', 'data')
+# 旧格式的textN字段
+TEXT_KEY_PATTERN = re.compile(r'^text(\d+)$')
+
+
+class IncrementalArrayParser:
+    """
+    流式解析文案数组：逐段输入AI回复，每当数组中的一个元素完整后立即解析返回
+    数组之前的内容（代码块标记、{"captions": 等）会被跳过
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.position = 0
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+
+    def feed(self, text):
+        """
+        输入一段回复内容
+
+        Returns:
+            list: 本段内容中完整结束的数组元素
+        """
+        self.buffer += text
+        items = []
+        while self.position < len(self.buffer):
+            ch = self.buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+                if self.started and self.depth == 1 and self.item_start is None:
+                    self.item_start = self.position
+            elif not self.started:
+                # 从第一个数组开始解析
+                if ch == '[':
+                    self.started = True
+                    self.depth = 1
+            elif ch in '[{':
+                self.depth += 1
+                if self.depth == 2:
+                    self.item_start = self.position
+            elif ch in ']}':
+                self.depth -= 1
+                if self.depth == 1 and self.item_start is not None:
+                    items.append(self._take_item(self.position + 1))
+                elif self.depth == 0 and self.item_start is not None:
+                    # 数组的最后一个字符串元素
+                    items.append(self._take_item(self.position))
+            elif ch == ',' and self.depth == 1 and self.item_start is not None:
+                # 字符串等非对象元素以逗号结束
+                items.append(self._take_item(self.position))
+            self.position += 1
+        return [item for item in items if item is not None]
+
+    def _take_item(self, end):
+        text = self.buffer[self.item_start:end]
+        self.item_start = None
+        return load_json(text)
+
+
+def _remove_trailing_commas(text):
+    """
+    去掉字符串之外、紧跟在]或}之前的逗号
+    """
+    result = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in ']}':
+            while result and result[-1].isspace():
+                result.pop()
+            if result and result[-1] == ',':
+                result.pop()
+        result.append(ch)
+    return ''.join(result)
+
+
+def load_json(text):
+    """
+    宽松地解析一段JSON：允许末尾多余的逗号和JSON之后的说明文字
+
+    Returns:
+        解析结果，无法解析时返回None
+    """
+    text = text.strip()
+    if not text:
+        return None
+    for candidate in (text, _remove_trailing_commas(text)):
+        try:
+            return json.JSONDecoder().raw_decode(candidate)[0]
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def extract_json(ai_response, accept=None):
+    """
+    从AI回复中提取JSON值（对象或数组），可以夹在代码块标记或说明文字之间
+
+    Args:
+        ai_response: AI原始回复
+        accept: 判断解析结果是否可用的函数（可选），不可用时继续向后查找，
+            避免说明文字中的[0]之类的片段被当作结果
+
+    Returns:
+        第一个可用的解析结果，没有可用的JSON时返回None
+    """
+    for match in re.finditer(r'[\[{]', ai_response or ''):
+        data = load_json(ai_response[match.start():])
+        if isinstance(data, (list, dict)) and (accept is None or accept(data)):
+            return data
+    return None
+
+
+def validate_captions(data, count):
+    """
+    按文案数组的结构校验解析结果：[{"index": 序号, "text": "文案"}, ...]
+    兼容{"captions": [...]}、字符串数组和旧的textN字段
+
+    Args:
+        data: 解析后的JSON
+        count: 期望的文案数量
+
+    Returns:
+        list: 与序号对应的文案列表，缺失或不合法的位置为None
+    """
+    texts = [None] * count
+    if isinstance(data, dict):
+        items = next((data[key] for key in ARRAY_KEYS if isinstance(data.get(key), list)), None)
+        if items is None:
+            items = next((value for value in data.values() if isinstance(value, list)), None)
+        if items is None:
+            # 旧格式：{"text1": "...", "text2": "..."}
+            for key, value in data.items():
+                match = TEXT_KEY_PATTERN.match(str(key))
+                if match:
+                    _set_caption(texts, int(match.group(1)) - 1, value)
+            return texts
+        data = items
+
+    if not isinstance(data, list):
+        return texts
+
+    for position, item in enumerate(data):
+        if isinstance(item, dict):
+            _set_caption(texts, item.get('index', position), item.get('text'))
+        else:
+            _set_caption(texts, position, item)
+    return texts
+
+
+def _set_caption(texts, index, text):
+    """
+    写入一条通过校验的文案：序号在范围内、文案为非空字符串且之前没有写入过
+    """
+    if isinstance(index, str) and index.strip().isdigit():
+        index = int(index)
+    if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < len(texts):
+        return
+    if not isinstance(text, str) or not text.strip() or texts[index] is not None:
+        return
+    texts[index] = text.strip()
+
+
+def parse_captions(ai_response, count):
+    """
+    解析AI回复中的文案：先按完整JSON解析，失败时（如回复被截断）用流式解析器取出已经完整的元素
+
+    Args:
+        ai_response: AI原始回复
+        count: 期望的文案数量
+
+    Returns:
+        list: 与序号对应的文案列表，缺失的位置为None
+    """
+    # 只接受至少包含一条合法文案的JSON
+    data = extract_json(ai_response, lambda value: any(validate_captions(value, count)))
+    texts = validate_captions(data, count) if data is not None else [None] * count
+    if all(texts):
+        return texts
+
+    # 截断或格式错误的回复：取出其中已经完整的元素
+    salvaged = validate_captions(IncrementalArrayParser().feed(ai_response or ''), count)
+    return [text or salvaged[index] for index, text in enumerate(texts)]
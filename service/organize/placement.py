@@ -0,0 +1,135 @@
+import os
+import errno
+import shutil
+import platform
+from dotenv import load_dotenv
+
+# 放置方式：auto依次尝试reflink、hardlink，最后复制；move为同一卷上的原子移动（源文件不再保留）
+PLACEMENT_MODES = ('auto', 'reflink', 'hardlink', 'move', 'copy')
+# Linux上克隆文件数据块的ioctl（btrfs、XFS等写时复制文件系统支持）
+FICLONE = 0x40049409
+
+# 表示文件系统不支持该方式的错误码，其他错误（如源文件不存在）直接抛出
+UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EPERM, errno.EMLINK}
+
+# 已确认不可用的(目标卷, 方式)，同一批文件不再重复尝试
+_unsupported = set()
+
+
+def get_placement_mode(mode=None):
+    """
+    确定放置方式：显式传入的mode优先，其次读取环境变量ORGANIZE_PLACEMENT（默认auto）
+
+    Returns:
+        str: 放置方式
+    """
+    if mode is None:
+        load_dotenv()
+        mode = os.getenv('ORGANIZE_PLACEMENT', 'auto').lower()
+    if mode not in PLACEMENT_MODES:
+        print(f"[文件放置] 未知的放置方式 {mode}，使用auto")
+        mode = 'auto'
+    return mode
+
+
+def same_volume(source, target_dir):
+    """
+    判断源文件和目标目录是否在同一个卷上（硬链接和原子移动的前提）
+    """
+    try:
+        return os.stat(source).st_dev == os.stat(target_dir).st_dev
+    except OSError:
+        return False
+
+
+def _reflink(source, target):
+    """
+    创建写时复制的克隆文件：共享数据块但修改互不影响，只在Linux的CoW文件系统上可用
+    """
+    if platform.system() != 'Linux':
+        raise OSError(errno.EOPNOTSUPP, 'reflink只支持Linux')
+    import fcntl
+
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(target)
+            raise
+    shutil.copystat(source, target)
+
+
+def _hardlink(source, target):
+    os.link(source, target)
+
+
+def _move(source, target):
+    os.replace(source, target)
+
+
+def _copy(source, target):
+    shutil.copy2(source, target)
+
+
+_PLACERS = {
+    'reflink': _reflink,
+    'hardlink': _hardlink,
+    'move': _move,
+    'copy': _copy
+}
+
+
+def place_file(source, target, mode=None):
+    """
+    把文件放到目标位置，同一卷上优先使用reflink或硬链接，不复制文件内容
+    先放到目标目录中的临时文件再原子替换，目标位置不会出现写了一半的文件
+
+    注意：硬链接与源文件共享同一份数据，之后修改这两个文件时必须写入新文件再替换，不能原地改写
+
+    Args:
+        source: 源文件路径
+        target: 目标文件路径
+        mode: 放置方式（auto/reflink/hardlink/move/copy），默认读取环境变量ORGANIZE_PLACEMENT
+
+    Returns:
+        str: 实际使用的方式（reflink/hardlink/move/copy/existing）
+    """
+    mode = get_placement_mode(mode)
+    target_dir = os.path.dirname(os.path.abspath(target))
+    os.makedirs(target_dir, exist_ok=True)
+
+    # 目标已经是源文件的硬链接时无需处理
+    if mode != 'move' and os.path.exists(target) and os.path.samefile(source, target):
+        return 'existing'
+
+    if mode == 'auto':
+        candidates = ['reflink', 'hardlink', 'copy'] if same_volume(source, target_dir) else ['copy']
+    elif mode == 'copy' or same_volume(source, target_dir):
+        candidates = [mode, 'copy'] if mode != 'copy' else ['copy']
+    else:
+        print(f"[文件放置] {os.path.basename(source)} 与目标不在同一卷上，改为复制")
+        candidates = ['copy']
+
+    device = os.stat(target_dir).st_dev
+    temp_target = os.path.join(target_dir, f".{os.path.basename(target)}.placing")
+    for method in candidates:
+        if (device, method) in _unsupported:
+            continue
+        try:
+            if os.path.exists(temp_target):
+                os.remove(temp_target)
+            _PLACERS[method](source, temp_target)
+            os.replace(temp_target, target)
+        except OSError as e:
+            if method == 'copy' or e.errno not in UNSUPPORTED_ERRNOS:
+                raise
+            print(f"[文件放置] 目标卷不支持 {method}，改用下一种方式: {e}")
+            if e.errno != errno.EMLINK:
+                _unsupported.add((device, method))
+            continue
+        # 跨卷移动时退回了复制，同样删除源文件以保持move的语义
+        if mode == 'move' and method != 'move':
+            os.remove(source)
+        return method
+    raise OSError(f"无法放置文件: {source}")
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import threading
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_cache_dir = os.path.join(base_dir, 'data', 'ai_cache')
+
+# 全局缓存实例
+_cache = None
+# 缓存实例锁
+_cache_lock = threading.Lock()
+
+
+class TranslationCache:
+    """
+    图片名称翻译缓存，按图片名称保存AI生成的英文文案
+    每条记录带有模型和提示词版本，模型或提示词变化后旧记录不再命中
+    """
+
+    def __init__(self, cache_dir=None):
+        """
+        初始化翻译缓存
+
+        Args:
+            cache_dir: 缓存目录，默认为data/ai_cache
+        """
+        self.cache_dir = cache_dir or default_cache_dir
+        self.cache_file = os.path.join(self.cache_dir, 'translations.json')
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self):
+        """
+        读取缓存文件，文件不存在或损坏时返回空缓存
+        """
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[翻译缓存] 读取缓存失败，使用空缓存: {e}")
+            return {}
+
+    def _save(self):
+        """
+        原子写入缓存文件
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_file = self.cache_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.cache_file)
+
+    @staticmethod
+    def make_key(image_name):
+        """
+        生成缓存键：去掉扩展名、统一大小写和空白，同一商品的不同格式图片共用翻译
+        """
+        stem = os.path.splitext(os.path.basename(image_name))[0]
+        return ' '.join(stem.lower().split())
+
+    def get(self, image_name, model, prompt_version):
+        """
+        查询图片名称的翻译
+
+        Returns:
+            str: 缓存的文案，未命中或模型、提示词版本不一致时返回None
+        """
+        with self._lock:
+            entry = self.entries.get(self.make_key(image_name))
+        if entry and entry.get('model') == model and entry.get('prompt_version') == prompt_version:
+            return entry['text']
+        return None
+
+    def put_many(self, translations, model, prompt_version):
+        """
+        写入一批翻译结果
+
+        Args:
+            translations: {图片名称: 文案}
+            model: 生成文案使用的模型
+            prompt_version: 提示词版本
+        """
+        if not translations:
+            return
+        now = time.time()
+        with self._lock:
+            for image_name, text in translations.items():
+                self.entries[self.make_key(image_name)] = {
+                    'name': image_name,
+                    'text': text,
+                    'model': model,
+                    'prompt_version': prompt_version,
+                    'created_at': now
+                }
+            try:
+                self._save()
+            except Exception as e:
+                print(f"[翻译缓存] 保存缓存失败: {e}")
+        print(f"[翻译缓存] 新增 {len(translations)} 条翻译，共 {len(self.entries)} 条")
+
+
+def get_translation_cache():
+    """
+    获取全局翻译缓存实例
+
+    Returns:
+        TranslationCache: 翻译缓存
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache()
+        return _cache
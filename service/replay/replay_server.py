@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from html import escape
+from http.cookies import SimpleCookie
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+# 录制的Instagram页面快照目录
+default_snapshot_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+
+SESSION_COOKIE = 'sessionid'
+
+
+class ReplayServer:
+    """
+    Instagram回放服务器，使用本地页面快照模拟登录、创建、裁剪、说明文字和分享界面，
+    用于在不访问真实Instagram的情况下运行和测量Selenium发布流程
+    """
+
+    def __init__(self, snapshot_dir=None, host='127.0.0.1', port=0, upload_delay=1.0, share_delay=1.0):
+        """
+        初始化回放服务器
+
+        Args:
+            snapshot_dir: 页面快照目录，默认为service/replay/snapshots
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            upload_delay: 模拟上传处理的耗时（秒）
+            share_delay: 模拟分享请求的耗时（秒）
+        """
+        self.snapshot_dir = snapshot_dir or default_snapshot_dir
+        self.host = host
+        self.port = port
+        self.upload_delay = upload_delay
+        self.share_delay = share_delay
+        self.sessions = {}
+        self.posts = []
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """
+        在后台线程中启动服务器
+
+        Returns:
+            str: 服务器地址
+        """
+        handler = type('BoundReplayHandler', (ReplayRequestHandler,), {'replay': self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"[回放服务器] 已启动: {self.base_url}")
+        return self.base_url
+
+    def stop(self):
+        """
+        停止服务器
+        """
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+            print("[回放服务器] 已停止")
+
+    def read_snapshot(self, name):
+        """
+        读取页面快照内容，不存在时返回None
+        """
+        path = os.path.join(self.snapshot_dir, os.path.basename(name))
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def login(self, username, password):
+        """
+        模拟登录，用户名和密码不为空即视为成功
+
+        Returns:
+            str: 新的会话id，登录失败返回None
+        """
+        if not username or not password:
+            return None
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[session_id] = username
+        print(f"[回放服务器] 账号 {username} 登录成功")
+        return session_id
+
+    def get_username(self, session_id):
+        with self._lock:
+            return self.sessions.get(session_id)
+
+    def create_post(self, username, caption, image_count):
+        """
+        记录一条已分享的帖子
+
+        Returns:
+            dict: 帖子信息
+        """
+        post = {
+            'id': str(int(time.time() * 1000)),
+            'code': uuid.uuid4().hex[:11],
+            'username': username,
+            'caption': caption,
+            'image_count': image_count,
+            'taken_at': time.time()
+        }
+        with self._lock:
+            self.posts.append(post)
+        print(f"[回放服务器] 账号 {username} 分享帖子 {post['code']}")
+        return post
+
+    def find_post(self, code):
+        with self._lock:
+            return next((post for post in self.posts if post['code'] == code), None)
+
+    def list_posts(self, username=None):
+        with self._lock:
+            return [dict(post) for post in reversed(self.posts) if not username or post['username'] == username]
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    """
+    回放服务器请求处理器
+    """
+
+    replay = None
+
+    def log_message(self, format, *args):
+        # 不输出每个请求的访问日志
+        pass
+
+    def _session_username(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        morsel = cookie.get(SESSION_COOKIE)
+        return self.replay.get_username(morsel.value) if morsel else None
+
+    def _send(self, status, body='', content_type='text/html; charset=utf-8', headers=None):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False), 'application/json; charset=utf-8')
+
+    def _redirect(self, location, headers=None):
+        self._send(302, '', headers=dict(headers or {}, Location=location))
+
+    def _read_form(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        return {key: values[0] for key, values in form.items()}
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        username = self._session_username()
+
+        if path == '/robots.txt':
+            return self._send(200, 'User-agent: *\nDisallow:\n', 'text/plain; charset=utf-8')
+
+        if path == '/':
+            if not username:
+                return self._send(200, self.replay.read_snapshot('login.html'))
+            config = {'uploadDelay': int(self.replay.upload_delay * 1000), 'shareDelay': int(self.replay.share_delay * 1000)}
+            page = self.replay.read_snapshot('home.html').replace(
+                '<!--REPLAY_CONFIG-->', f"<script>window.REPLAY_CONFIG = {json.dumps(config)};</script>")
+            return self._send(200, page)
+
+        if path == '/accounts/login/':
+            return self._send(200, self.replay.read_snapshot('login.html'))
+
+        if path == '/accounts/edit/':
+            if not username:
+                return self._redirect('/accounts/login/')
+            return self._send(200, '<html><body>编辑主页</body></html>')
+
+        if path == '/replay/replay.js':
+            return self._send(200, self.replay.read_snapshot('replay.js'), 'application/javascript; charset=utf-8')
+
+        if path.startswith('/replay/snapshots/'):
+            snapshot = self.replay.read_snapshot(path.rsplit('/', 1)[-1])
+            if snapshot is None:
+                return self._send(404, 'Not Found', 'text/plain; charset=utf-8')
+            return self._send(200, snapshot)
+
+        if path == '/replay/posts':
+            return self._send_json(200, {'posts': self.replay.list_posts()})
+
+        post_match = re.fullmatch(r'/p/([\w-]+)/?', path)
+        if post_match:
+            post = self.replay.find_post(post_match.group(1))
+            if not post:
+                return self._send(404, 'Not Found', 'text/plain; charset=utf-8')
+            taken_at = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(post['taken_at']))
+            return self._send(200, f'<html><body><article><time datetime="{taken_at}">{taken_at}</time>'
+                                   f'<h1>{escape(post["caption"])}</h1></article></body></html>')
+
+        profile_match = re.fullmatch(r'/([\w.]+)/?', path)
+        if profile_match:
+            links = ''.join(f'<a href="/p/{post["code"]}/">{post["code"]}</a>'
+                            for post in self.replay.list_posts(profile_match.group(1)))
+            return self._send(200, f'<html><body><main>{links}</main></body></html>')
+
+        self._send(404, 'Not Found', 'text/plain; charset=utf-8')
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+
+        if path == '/accounts/login/ajax/':
+            form = self._read_form()
+            session_id = self.replay.login(form.get('username'), form.get('password'))
+            if not session_id:
+                return self._redirect('/accounts/login/')
+            cookie = f"{SESSION_COOKIE}={session_id}; Path=/; Max-Age={365 * 24 * 60 * 60}; HttpOnly"
+            return self._redirect('/', {'Set-Cookie': cookie})
+
+        if path == '/api/v1/media/configure/':
+            username = self._session_username()
+            if not username:
+                return self._send_json(403, {'status': 'fail', 'message': 'login_required'})
+            form = self._read_form()
+            post = self.replay.create_post(username, form.get('caption', ''), int(form.get('image_count') or 1))
+            return self._send_json(200, {
+                'media': {'pk': post['id'], 'id': f"{post['id']}_{username}", 'code': post['code']},
+                'status': 'ok'
+            })
+
+        self._send(404, 'Not Found', 'text/plain; charset=utf-8')
@@ -0,0 +1,60 @@
+// 回放页面的脚本化界面切换：创建 -> 裁剪 -> 编辑 -> 说明文字 -> 正在分享 -> 已分享
+(function () {
+    const config = Object.assign({ uploadDelay: 1000, shareDelay: 1000 }, window.REPLAY_CONFIG || {});
+    const dialog = document.getElementById('replay-dialog');
+    const state = { step: null, previews: [] };
+
+    async function showScreen(name) {
+        const response = await fetch(`/replay/snapshots/${name}.html`);
+        dialog.innerHTML = await response.text();
+        state.step = name;
+
+        // 裁剪、编辑和说明文字界面显示已上传图片的预览
+        dialog.querySelectorAll('.replay-preview').forEach(container => {
+            state.previews.forEach(url => {
+                const img = document.createElement('img');
+                img.alt = '已选择的照片';
+                img.src = url;
+                container.appendChild(img);
+            });
+        });
+
+        const fileInput = dialog.querySelector('input[type="file"]');
+        if (fileInput) {
+            fileInput.addEventListener('change', () => {
+                state.previews = Array.from(fileInput.files).map(file => URL.createObjectURL(file));
+                // 模拟Instagram处理上传文件的耗时
+                setTimeout(() => showScreen('crop'), config.uploadDelay);
+            });
+        }
+    }
+
+    async function share() {
+        const editor = dialog.querySelector('[contenteditable="true"]');
+        const caption = editor ? editor.innerText.trim() : '';
+        await showScreen('sharing');
+
+        setTimeout(async () => {
+            const body = new URLSearchParams({ caption: caption, image_count: String(state.previews.length) });
+            await fetch('/api/v1/media/configure/', { method: 'POST', body: body, credentials: 'same-origin' });
+            await showScreen('shared');
+        }, config.shareDelay);
+    }
+
+    document.addEventListener('click', event => {
+        const target = event.target.closest('[data-replay-action]');
+        if (!target) {
+            return;
+        }
+        event.preventDefault();
+
+        const action = target.getAttribute('data-replay-action');
+        if (action === 'create') {
+            showScreen('create');
+        } else if (action === 'next') {
+            showScreen(state.step === 'crop' ? 'filter' : 'caption');
+        } else if (action === 'share') {
+            share();
+        }
+    });
+})();
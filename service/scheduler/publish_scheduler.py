@@ -0,0 +1,289 @@
+import os
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_ERROR
+
+from service.ins_robot.file_management_service import FileManagementService
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+to_publish_dir = os.path.join(base_dir, 'data', 'toPublish')
+scheduler_dir = os.path.join(base_dir, 'data', 'scheduler')
+# 记录定时发布最近一次执行日期的文件
+last_run_file = os.path.join(scheduler_dir, 'last_run.json')
+
+PLANNER_JOB_ID = 'publish-planner'
+ARCHIVE_JOB_ID = 'weekly-archive'
+PUBLISH_JOB_PREFIX = 'publish-'
+# 错过发布时间后仍允许补发的宽限时间（秒）
+MISFIRE_GRACE_TIME = 30 * 60
+
+# 全局调度器实例
+_scheduler = None
+# 调度器锁，确保只启动一次
+_scheduler_lock = threading.Lock()
+
+
+def get_publish_window():
+    """
+    读取每日发布时间窗口，默认为12:00-14:00
+
+    Returns:
+        tuple: (开始小时, 结束小时)
+    """
+    load_dotenv()
+    start_hour = int(os.getenv('POSTING_HOUR_MIN', 12))
+    end_hour = int(os.getenv('POSTING_HOUR_MAX', 14))
+    if end_hour <= start_hour:
+        end_hour = start_hour + 1
+    return start_hour, end_hour
+
+
+def pick_publish_time(now=None):
+    """
+    在今天的发布时间窗口中随机选择一个发布时间
+
+    Args:
+        now: 当前时间（可选，默认为datetime.now()）
+
+    Returns:
+        datetime: 随机选中的发布时间，如果今天的窗口已经过去则返回None
+    """
+    now = now or datetime.now()
+    start_hour, end_hour = get_publish_window()
+    window_start = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+    window_end = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(hours=end_hour)
+
+    # 已经处于窗口中时，只在剩余时间内随机选择
+    earliest = max(window_start, now + timedelta(minutes=1))
+    if earliest >= window_end:
+        return None
+
+    offset = random.randint(0, max(int((window_end - earliest).total_seconds()), 1) - 1)
+    return earliest + timedelta(seconds=offset)
+
+
+def get_last_run_date():
+    """
+    读取定时发布最近一次执行的日期
+
+    Returns:
+        str: 日期（YYYY-MM-DD），从未执行过时返回None
+    """
+    try:
+        with open(last_run_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('date')
+    except (OSError, ValueError):
+        return None
+
+
+def mark_run_date(day):
+    """
+    原子写入定时发布的执行日期，重启或重新规划后同一天不会再次发布
+    """
+    os.makedirs(scheduler_dir, exist_ok=True)
+    temp_file = last_run_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({'date': day, 'marked_at': datetime.now().isoformat()}, f)
+    os.replace(temp_file, last_run_file)
+
+
+def plan_today_publish():
+    """
+    为今天安排一次随机时间的发布任务（仅周一至周五）
+
+    Returns:
+        datetime: 安排的发布时间，如果今天不需要发布则返回None
+    """
+    scheduler = get_scheduler()
+    now = datetime.now()
+
+    if now.weekday() >= 5:
+        print("[发布调度] 今天是周末，不安排发布任务")
+        return None
+
+    # 日期触发的任务执行后会从任务存储中删除，需要通过执行记录判断今天是否已经发布过
+    if get_last_run_date() == now.strftime('%Y-%m-%d'):
+        print("[发布调度] 今天的定时发布已经执行过，不再安排")
+        return None
+
+    job_id = f"{PUBLISH_JOB_PREFIX}{now.strftime('%Y%m%d')}"
+    existing_job = scheduler.get_job(job_id)
+    if existing_job:
+        print(f"[发布调度] 今天的发布任务已存在，发布时间: {existing_job.next_run_time}")
+        return existing_job.next_run_time
+
+    run_time = pick_publish_time(now)
+    if not run_time:
+        print("[发布调度] 今天的发布时间窗口已过，不再安排发布任务")
+        return None
+
+    scheduler.add_job(
+        'service.scheduler.publish_scheduler:run_scheduled_publish',
+        trigger='date',
+        run_date=run_time,
+        id=job_id,
+        name=f"发布 {now.strftime('%A')} 的内容"
+    )
+    print(f"[发布调度] 已安排今天的发布任务，发布时间: {run_time}")
+    return run_time
+
+
+def run_scheduled_publish():
+    """
+    执行定时发布：读取今天星期文件夹中的帖子（单图或轮播）和文案，加入发布发件箱由后台工作池发布
+
+    Returns:
+        list: 每个条目的发布记录
+    """
+    from service.ins_robot.publish_outbox import get_outbox
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    if get_last_run_date() == today:
+        print("[发布调度] 今天的定时发布已经执行过，跳过")
+        return []
+    # 开始发布前先记录，发布过程中重启也不会在同一天重复发布
+    mark_run_date(today)
+
+    file_service = FileManagementService(base_dir=to_publish_dir)
+
+    items = []
+    for post in file_service.get_posts_for_today():
+        content = file_service.read_text_file(post['caption_path']) if post['caption_path'] else ''
+        items.append({
+            'weekday': datetime.now().strftime('%A'),
+            'image_file': post['name'],
+            # 轮播帖子的所有图片在同一次发布流程中上传
+            'image_path': post['images'] if post['carousel'] else post['images'][0],
+            'content': content or ''
+        })
+
+    if not items:
+        print("[发布调度] 今天没有需要发布的内容")
+        return []
+
+    print(f"[发布调度] 开始定时发布，共 {len(items)} 条")
+    # 通过发布发件箱异步发布，重复触发时同一图片不会再次发布
+    outbox = get_outbox()
+    entries = []
+    for item in items:
+        entry, created = outbox.enqueue(item['image_path'], item['content'])
+        if not created:
+            print(f"[发布调度] {item['image_file']} 已有发布记录，跳过")
+        entries.append(entry)
+    return entries
+
+
+def _on_job_event(event):
+    """
+    调度事件监听：错过的发布任务在窗口内重新安排，失败的任务记录日志
+    """
+    if event.code == EVENT_JOB_MISSED:
+        print(f"[发布调度] 任务 {event.job_id} 错过了计划时间 {event.scheduled_run_time}")
+        if event.job_id.startswith(PUBLISH_JOB_PREFIX) and event.job_id != PLANNER_JOB_ID:
+            plan_today_publish()
+    elif event.code == EVENT_JOB_ERROR:
+        print(f"[发布调度] 任务 {event.job_id} 执行失败: {event.exception}")
+
+
+def archive_finished_week():
+    """
+    把本周已发布的帖子从toPublish移入周归档（周六凌晨执行，本周的发布已经结束）
+
+    Returns:
+        dict: 归档结果，没有已发布的帖子时返回None
+    """
+    from service.storage.week_archive import get_week_archive
+
+    result = get_week_archive().archive_folder(to_publish_dir, published_only=True)
+    if not result:
+        print("[发布调度] 本周没有需要归档的已发布帖子")
+    return result
+
+
+def get_scheduler():
+    """
+    获取全局调度器实例（持久化任务存储 + 单线程发布执行器）
+
+    Returns:
+        BackgroundScheduler: 调度器实例
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            os.makedirs(scheduler_dir, exist_ok=True)
+            job_store_url = f"sqlite:///{os.path.join(scheduler_dir, 'jobs.sqlite')}"
+            _scheduler = BackgroundScheduler(
+                jobstores={'default': SQLAlchemyJobStore(url=job_store_url)},
+                # 发布任务在独立的单个工作线程中执行，不占用HTTP线程，也不会并发打开多个浏览器
+                executors={'default': ThreadPoolExecutor(1)},
+                job_defaults={
+                    'coalesce': True,
+                    'max_instances': 1,
+                    'misfire_grace_time': MISFIRE_GRACE_TIME
+                }
+            )
+            _scheduler.add_listener(_on_job_event, EVENT_JOB_MISSED | EVENT_JOB_ERROR)
+        return _scheduler
+
+
+def start_scheduler():
+    """
+    启动发布调度器，注册每日规划任务并为今天安排发布
+
+    Returns:
+        BackgroundScheduler: 已启动的调度器实例
+    """
+    scheduler = get_scheduler()
+    if scheduler.running:
+        return scheduler
+
+    scheduler.start()
+    # 每个工作日凌晨为当天挑选一个随机发布时间
+    scheduler.add_job(
+        'service.scheduler.publish_scheduler:plan_today_publish',
+        trigger='cron',
+        day_of_week='mon-fri',
+        hour=0,
+        minute=5,
+        id=PLANNER_JOB_ID,
+        name='规划当天发布时间',
+        replace_existing=True
+    )
+    # 每周六凌晨归档本周已发布的帖子
+    scheduler.add_job(
+        'service.scheduler.publish_scheduler:archive_finished_week',
+        trigger='cron',
+        day_of_week='sat',
+        hour=1,
+        minute=0,
+        id=ARCHIVE_JOB_ID,
+        name='归档本周已发布的帖子',
+        replace_existing=True
+    )
+    plan_today_publish()
+    print("[发布调度] 调度器已启动")
+    return scheduler
+
+
+def get_next_runs():
+    """
+    获取所有已安排任务的下次执行时间
+
+    Returns:
+        list: 任务列表，按下次执行时间排序
+    """
+    jobs = []
+    for job in get_scheduler().get_jobs():
+        jobs.append({
+            'id': job.id,
+            'name': job.name,
+            'next_run_time': job.next_run_time.isoformat() if job.next_run_time else None
+        })
+    return sorted(jobs, key=lambda job: job['next_run_time'] or '')
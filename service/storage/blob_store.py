@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from service.organize.placement import place_file, same_volume
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_blob_dir = os.path.join(base_dir, 'data', 'blobs')
+
+# 计算哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+# 新加入的内容在该时间内不会被清理（秒）
+GC_GRACE_PERIOD = 60
+
+# 全局存储实例
+_store = None
+# 存储实例锁
+_store_lock = threading.Lock()
+
+
+class BlobStore:
+    """
+    按内容寻址的媒体存储：每份图片内容按sha256只保存一次（data/blobs/objects），
+    各阶段文件夹中的文件是指向它的硬链接，引用计数即硬链接数减一
+    - 相同内容的图片（重复上传、各阶段之间流转）不再重复占用磁盘
+    - 阶段之间流转只需要创建链接，不复制文件内容
+    - 阶段文件被删除后引用计数自动减少，gc清理不再被引用的内容
+    """
+
+    def __init__(self, blob_dir=None):
+        """
+        初始化媒体存储
+
+        Args:
+            blob_dir: 存储目录，默认为data/blobs
+        """
+        self.blob_dir = blob_dir or default_blob_dir
+        self.objects_dir = os.path.join(self.blob_dir, 'objects')
+        self.index_file = os.path.join(self.blob_dir, 'index.json')
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.index = self._load()
+        # 按(设备, inode)查找内容哈希，已经链接到存储的文件无需重新计算哈希
+        self._by_inode = {entry['inode']: digest for digest, entry in self.index.items() if entry.get('inode')}
+
+    def _load(self):
+        """
+        读取索引文件，文件不存在或损坏时返回空索引
+        """
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[媒体存储] 读取索引失败，使用空索引: {e}")
+            return {}
+
+    def _save(self):
+        """
+        原子写入索引文件
+        """
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.index_file)
+
+    @staticmethod
+    def _inode_key(path):
+        stat = os.stat(path)
+        return f"{stat.st_dev}:{stat.st_ino}"
+
+    @staticmethod
+    def hash_file(path):
+        """
+        计算文件内容的sha256
+        """
+        file_hash = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def blob_path(self, digest):
+        """
+        获取内容对应的存储路径（按哈希前两位分目录）
+        """
+        entry = self.index.get(digest, {})
+        return os.path.join(self.objects_dir, digest[:2], digest + entry.get('ext', ''))
+
+    def _blob_valid(self, digest):
+        """
+        检查存储中的内容是否仍与哈希一致：文件存在，且大小和修改时间与入库时相同
+        被原地改写的内容（所有共享它的阶段文件都已改变）不能再按原哈希引用
+        """
+        entry = self.index.get(digest)
+        if not entry:
+            return False
+        try:
+            stat = os.stat(self.blob_path(digest))
+        except OSError:
+            return False
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry.get('mtime_ns', stat.st_mtime_ns):
+            return True
+
+        # 内容已被改写：从存储中移除（阶段文件保留改写后的内容），之后按新内容重新入库
+        print(f"[媒体存储] 内容 {digest[:12]} 已被原地修改，从存储中移除")
+        blob_path = self.blob_path(digest)
+        with self._lock:
+            entry = self.index.pop(digest, None)
+            if entry:
+                self._by_inode.pop(entry.get('inode'), None)
+                try:
+                    os.remove(blob_path)
+                except OSError:
+                    pass
+                self._save()
+        return False
+
+    def _digest_of(self, path):
+        """
+        获取文件的内容哈希：已链接到存储且未被修改的文件直接按inode查找
+        """
+        digest = self._by_inode.get(self._inode_key(path))
+        if digest and self._blob_valid(digest):
+            return digest
+        return self.hash_file(path)
+
+    def _add(self, temp_path, digest, name):
+        """
+        把临时文件加入存储，内容已存在时丢弃临时文件
+
+        Returns:
+            bool: 是否为新内容
+        """
+        if self._blob_valid(digest):
+            os.remove(temp_path)
+            return False
+        with self._lock:
+
+            self.index[digest] = {
+                'ext': os.path.splitext(name)[1].lower(),
+                'size': os.path.getsize(temp_path),
+                'name': name,
+                'created_at': time.time()
+            }
+            blob_path = self.blob_path(digest)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(temp_path, blob_path)
+            self.index[digest]['inode'] = self._inode_key(blob_path)
+            self.index[digest]['mtime_ns'] = os.stat(blob_path).st_mtime_ns
+            self._by_inode[self.index[digest]['inode']] = digest
+            self._save()
+            return True
+
+    def link(self, digest, target):
+        """
+        在阶段文件夹中创建指向内容的引用（硬链接，不支持时退回复制）
+
+        Returns:
+            str: 实际使用的方式
+        """
+        return place_file(self.blob_path(digest), target, 'hardlink')
+
+    def write_bytes(self, data, target):
+        """
+        保存图片数据到目标位置，相同内容只在存储中保留一份
+
+        Args:
+            data: 图片字节
+            target: 阶段文件夹中的目标路径
+
+        Returns:
+            str: 内容哈希
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if not self._blob_valid(digest):
+            temp_path = os.path.join(self.objects_dir, f".{digest}.{threading.get_ident()}.tmp")
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            self._add(temp_path, digest, os.path.basename(target))
+        else:
+            print(f"[媒体存储] 内容已存在，直接引用: {os.path.basename(target)}")
+        self.link(digest, target)
+        return digest
+
+    def ingest(self, path, target=None):
+        """
+        把已有文件纳入存储，原文件始终留在原位置，不会因中途失败而丢失
+        - 未指定target时，原文件成为指向存储的引用
+        - 指定target时（如处理结果的临时文件），在target创建引用后删除原文件
+
+        Args:
+            path: 已有文件路径
+            target: 引用的目标路径（可选）
+
+        Returns:
+            str: 内容哈希，文件与存储不在同一卷上或不支持硬链接时返回None（此时不做处理）
+        """
+        if not same_volume(path, self.objects_dir):
+            return None
+
+        digest = self._digest_of(path)
+        if not self._blob_valid(digest):
+            # 新内容：为原文件创建一个硬链接加入存储，原文件本身不移动
+            temp_path = os.path.join(self.objects_dir, f".{digest}.{threading.get_ident()}.tmp")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            try:
+                os.link(path, temp_path)
+            except OSError as e:
+                print(f"[媒体存储] 无法创建硬链接，不纳入存储: {e}")
+                return None
+            self._add(temp_path, digest, os.path.basename(target or path))
+
+        if not os.path.samefile(path, self.blob_path(digest)):
+            # 相同内容已在存储中：先链接到临时文件再原子替换原文件
+            self.link(digest, path)
+        if target:
+            self.link(digest, target)
+            os.remove(path)
+        return digest
+
+    def place(self, source, target):
+        """
+        阶段之间流转：源文件纳入存储后在目标位置创建引用，不复制文件内容
+
+        Returns:
+            str: 实际使用的方式（blob为存储引用，否则为place_file的方式）
+        """
+        digest = self.ingest(source)
+        if digest is None:
+            return place_file(source, target)
+        self.link(digest, target)
+        return 'blob'
+
+    def refcount(self, digest):
+        """
+        获取内容被引用的次数（硬链接数减去存储本身）
+        """
+        try:
+            return os.stat(self.blob_path(digest)).st_nlink - 1
+        except OSError:
+            return 0
+
+    def gc(self):
+        """
+        清理不再被任何阶段文件引用的内容
+
+        Returns:
+            dict: 删除的内容数量和释放的字节数
+        """
+        removed = 0
+        reclaimed = 0
+        with self._lock:
+            now = time.time()
+            for digest in list(self.index):
+                # 刚加入的内容可能还没来得及创建引用
+                if self.refcount(digest) > 0 or now - self.index[digest]['created_at'] < GC_GRACE_PERIOD:
+                    continue
+                blob_path = self.blob_path(digest)
+                entry = self.index.pop(digest)
+                self._by_inode.pop(entry.get('inode'), None)
+                if os.path.exists(blob_path):
+                    reclaimed += os.path.getsize(blob_path)
+                    os.remove(blob_path)
+                removed += 1
+            if removed:
+                self._save()
+        print(f"[媒体存储] 清理了 {removed} 个未引用的内容，释放 {reclaimed / 1024 / 1024:.1f} MB")
+        return {'removed': removed, 'reclaimed_bytes': reclaimed}
+
+    def stats(self):
+        """
+        统计存储占用和去重节省的空间
+
+        Returns:
+            dict: 内容数量、实际占用、引用总数和各阶段文件的逻辑大小
+        """
+        with self._lock:
+            entries = list(self.index.items())
+        stored = sum(entry['size'] for _, entry in entries)
+        refs = {digest: self.refcount(digest) for digest, _ in entries}
+        logical = sum(entry['size'] * refs[digest] for digest, entry in entries)
+        return {
+            'blobs': len(entries),
+            'stored_bytes': stored,
+            'references': sum(refs.values()),
+            'logical_bytes': logical,
+            'saved_bytes': max(logical - stored, 0)
+        }
+
+
+def get_blob_store():
+    """
+    获取全局媒体存储实例
+
+    Returns:
+        BlobStore: 媒体存储
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore()
+        return _store
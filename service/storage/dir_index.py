@@ -0,0 +1,312 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+# 计算哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+# 最多缓存的目录数量，超过后淘汰最久未读取的目录并取消监听
+MAX_CACHED_DIRS = 512
+
+# 全局目录索引实例
+_index = None
+# 目录索引实例锁
+_index_lock = threading.Lock()
+
+
+class DirIndex:
+    """
+    阶段文件夹的内存目录索引：缓存每个目录的文件列表、文件大小、修改时间和内容哈希
+    - 目录的inode和修改时间不变时直接使用缓存的列表，不再逐个文件调用isfile/getsize
+    - 目录被重命名（如清理移入回收区）或增删文件时，目录的inode或修改时间会变化，只重新扫描该目录
+    - 安装了watchdog时监听已索引的目录（Linux上为inotify），文件事件使对应目录的缓存立即失效；
+      监听事件是异步到达的，读取列表时仍然重新stat其中的文件，保证刚写入的文件大小和修改时间是最新的
+    - 重命名或删除阶段文件夹之前需要调用release，取消其中目录的监听（Windows上监听会占用目录句柄，导致重命名失败）
+    - 内容哈希在第一次需要时计算，文件大小或修改时间变化后重新计算
+    """
+
+    def __init__(self, watch=True):
+        """
+        初始化目录索引
+
+        Args:
+            watch: 是否使用watchdog监听目录变化（未安装watchdog时自动退回为校验目录和文件的stat）
+        """
+        self._dirs = OrderedDict()
+        self._lock = threading.Lock()
+        self._observer = None
+        # 目录 -> (监听句柄, 目录inode)
+        self._watched = {}
+        self.stats = {'hits': 0, 'scans': 0, 'hashes': 0, 'events': 0}
+        if watch:
+            self._start_observer()
+
+    def _start_observer(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            print("[目录索引] 未安装watchdog，通过目录和文件stat校验缓存")
+            return
+
+        index = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                index.stats['events'] += 1
+                if event.is_directory and event.event_type in ('deleted', 'moved'):
+                    # 目录被删除或移走（如清理移入回收区）时取消监听
+                    index.evict(event.src_path)
+                index.invalidate(event.src_path)
+                if getattr(event, 'dest_path', None):
+                    index.invalidate(event.dest_path)
+
+        self._handler = _Handler()
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.start()
+        print("[目录索引] 已启动目录监听")
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _watch(self, key, path, inode):
+        """
+        监听已索引的目录（不递归，子目录在被读取时单独监听）
+        """
+        if not self._observer:
+            return
+        with self._lock:
+            if key in self._watched:
+                return
+        try:
+            watch = self._observer.schedule(self._handler, path, recursive=False)
+        except Exception as e:
+            print(f"[目录索引] 监听目录失败: {path}, {e}")
+            return
+        with self._lock:
+            self._watched[key] = (watch, inode)
+
+    def _unwatch(self, key):
+        with self._lock:
+            watched = self._watched.pop(key, None)
+        if watched and self._observer:
+            try:
+                self._observer.unschedule(watched[0])
+            except Exception:
+                pass
+
+    def evict(self, path):
+        """
+        从索引中移除目录并取消监听（目录被删除、移走或被淘汰时）
+        """
+        key = self._key(path)
+        with self._lock:
+            self._dirs.pop(key, None)
+        self._unwatch(key)
+
+    def release(self, path):
+        """
+        取消目录及其所有子目录的监听并移除缓存，在重命名或删除该目录之前调用
+
+        Args:
+            path: 目录路径
+        """
+        key = self._key(path)
+        prefix = key.rstrip(os.sep) + os.sep
+        with self._lock:
+            keys = [k for k in set(self._dirs) | set(self._watched) if k == key or k.startswith(prefix)]
+            for k in keys:
+                self._dirs.pop(k, None)
+        for k in keys:
+            self._unwatch(k)
+
+    def invalidate(self, path):
+        """
+        使路径相关的缓存失效：路径本身（目录）和它所在的目录
+        """
+        key = self._key(path)
+        with self._lock:
+            self._dirs.pop(key, None)
+            self._dirs.pop(os.path.dirname(key), None)
+
+    def _scan(self, path, dir_stat):
+        """
+        扫描一个目录，scandir在Windows上随目录列表返回文件属性，不需要逐个文件stat
+        """
+        entries = {}
+        with os.scandir(path) as it:
+            for item in it:
+                try:
+                    stat = item.stat()
+                    is_dir = item.is_dir()
+                except OSError:
+                    # 扫描期间被删除的文件
+                    continue
+                entries[item.name] = {
+                    'name': item.name,
+                    'path': os.path.join(path, item.name),
+                    'is_dir': is_dir,
+                    'size': 0 if is_dir else stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'hash': None
+                }
+        self.stats['scans'] += 1
+        return {
+            'version': (dir_stat.st_ino, dir_stat.st_mtime_ns),
+            'entries': entries,
+            'names': sorted(entries)
+        }
+
+    def _get_dir(self, path):
+        """
+        获取目录的缓存，目录不存在时返回None
+        """
+        key = self._key(path)
+        try:
+            dir_stat = os.stat(path)
+        except OSError:
+            self.evict(path)
+            return None
+        version = (dir_stat.st_ino, dir_stat.st_mtime_ns)
+        with self._lock:
+            cached = self._dirs.get(key)
+            if cached and cached['version'] == version:
+                self._dirs.move_to_end(key)
+                self.stats['hits'] += 1
+                return cached
+            watched = self._watched.get(key)
+        if watched and watched[1] != dir_stat.st_ino:
+            # 原目录已被移走，当前路径是新建的目录，旧的监听跟随的是原目录
+            self._unwatch(key)
+
+        cached = self._scan(path, dir_stat)
+        evicted = []
+        with self._lock:
+            self._dirs[key] = cached
+            self._dirs.move_to_end(key)
+            while len(self._dirs) > MAX_CACHED_DIRS:
+                evicted.append(self._dirs.popitem(last=False)[0])
+        for evicted_key in evicted:
+            self._unwatch(evicted_key)
+        self._watch(key, path, dir_stat.st_ino)
+        return cached
+
+    def _fresh(self, entry):
+        """
+        重新stat文件条目：文件被原地改写后目录的修改时间不会变化，监听事件也可能还没有到达
+
+        Returns:
+            dict: 更新后的条目，文件已不存在时返回None
+        """
+        if entry['is_dir']:
+            return entry
+        try:
+            stat = os.stat(entry['path'])
+        except OSError:
+            return None
+        entry['size'] = stat.st_size
+        entry['mtime'] = stat.st_mtime
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return entry
+
+    def listdir(self, path, extensions=None, files_only=False, dirs_only=False):
+        """
+        按文件名排序列出目录中的条目
+
+        Args:
+            path: 目录路径
+            extensions: 只返回这些扩展名的文件（可选，如('.jpg', '.png')）
+            files_only: 只返回文件
+            dirs_only: 只返回子目录
+
+        Returns:
+            list: 条目列表，每个条目为{"name", "path", "is_dir", "size", "mtime"}；目录不存在时返回None
+        """
+        cached = self._get_dir(path)
+        if cached is None:
+            return None
+        entries = []
+        for name in cached['names']:
+            entry = cached['entries'][name]
+            if (files_only or extensions) and entry['is_dir']:
+                continue
+            if dirs_only and not entry['is_dir']:
+                continue
+            if extensions and not name.lower().endswith(extensions):
+                continue
+            entry = self._fresh(entry)
+            if entry:
+                entries.append(entry)
+        return entries
+
+    def exists(self, path):
+        """
+        判断目录是否存在
+        """
+        return self._get_dir(path) is not None
+
+    def stat(self, path):
+        """
+        获取文件的索引条目
+
+        Returns:
+            dict: 条目，文件不存在时返回None
+        """
+        cached = self._get_dir(os.path.dirname(os.path.abspath(path)))
+        if cached is None:
+            return None
+        entry = cached['entries'].get(os.path.basename(path))
+        return self._fresh(entry) if entry else None
+
+    def file_hash(self, path):
+        """
+        获取文件内容的sha256，文件未变化时直接返回缓存的哈希
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            str: 内容哈希
+        """
+        entry = self.stat(path)
+        if entry is None or entry['is_dir']:
+            raise FileNotFoundError(path)
+        current = os.stat(path)
+        version = (current.st_size, current.st_mtime_ns)
+        if entry['hash'] and entry.get('hash_version') == version:
+            return entry['hash']
+
+        file_hash = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                file_hash.update(chunk)
+        entry['hash'] = file_hash.hexdigest()
+        entry['hash_version'] = version
+        self.stats['hashes'] += 1
+        return entry['hash']
+
+    def get_status(self):
+        """
+        获取索引状态：已索引的目录数量、缓存命中次数和是否在监听目录
+        """
+        with self._lock:
+            directories = len(self._dirs)
+            watched = len(self._watched)
+        return dict(self.stats, directories=directories, watched=watched, watching=self._observer is not None)
+
+
+def get_dir_index():
+    """
+    获取全局目录索引实例
+
+    Returns:
+        DirIndex: 目录索引
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DirIndex()
+        return _index
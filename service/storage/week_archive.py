@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, date, timedelta
+from dotenv import load_dotenv
+
+from service.organize.placement import place_file
+
+# 项目根目录
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+default_archive_dir = os.path.join(base_dir, 'data', 'archive')
+
+# 归档媒体的处理方式：original（原样保存）、compress（重新压缩）、downscale（缩小尺寸并压缩）
+ARCHIVE_MEDIA_MODES = ('original', 'compress', 'downscale')
+# 可以压缩的图片格式
+COMPRESSIBLE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# 已发布的状态（与发布发件箱一致）
+PUBLISHED_STATES = ('shared', 'verified')
+
+# 全局归档实例
+_archive = None
+# 归档实例锁
+_archive_lock = threading.Lock()
+
+
+def week_key(day=None):
+    """
+    获取日期所在的ISO周，如2026-W42
+
+    Args:
+        day: 日期或时间，默认为今天
+
+    Returns:
+        str: 周标识
+    """
+    iso_year, iso_week, _ = (day or date.today()).isocalendar()
+    return f"{iso_year}-W{iso_week:02d}"
+
+
+def week_bounds(key):
+    """
+    获取周标识对应的周一和周日
+
+    Returns:
+        tuple: (周一, 周日)，均为date
+    """
+    year, week = key.split('-W')
+    monday = date.fromisocalendar(int(year), int(week), 1)
+    return monday, monday + timedelta(days=6)
+
+
+class WeekArchive:
+    """
+    按周分区的已发布内容归档
+    - 每周的帖子移到data/archive/<周标识>/<星期>/，不再在重建文件夹或清理时被删除
+    - 紧凑的索引文件（index.json）记录每周的帖子、文案和帖子编号，历史查询只读索引，不遍历目录
+    - 归档的图片可以选择重新压缩或缩小尺寸以节省空间（ARCHIVE_MEDIA_MODE）
+    """
+
+    def __init__(self, archive_dir=None, media_mode=None):
+        """
+        初始化归档
+
+        Args:
+            archive_dir: 归档目录，默认为data/archive
+            media_mode: 归档图片的处理方式，默认读取环境变量ARCHIVE_MEDIA_MODE（默认original）
+        """
+        load_dotenv()
+        self.archive_dir = archive_dir or default_archive_dir
+        self.index_file = os.path.join(self.archive_dir, 'index.json')
+        self.media_mode = (media_mode or os.getenv('ARCHIVE_MEDIA_MODE', 'original')).lower()
+        if self.media_mode not in ARCHIVE_MEDIA_MODES:
+            print(f"[周归档] 未知的图片处理方式 {self.media_mode}，原样保存")
+            self.media_mode = 'original'
+        self.max_edge = int(os.getenv('ARCHIVE_MAX_EDGE', 1440))
+        self.jpeg_quality = int(os.getenv('ARCHIVE_JPEG_QUALITY', 80))
+        self._lock = threading.Lock()
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self.weeks = self._load()
+
+    def _load(self):
+        """
+        读取索引文件，文件不存在或损坏时返回空索引
+        """
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('weeks', {})
+        except Exception as e:
+            print(f"[周归档] 读取索引失败，使用空索引: {e}")
+            return {}
+
+    def _save(self):
+        """
+        原子写入紧凑格式的索引文件
+        """
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'weeks': self.weeks}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_file, self.index_file)
+
+    @staticmethod
+    def _outbox_record(post):
+        """
+        按发件箱的幂等键（图片内容哈希+账号）查找帖子的发布记录，多个账号都有记录时优先已发布的最新记录
+        """
+        from service.ins_robot.publish_outbox import get_outbox
+
+        outbox = get_outbox()
+        entries = outbox.list_entries()
+        if not entries:
+            return None
+        content_hash = outbox.content_hash(post['images'] if post['carousel'] else post['images'][0])
+        records = [outbox.get(outbox.key_for_hash(content_hash, account))
+                   for account in {entry['account'] for entry in entries}]
+        records = [record for record in records if record]
+        if not records:
+            return None
+        return max(records, key=lambda record: (record['state'] in PUBLISHED_STATES, record['updated_at']))
+
+    @staticmethod
+    def _free_name(directory, name):
+        """
+        获取目录中不冲突的名称（单图帖子同时检查同名文案）
+        """
+        stem, ext = os.path.splitext(name)
+        candidate = name
+        number = 1
+        while os.path.exists(os.path.join(directory, candidate)) or \
+                (ext and os.path.exists(os.path.join(directory, f"{os.path.splitext(candidate)[0]}.txt"))):
+            candidate = f"{stem}_{number}{ext}"
+            number += 1
+        return candidate
+
+    def _add_item(self, week, item, post_bytes):
+        """
+        把一条已移入分区的帖子写入索引并立即保存，中途中断时已移动的帖子都能在索引中找到
+        """
+        with self._lock:
+            start, end = week_bounds(week)
+            entry = self.weeks.setdefault(week, {
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'items': [],
+                'bytes': 0
+            })
+            entry['items'].append(item)
+            entry['bytes'] += post_bytes
+            entry['archived_at'] = time.time()
+            self._save()
+
+    @staticmethod
+    def _published_at(entry):
+        for state, at in reversed(entry.get('history', [])):
+            if state in PUBLISHED_STATES:
+                return at
+        return None
+
+    def _compact(self, path):
+        """
+        按设置重新压缩或缩小归档图片，结果不比原图小时保留原图
+
+        Returns:
+            int: 处理后的文件大小
+        """
+        size = os.path.getsize(path)
+        ext = os.path.splitext(path)[1].lower()
+        if self.media_mode == 'original' or ext not in COMPRESSIBLE_EXTENSIONS:
+            return size
+
+        from PIL import Image
+
+        temp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.compact")
+        try:
+            with Image.open(path) as img:
+                if self.media_mode == 'downscale':
+                    img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+                if ext == '.png':
+                    img.save(temp_path, 'PNG', optimize=True)
+                else:
+                    img.convert('RGB').save(temp_path, 'JPEG', quality=self.jpeg_quality, optimize=True)
+            # 写入新文件后替换，与媒体存储中的其他硬链接互不影响
+            if os.path.getsize(temp_path) < size:
+                os.replace(temp_path, path)
+                return os.path.getsize(path)
+        except Exception as e:
+            print(f"[周归档] 压缩图片失败，保留原图: {path}, {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return size
+
+    def archive_posts(self, posts, reference_time=None, published_only=False):
+        """
+        把帖子移入周分区并写入索引
+        帖子按发布时间归入对应的周，没有发布记录的帖子归入reference_time所在的周
+
+        Args:
+            posts: 帖子列表，格式同FileManagementService.list_posts，并包含weekday字段
+            reference_time: 没有发布时间的帖子使用的时间戳（如清理批次的时间），默认为当前时间
+            published_only: 只归档发件箱中已发布的帖子
+
+        Returns:
+            dict: 归档结果（weeks、items、files、original_bytes、stored_bytes），没有帖子时返回None
+        """
+        reference_time = reference_time or time.time()
+
+        # 移动文件前先按内容查找发布记录
+        pending = []
+        for post in posts:
+            record = self._outbox_record(post) or {}
+            if published_only and record.get('state') not in PUBLISHED_STATES:
+                continue
+            pending.append((post, record))
+        if not pending:
+            return None
+
+        weeks = set()
+        files = 0
+        original_bytes = 0
+        stored_bytes = 0
+        for post, record in pending:
+            published_at = self._published_at(record) if record else None
+            week = week_key(datetime.fromtimestamp(published_at or reference_time))
+            weekday = post.get('weekday', '')
+            weekday_dir = os.path.join(self.archive_dir, week, weekday)
+            # 不同时间的帖子可能同名，已存在时加序号，不覆盖已归档的内容
+            name = self._free_name(weekday_dir, post['name'])
+            target_dir = os.path.join(weekday_dir, name) if post['carousel'] else weekday_dir
+            caption = ''
+            if post.get('caption_path'):
+                with open(post['caption_path'], 'r', encoding='utf-8') as f:
+                    caption = f.read()
+
+            images = []
+            post_bytes = 0
+            complete = False
+            try:
+                for image_path in post['images']:
+                    target = os.path.join(target_dir, name if not post['carousel'] else os.path.basename(image_path))
+                    original_bytes += os.path.getsize(image_path)
+                    place_file(image_path, target, 'move')
+                    images.append(os.path.relpath(target, self.archive_dir).replace(os.sep, '/'))
+                    files += 1
+                    post_bytes += self._compact(target)
+                if post.get('caption_path'):
+                    caption_name = os.path.basename(post['caption_path']) if post['carousel'] else f"{os.path.splitext(name)[0]}.txt"
+                    place_file(post['caption_path'], os.path.join(target_dir, caption_name), 'move')
+                    files += 1
+                complete = True
+            finally:
+                # 每条帖子移动后立即写入索引；移动中途出错时也记录已经移入分区的图片，不会留下索引之外的文件
+                if images:
+                    stored_bytes += post_bytes
+                    weeks.add(week)
+                    item = {
+                        'name': name,
+                        'weekday': weekday,
+                        'carousel': post['carousel'],
+                        'images': images,
+                        'caption': caption,
+                        'account': record.get('account'),
+                        'state': record.get('state'),
+                        'outbox_key': record.get('key'),
+                        'media_id': record.get('media_id'),
+                        'permalink': record.get('permalink'),
+                        'published_at': published_at
+                    }
+                    if not complete:
+                        item['partial'] = True
+                    self._add_item(week, item, post_bytes)
+
+        print(f"[周归档] 归档了 {len(pending)} 条帖子（{', '.join(sorted(weeks))}），{files} 个文件，"
+              f"{original_bytes / 1024 / 1024:.1f} MB -> {stored_bytes / 1024 / 1024:.1f} MB")
+        return {
+            'weeks': sorted(weeks),
+            'items': len(pending),
+            'files': files,
+            'original_bytes': original_bytes,
+            'stored_bytes': stored_bytes
+        }
+
+    def archive_folder(self, folder, reference_time=None, include=None, published_only=False):
+        """
+        归档一个按星期分文件夹的发布目录（如toPublish）中的帖子
+
+        Args:
+            folder: 发布目录，包含Monday至Friday等星期文件夹
+            reference_time: 没有发布时间的帖子使用的时间戳（可选）
+            include: 判断帖子是否归档的函数（可选，默认全部归档）
+            published_only: 只归档发件箱中已发布的帖子
+
+        Returns:
+            dict: 归档结果，没有帖子时返回None
+        """
+        from service.ins_robot.file_management_service import FileManagementService
+
+        file_service = FileManagementService(base_dir=folder)
+        posts = []
+        for weekday in file_service.weekday_folders + ['Saturday', 'Sunday']:
+            for post in file_service.list_posts(os.path.join(folder, weekday)):
+                post['weekday'] = weekday
+                if include is None or include(post):
+                    posts.append(post)
+        return self.archive_posts(posts, reference_time, published_only)
+
+    def list_weeks(self):
+        """
+        列出已归档的周
+
+        Returns:
+            list: 按时间倒序的周列表，每项为{"week", "start", "end", "items", "bytes"}
+        """
+        with self._lock:
+            weeks = [{
+                'week': key,
+                'start': entry['start'],
+                'end': entry['end'],
+                'items': len(entry['items']),
+                'bytes': entry['bytes']
+            } for key, entry in self.weeks.items()]
+        return sorted(weeks, key=lambda week: week['start'], reverse=True)
+
+    def get_week(self, key):
+        """
+        获取一周的归档内容
+
+        Returns:
+            dict: 周信息和帖子列表，不存在时返回None
+        """
+        with self._lock:
+            entry = self.weeks.get(key)
+            return dict(entry, week=key, items=list(entry['items'])) if entry else None
+
+    def query(self, start=None, end=None, text=None, published_only=False):
+        """
+        按日期范围和文案关键字查询归档的帖子，只读取索引
+
+        Args:
+            start: 开始日期（date或YYYY-MM-DD，包含）
+            end: 结束日期（date或YYYY-MM-DD，包含）
+            text: 文案或名称中包含的关键字（可选）
+            published_only: 只返回已发布的帖子
+
+        Returns:
+            list: 帖子列表，每个帖子包含所在的week
+        """
+        start = start.isoformat() if isinstance(start, date) else start
+        end = end.isoformat() if isinstance(end, date) else end
+        text = text.lower() if text else None
+
+        results = []
+        with self._lock:
+            for key, entry in self.weeks.items():
+                # 与查询范围没有重叠的周直接跳过
+                if (start and entry['end'] < start) or (end and entry['start'] > end):
+                    continue
+                for item in entry['items']:
+                    if published_only and item['state'] not in PUBLISHED_STATES:
+                        continue
+                    if item['published_at']:
+                        published_day = date.fromtimestamp(item['published_at']).isoformat()
+                        if (start and published_day < start) or (end and published_day > end):
+                            continue
+                    if text and text not in item['caption'].lower() and text not in item['name'].lower():
+                        continue
+                    results.append(dict(item, week=key))
+        return sorted(results, key=lambda item: (item['week'], item['published_at'] or 0))
+
+
+def get_week_archive():
+    """
+    获取全局归档实例
+
+    Returns:
+        WeekArchive: 周归档
+    """
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = WeekArchive()
+        return _archive